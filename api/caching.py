@@ -0,0 +1,206 @@
+import functools
+import hashlib
+
+from django.db.models import Count, Exists, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, quote_etag
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from post.models import Like, Post
+from users.models import Follower, Profile
+
+
+def count_of(model, **lookups):
+    """Correlated COUNT(*) subquery, grouped on the first lookup."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**lookups)
+            .order_by()
+            .values(next(iter(lookups)))
+            .annotate(n=Count("pk"))
+            .values("n")[:1]
+        ),
+        0,
+    )
+
+
+def latest(queryset, field):
+    return Subquery(queryset.order_by(f"-{field}").values(field)[:1])
+
+
+# Like counts alone miss a like on one post plus an unlike on another. Paired
+# with the newest like id, which only grows, any change to the set shows: a new
+# like raises the id and a removed one lowers the count.
+
+
+def profile_version(request, fields=None, **lookups):
+    """
+    Everything UserProfileSerializer output depends on, in one query. Only the
+    inputs of the requested ``fields`` are looked up.
+    """
+    profile = OuterRef("pk")
+    posts = {
+        "posts_updated": latest(Post.objects.filter(profile=profile), "updated_at"),
+        "posts_total": count_of(Post, profile=profile),
+        "post_likes": count_of(Like, post__profile=profile),
+        "post_likes_last": latest(Like.objects.filter(post__profile=profile), "id"),
+    }
+    inputs = {
+        "posts": posts,
+        "posts_count": {"posts_total": posts["posts_total"]},
+        # The counts leave out soft-deleted profiles, and so does the stamp.
+        "follower_count": {
+            "followers_total": count_of(
+                Follower, following=profile, follower__deleted_at=None
+            )
+        },
+        "following_count": {
+            "following_total": count_of(
+                Follower, follower=profile, following__deleted_at=None
+            )
+        },
+        "likes": {
+            "liked_total": count_of(Like, profile=profile),
+            "liked_last": latest(Like.objects.filter(profile=profile), "id"),
+        },
+        "is_following": {
+            "viewer_follows": Exists(
+                Follower.objects.filter(following=profile, follower__user=request.user)
+            )
+        },
+    }
+    expressions = {}
+    for field, annotations in inputs.items():
+        if fields is None or field in fields:
+            expressions.update(annotations)
+    return (
+        Profile.objects.filter(**lookups)
+        .annotate(**expressions)
+        .values_list(
+            "id",
+            "updated_at",
+            "user__username",
+            "user__email",
+            "user__first_name",
+            "user__last_name",
+            *expressions,
+        )
+        .first()
+    )
+
+
+def posts_version(request, **lookups):
+    """Version of a list of posts rendered with PostSerializers."""
+    posts = Post.objects.filter(**lookups)
+    likes = Like.objects.filter(post__in=posts).aggregate(
+        total=Count("id"),
+        last=Max("id"),
+        viewer_total=Count("id", filter=Q(profile__user=request.user)),
+        viewer_last=Max("id", filter=Q(profile__user=request.user)),
+    )
+    return (
+        posts.count(),
+        posts.order_by("-updated_at").values_list("updated_at", flat=True).first(),
+        *likes.values(),
+    )
+
+
+def feed_version(request):
+    """Everything the home feed depends on, in one query on the viewer's row."""
+    following = OuterRef("pk")
+    return (
+        Profile.objects.filter(user=request.user)
+        .annotate(
+            follows_total=count_of(Follower, follower=following),
+            follows_last=latest(Follower.objects.filter(follower=following), "id"),
+            authors_updated=latest(
+                Profile.objects.filter(followers__follower=following), "updated_at"
+            ),
+            feed_posts=count_of(Post, profile__followers__follower=following),
+            feed_updated=latest(
+                Post.objects.filter(profile__followers__follower=following),
+                "updated_at",
+            ),
+            feed_likes=count_of(Like, post__profile__followers__follower=following),
+            feed_likes_last=latest(
+                Like.objects.filter(post__profile__followers__follower=following),
+                "id",
+            ),
+            viewer_likes=count_of(
+                Like, profile=following, post__profile__followers__follower=following
+            ),
+            viewer_likes_last=latest(
+                Like.objects.filter(
+                    profile=following, post__profile__followers__follower=following
+                ),
+                "id",
+            ),
+        )
+        .values_list(
+            "id",
+            "follows_total",
+            "follows_last",
+            "authors_updated",
+            "feed_posts",
+            "feed_updated",
+            "feed_likes",
+            "feed_likes_last",
+            "viewer_likes",
+            "viewer_likes_last",
+        )
+        .first()
+    )
+
+
+def make_etag(request, version):
+    # Responses differ per viewer (is_following, is_liked) and per sparse fieldset,
+    # so both are part of the tag. Weak, because compression may change the bytes
+    # on the wire.
+    fields = request.GET.get("fields")
+    digest = hashlib.blake2b(
+        repr((request.user.pk, fields, version)).encode(), digest_size=16
+    ).hexdigest()
+    return "W/" + quote_etag(digest)
+
+
+def conditional_get(get_version):
+    """
+    Answer GET with 304 Not Modified when the client's ETag still matches.
+
+    ``get_version(view, request, *args, **kwargs)`` returns a cheap, hashable
+    stamp of everything the response depends on, or None to skip caching. It runs
+    before the view, so an unchanged resource is never serialized.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            version = get_version(view, request, *args, **kwargs)
+            if version is None:
+                return method(view, request, *args, **kwargs)
+
+            etag = make_etag(request, version)
+            if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+            if etag in if_none_match or "*" in if_none_match:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = method(view, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+
+            response["ETag"] = etag
+            # Counts can change without touching any timestamp, so Last-Modified
+            # is informational only; revalidation relies on the ETag.
+            timestamps = [v for v in version if hasattr(v, "timestamp")]
+            if timestamps:
+                response["Last-Modified"] = http_date(max(timestamps).timestamp())
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ["Cookie", "Authorization"])
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,83 @@
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoder
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional encoder
+    zstandard = None
+
+COMPRESSORS = {"gzip": compress_string}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda content: brotli.compress(content, quality=5)
+if zstandard is not None:
+    COMPRESSORS["zstd"] = zstandard.ZstdCompressor(level=3).compress
+
+DEFAULTS = {
+    "MIN_SIZE": 1024,
+    "ENCODINGS": ["zstd", "br", "gzip"],
+}
+
+accept_encoding_re = re.compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?")
+
+
+def get_setting(name):
+    return getattr(settings, "RESPONSE_COMPRESSION", {}).get(name, DEFAULTS[name])
+
+
+def negotiate(accept_encoding):
+    """Pick the first configured encoding the client accepts with q > 0."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        match = accept_encoding_re.match(part)
+        if match:
+            try:
+                accepted[match[1].lower()] = float(match[2] or 1)
+            except ValueError:
+                continue
+
+    for encoding in get_setting("ENCODINGS"):
+        if encoding in COMPRESSORS and accepted.get(encoding, accepted.get("*", 0)):
+            return encoding
+    return None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with zstd, brotli or gzip, whichever the client accepts
+    and is available, once they are larger than RESPONSE_COMPRESSION["MIN_SIZE"].
+
+    Streaming responses (the live updates event stream) are left alone.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if len(response.content) < get_setting("MIN_SIZE"):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        compressed = COMPRESSORS[encoding](response.content)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # The bytes changed, so a strong ETag would no longer be accurate.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
@@ -0,0 +1,32 @@
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class CommentPagination(CursorPagination):
+    page_size = 20
+    ordering = ("created_at", "id")
+
+
+class PostTermPagination(CursorPagination):
+    page_size = 20
+    ordering = ("-created_at", "-id")
+
+
+class StoryViewerPagination(CursorPagination):
+    page_size = 50
+    ordering = ("-created_at", "-id")
+
+
+class NotificationPagination(CursorPagination):
+    page_size = 20
+    ordering = ("-updated_at", "-id")
+
+    def get_paginated_response(self, data, unread_count=None):
+        return Response(
+            {
+                "unread_count": unread_count,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
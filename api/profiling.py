@@ -0,0 +1,252 @@
+import cProfile
+import inspect
+import marshal
+import pstats
+import random
+import threading
+import time
+import uuid
+import zlib
+
+from contextlib import ExitStack
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.utils import timezone
+
+from rest_framework import serializers
+
+from users.authentication import JWTAuthenticationFromCookie
+
+from . import serializers as api_serializers
+
+DEFAULTS = {
+    "SAMPLE_RATE": 0.0,
+    "HEADER": "X-Profile",
+    "BUFFER_SIZE": 20,
+    "CACHE": "profiling",
+    "TIMEOUT": 24 * 3600,
+    "MAX_QUERIES": 500,
+    "TOP_FUNCTIONS": 40,
+}
+
+
+def get_setting(name):
+    return getattr(settings, "REQUEST_PROFILING", {}).get(name, DEFAULTS[name])
+
+
+# Only one cProfile can be active per process on Python 3.12+, and running two
+# at once would blur both traces anyway.
+profiler_lock = threading.Lock()
+
+
+class SQLRecorder:
+    """A ``connection.execute_wrapper`` that records a timeline of queries."""
+
+    def __init__(self, started, limit):
+        self.started = started
+        self.limit = limit
+        self.queries = []
+        self.count = 0
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.total += duration
+            if len(self.queries) < self.limit:
+                self.queries.append(
+                    {
+                        "at_ms": round((start - self.started) * 1000, 3),
+                        "duration_ms": round(duration * 1000, 3),
+                        "alias": context["connection"].alias,
+                        "many": many,
+                        "sql": sql,
+                    }
+                )
+
+
+def serializer_methods():
+    """(filename, line, name) of every serializer method -> "Class.method"."""
+    classes = [serializers.Serializer, serializers.ListSerializer]
+    classes += [
+        cls
+        for cls in vars(api_serializers).values()
+        if inspect.isclass(cls)
+        and cls.__module__ == api_serializers.__name__
+        and not issubclass(cls, BaseException)
+    ]
+    methods = {}
+    for cls in classes:
+        for name, attr in vars(cls).items():
+            # Plain methods, classmethods/staticmethods and properties.
+            func = getattr(attr, "__func__", None) or getattr(attr, "fget", attr)
+            code = getattr(func, "__code__", None)
+            if code is not None:
+                key = (code.co_filename, code.co_firstlineno, code.co_name)
+                methods[key] = f"{cls.__name__}.{name}"
+    return methods
+
+
+def serializer_breakdown(stats):
+    """Calls and cumulative milliseconds per serializer method, slowest first."""
+    methods = serializer_methods()
+    rows = [
+        {
+            "method": methods[func],
+            "calls": calls,
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for func, (_, calls, _, cumulative, _) in stats.stats.items()
+        if func in methods
+    ]
+    return sorted(rows, key=lambda row: row["cumulative_ms"], reverse=True)
+
+
+def top_functions(stats):
+    out = StringIO()
+    stats.stream = out
+    stats.sort_stats("cumulative").print_stats(get_setting("TOP_FUNCTIONS"))
+    return out.getvalue()
+
+
+class ProfileStore:
+    """
+    The BUFFER_SIZE most recent profiles, as a ring of cache slots. With a
+    shared cache backend every worker sees the same ring.
+    """
+
+    prefix = "profiling"
+
+    def __init__(self):
+        self.cache = caches[get_setting("CACHE")]
+
+    def add(self, record):
+        self.cache.add(f"{self.prefix}:next", 0, None)
+        slot = self.cache.incr(f"{self.prefix}:next") % get_setting("BUFFER_SIZE")
+        slot_key = f"{self.prefix}:slot:{slot}"
+        # The record this slot pointed to leaves the ring, and the cache, now.
+        evicted = self.cache.get(slot_key)
+        if evicted is not None:
+            self.cache.delete(f"{self.prefix}:{evicted}")
+        timeout = get_setting("TIMEOUT")
+        self.cache.set(slot_key, record["id"], timeout)
+        self.cache.set(f"{self.prefix}:{record['id']}", record, timeout)
+
+    def get(self, profile_id):
+        return self.cache.get(f"{self.prefix}:{profile_id}")
+
+    def list(self):
+        keys = [f"{self.prefix}:slot:{i}" for i in range(get_setting("BUFFER_SIZE"))]
+        ids = self.cache.get_many(keys).values()
+        records = self.cache.get_many([f"{self.prefix}:{i}" for i in ids]).values()
+        return sorted(records, key=lambda record: record["started_at"], reverse=True)
+
+
+DETAIL_KEYS = {"sql", "serializers", "functions", "pstats"}
+
+
+def summary(record):
+    return {key: value for key, value in record.items() if key not in DETAIL_KEYS}
+
+
+def staff_user(request):
+    """
+    The staff member making ``request``, from its access token cookie. Tokens
+    are not rotated here; that is left to the view's authentication.
+    """
+    try:
+        user = JWTAuthenticationFromCookie().user_from_access_token(
+            request.COOKIES.get("access_token")
+        )
+    except Exception:
+        return None
+    return user if user.is_staff else None
+
+
+class ProfilingMiddleware:
+    """
+    Profile a fraction of requests (REQUEST_PROFILING["SAMPLE_RATE"]) and every
+    request a staff member flags with the X-Profile header.
+
+    A profiled request records a cProfile trace, a timeline of its SQL queries
+    and the time spent in each serializer method, and lands in ProfileStore.
+    Flagged responses carry X-Profile-Id for the debug/profiles/ endpoints.
+    Everything else costs a header lookup and, when sampling, one random().
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # The flag costs an authentication query, so it is only paid for when
+        # someone sends it.
+        flagged = bool(
+            request.headers.get(get_setting("HEADER")) and staff_user(request)
+        )
+        sample_rate = get_setting("SAMPLE_RATE")
+        sampled = sample_rate > 0 and random.random() < sample_rate
+        if not (flagged or sampled):
+            return self.get_response(request)
+        return self.profile(request, "flagged" if flagged else "sampled")
+
+    def profile(self, request, reason):
+        profiler = None
+        if profiler_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+        started_at = timezone.now()
+        started = time.perf_counter()
+        recorder = SQLRecorder(started, get_setting("MAX_QUERIES"))
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                if profiler:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler:
+                        profiler.disable()
+            duration = time.perf_counter() - started
+        finally:
+            if profiler:
+                profiler_lock.release()
+
+        record = {
+            "id": uuid.uuid4().hex,
+            "reason": reason,
+            "method": request.method,
+            "path": request.get_full_path(),
+            "status": response.status_code,
+            "user_id": getattr(getattr(request, "user", None), "pk", None),
+            "started_at": started_at.isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "queries": recorder.count,
+            "sql_ms": round(recorder.total * 1000, 3),
+            "sql": recorder.queries,
+            "serializers": [],
+            "functions": "",
+            "pstats": None,
+        }
+        if profiler:
+            stats = pstats.Stats(profiler)
+            record["serializers"] = serializer_breakdown(stats)
+            record["functions"] = top_functions(stats)
+            # The same bytes pstats.dump_stats would write, compressed.
+            record["pstats"] = zlib.compress(marshal.dumps(stats.stats))
+
+        try:
+            ProfileStore().add(record)
+        except Exception:
+            # Profiling must never break the request it observed.
+            return response
+        if reason == "flagged":
+            response["X-Profile-Id"] = record["id"]
+        return response
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def orjson_compatible(data):
+    """
+    Whether orjson encodes ``data`` byte for byte as DRF does. The two differ on
+    floats Python writes in exponent notation (1e+16 against 1e16, 1e-05
+    against 0.00001), on NaN and infinity, which DRF refuses, and on Decimals,
+    which DRF's encoder turns into such floats.
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, float):
+            if value and not (1e-4 <= abs(value) < 1e16):
+                return False  # Also catches NaN, which fails every comparison
+        elif isinstance(value, Decimal):
+            return False
+    return True
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    Output matches DRF's compact, unicode JSON. Serializer output (ReturnDict,
+    ReturnList and plain dicts) is encoded directly, without being copied into
+    intermediate containers first. Types orjson does not handle the same way as
+    DRF, such as datetimes, go through DRF's encoder, and data orjson would
+    write differently (see orjson_compatible) is rendered by DRF itself.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Pretty printing is only used by the browsable API; leave it to DRF.
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if not orjson_compatible(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                # Validation errors of list fields are keyed by index.
+                option=orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except TypeError:
+            # Integers beyond 64 bits, and anything else orjson refuses.
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as DRF, these are valid JSON but not valid JavaScript.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return ret
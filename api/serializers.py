@@ -1,14 +1,155 @@
+from collections import defaultdict
+
 from django.contrib.auth import authenticate, get_user_model
+from django.db.models import Exists, F, IntegerField, OuterRef, Value
 from django.utils import timezone
 
 from rest_framework import serializers
 
-from post.models import Post
-from users.models import Profile
+from exports.models import DataExport
+from notifications.models import Notification
+from post.captions import index_post
+from post.media import MAX_ITEMS, kind_of, store_media
+from post.models import ArchivedLike, Comment, Like, Post, PostMedia, Story
+from users.models import Follower, Profile
+
+from .caching import count_of
 
 User = get_user_model()
 
 
+def file_url(field, name, request=None):
+    """What DRF's ImageField renders for a stored file name, without a model."""
+    if not name:
+        return None
+    url = field.storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def like_count_of(prefix=""):
+    """Live likes plus the ones moved to ArchivedLike, as Post.like_count."""
+    return count_of(Like, post=OuterRef(f"{prefix}pk")) + F(
+        f"{prefix}archived_like_count"
+    )
+
+
+def liked_by(profile, prefix=""):
+    """Whether ``profile`` likes the post, recently or in the archive."""
+    return Exists(
+        Like.objects.filter(post=OuterRef(f"{prefix}pk"), profile=profile)
+    ) | Exists(
+        ArchivedLike.objects.filter(
+            post_id=OuterRef(f"{prefix}pk"), profile_id=profile.id
+        )
+    )
+
+
+def if_requested(name, fields, expression):
+    """``expression``, or a NULL placeholder when ``fields`` leaves ``name`` out."""
+    if fields is None or name in fields:
+        return expression
+    return Value(None, output_field=IntegerField())
+
+
+def requested_fields(request):
+    """The ``?fields=a,b`` query parameter as a set, or None for all fields."""
+    value = request.query_params.get("fields") if request is not None else None
+    if not value:
+        return None
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Takes a ``fields`` keyword (names to keep, or None for all) and drops every
+    other field before serialization, so unrequested counts and method fields
+    are never computed.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class FastPathMixin:
+    """
+    Read-only fast path for large lists.
+
+    ``fast_data`` fetches flat rows with ``values_list()`` and builds the output
+    dicts directly, without instantiating models or running DRF fields. The
+    queryset may be of any model that leads to the serialized one, with
+    ``prefix`` as the path to it (e.g. ``"post__"`` for a Like queryset).
+
+    Output must stay identical to ``Serializer(instances, many=True).data``.
+    ``fields`` works as for SparseFieldsMixin. Subqueries for fields left out
+    are not run, and the nested lists named in ``fast_prefetched`` are only
+    queried when requested.
+    """
+
+    fast_prefetched = ()
+
+    def __init_subclass__(cls, **kwargs):
+        # Serializer metaclasses rule out ABCMeta, so check at class creation.
+        super().__init_subclass__(**kwargs)
+        missing = [
+            name
+            for name in ("fast_queryset", "fast_representation")
+            if not hasattr(cls, name)
+        ]
+        if missing:
+            raise TypeError(f"{cls.__name__} must implement {', '.join(missing)}")
+
+    @classmethod
+    def fast_data(cls, queryset, context=None, prefix="", fields=None):
+        context = context or {}
+        rows = cls.fast_queryset(queryset, context, prefix, fields)
+        data = [cls.fast_representation(row, context) for row in rows]
+        if fields is None or not fields.isdisjoint(cls.fast_prefetched):
+            cls.fast_prefetch(data, context)
+        if fields is not None:
+            data = [
+                {name: value for name, value in item.items() if name in fields}
+                for item in data
+            ]
+        return data
+
+    # Subclasses implement:
+    #   fast_queryset(cls, queryset, context, prefix, fields) -> rows from
+    #       values_list(), the same columns whatever ``fields`` is
+    #   fast_representation(cls, row, context) -> the output dict of one row
+
+    @classmethod
+    def fast_prefetch(cls, data, context):
+        """Fill in nested lists for the whole page, one query per relation."""
+
+
+def attach_media(data, request=None):
+    """Fill each post's ``media`` list (left empty by the caller) in one query."""
+    lists = defaultdict(list)
+    for item in data:
+        lists[item["id"]].append(item["media"])
+    if not lists:
+        return
+    field = PostMedia._meta.get_field("file")
+    rows = PostMedia.objects.filter(post_id__in=lists).values_list(
+        "post_id", "id", "file", "kind"
+    )
+    for post_id, pk, name, kind in rows:
+        media = {"id": pk, "file": file_url(field, name, request), "kind": kind}
+        for target in lists[post_id]:
+            target.append(media)
+
+
+class PostMediaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PostMedia
+        fields = ["id", "file", "kind"]
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -41,13 +182,70 @@ class LoginSerializer(serializers.Serializer):
         return user
 
 
-class PostSerializers(serializers.ModelSerializer):
+class PostSerializers(SparseFieldsMixin, FastPathMixin, serializers.ModelSerializer):
+    media = PostMediaSerializer(many=True, read_only=True)
+    media_files = serializers.ListField(
+        child=serializers.FileField(),
+        write_only=True,
+        required=False,
+        max_length=MAX_ITEMS - 1,
+    )
+
     class Meta:
         model = Post
-        fields = ["id", "image", "description", "like_count"]
+        fields = ["id", "image", "description", "like_count", "media", "media_files"]
+
+    def validate_media_files(self, value):
+        for upload in value:
+            content_type = getattr(upload, "content_type", None) or ""
+            if not content_type.startswith(("image/", "video/")):
+                raise serializers.ValidationError(
+                    f"{upload.name} is not an image or a video."
+                )
+        return value
+
+    def create(self, validated_data):
+        uploads = validated_data.pop("media_files", [])
+        post = super().create(validated_data)
+        store_media(post, uploads)
+        index_post(post)
+        return post
+
+    def update(self, instance, validated_data):
+        validated_data.pop("media_files", None)
+        post = super().update(instance, validated_data)
+        if "description" in validated_data:
+            index_post(post)
+        return post
+
+    @classmethod
+    def fast_queryset(cls, queryset, context, prefix, fields):
+        n_likes = if_requested("like_count", fields, like_count_of(prefix))
+        return queryset.annotate(n_likes=n_likes).values_list(
+            f"{prefix}id", f"{prefix}image", f"{prefix}description", "n_likes"
+        )
+
+    @classmethod
+    def fast_representation(cls, row, context):
+        pk, image, description, like_count = row
+        return {
+            "id": pk,
+            "image": file_url(
+                Post._meta.get_field("image"), image, context.get("request")
+            ),
+            "description": description,
+            "like_count": like_count,
+            "media": [],
+        }
+
+    fast_prefetched = ("media",)
 
+    @classmethod
+    def fast_prefetch(cls, data, context):
+        attach_media(data, context.get("request"))
 
-class UserProfileSerializer(serializers.ModelSerializer):
+
+class UserProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     username = serializers.CharField(source="user.username", read_only=True)
     email = serializers.CharField(source="user.email", read_only=True)
     first_name = serializers.CharField(source="user.first_name")
@@ -103,7 +301,10 @@ class UserProfileSerializer(serializers.ModelSerializer):
         return False
 
     def get_likes(self, obj):
-        return obj.liked_by.count()
+        return (
+            obj.liked_by.count()
+            + ArchivedLike.objects.filter(profile_id=obj.id).count()
+        )
 
     def to_representation(self, instance):
         """Dynamically remove 'is_following' if user is viewing their own profile"""
@@ -120,7 +321,79 @@ class UserProfileSerializer(serializers.ModelSerializer):
         return data
 
 
-class UserProfileFollowerSerializer(serializers.ModelSerializer):
+class UserProfileBatchSerializer(UserProfileSerializer):
+    """
+    UserProfileSerializer for many profiles at once: counts are annotated by
+    ``batch_queryset`` and posts are taken from ``context["posts"]``, so the
+    number of queries does not grow with the number of profiles.
+    """
+
+    posts_count = serializers.IntegerField(source="n_posts", read_only=True)
+    follower_count = serializers.IntegerField(source="n_followers", read_only=True)
+    following_count = serializers.IntegerField(source="n_following", read_only=True)
+    posts = serializers.SerializerMethodField(read_only=True)
+
+    def get_is_following(self, obj):
+        request = self.context.get("request")
+
+        if request and request.user.is_authenticated:
+            if obj.user_id == request.user.id:
+                return None
+            return obj.viewer_follows
+        return False
+
+    def get_likes(self, obj):
+        return obj.n_likes_given
+
+    def get_posts(self, obj):
+        return self.context["posts"].get(obj.id, [])
+
+    @classmethod
+    def batch_queryset(cls, queryset, request, fields=None):
+        """Annotate what the requested ``fields`` need, and nothing else."""
+        profile = OuterRef("pk")
+        annotations = {
+            "posts_count": {"n_posts": count_of(Post, profile=profile)},
+            "follower_count": {
+                "n_followers": count_of(
+                    Follower, following=profile, follower__deleted_at=None
+                )
+            },
+            "following_count": {
+                "n_following": count_of(
+                    Follower, follower=profile, following__deleted_at=None
+                )
+            },
+            "is_following": {
+                "viewer_follows": Exists(
+                    Follower.objects.filter(
+                        following=profile, follower__user=request.user
+                    )
+                )
+            },
+            "likes": {
+                "n_likes_given": count_of(Like, profile=profile)
+                + count_of(ArchivedLike, profile_id=profile)
+            },
+        }
+        queryset = queryset.select_related("user")
+        for field, expressions in annotations.items():
+            if fields is None or field in fields:
+                queryset = queryset.annotate(**expressions)
+        return queryset
+
+    @classmethod
+    def batch_posts(cls, profile_ids, context):
+        """Every post of the profiles, rendered by PostSerializers, by profile id."""
+        posts = Post.objects.filter(profile_id__in=profile_ids).order_by("id")
+        owners = dict(posts.values_list("id", "profile_id"))
+        by_profile = defaultdict(list)
+        for item in PostSerializers.fast_data(posts, context):
+            by_profile[owners[item["id"]]].append(item)
+        return by_profile
+
+
+class UserProfileFollowerSerializer(FastPathMixin, serializers.ModelSerializer):
     username = serializers.CharField(source="user.username", read_only=True)
     email = serializers.CharField(source="user.email", read_only=True)
     first_name = serializers.CharField(source="user.first_name")
@@ -130,8 +403,36 @@ class UserProfileFollowerSerializer(serializers.ModelSerializer):
         model = Profile
         fields = ["id", "username", "email", "first_name", "last_name", "image"]
 
+    @classmethod
+    def fast_queryset(cls, queryset, context, prefix, fields):
+        return queryset.values_list(
+            f"{prefix}id",
+            f"{prefix}user__username",
+            f"{prefix}user__email",
+            f"{prefix}user__first_name",
+            f"{prefix}user__last_name",
+            f"{prefix}image",
+        )
 
-class UserHomePostSerializers(serializers.ModelSerializer):
+    @classmethod
+    def fast_representation(cls, row, context):
+        pk, username, email, first_name, last_name, image = row
+        return {
+            "id": pk,
+            "username": username,
+            "email": email,
+            "first_name": first_name,
+            "last_name": last_name,
+            "image": file_url(
+                Profile._meta.get_field("image"), image, context.get("request")
+            ),
+        }
+
+
+class UserHomePostSerializers(
+    SparseFieldsMixin, FastPathMixin, serializers.ModelSerializer
+):
+    media = PostMediaSerializer(many=True, read_only=True)
     username = serializers.CharField(source="profile.user.username")
     profile_image = serializers.CharField(source="profile.image.url")
     like_count = serializers.IntegerField(read_only=True)
@@ -144,6 +445,9 @@ class UserHomePostSerializers(serializers.ModelSerializer):
             "image",
             "description",
             "like_count",
+            "media",
+            "comment_count",
+            "comment_preview",
             "username",
             "profile_image",
             "is_liked",
@@ -154,6 +458,205 @@ class UserHomePostSerializers(serializers.ModelSerializer):
         request = self.context.get("request")
 
         if request and request.user:
-            if obj.likes.filter(profile=request.user.profile).exists():
+            profile = request.user.profile
+            if obj.likes.filter(profile=profile).exists():
                 return True
-            return False
+            return ArchivedLike.objects.filter(
+                post_id=obj.id, profile_id=profile.id
+            ).exists()
+
+    @classmethod
+    def fast_queryset(cls, queryset, context, prefix, fields):
+        request = context.get("request")
+        expressions = {
+            "n_likes": if_requested("like_count", fields, like_count_of(prefix))
+        }
+        if request and request.user:
+            expressions["liked"] = if_requested(
+                "is_liked", fields, liked_by(request.user.profile, prefix)
+            )
+        return queryset.annotate(**expressions).values_list(
+            f"{prefix}id",
+            f"{prefix}image",
+            f"{prefix}description",
+            f"{prefix}comment_count",
+            f"{prefix}comment_preview",
+            f"{prefix}profile__user__username",
+            f"{prefix}profile__image",
+            *expressions,
+        )
+
+    @classmethod
+    def fast_representation(cls, row, context):
+        request = context.get("request")
+        (
+            pk,
+            image,
+            description,
+            comment_count,
+            comment_preview,
+            username,
+            profile_image,
+            like_count,
+            *liked,
+        ) = row
+        return {
+            "id": pk,
+            "image": file_url(Post._meta.get_field("image"), image, request),
+            "description": description,
+            "like_count": like_count,
+            "media": [],
+            "comment_count": comment_count,
+            "comment_preview": comment_preview,
+            "username": username,
+            "profile_image": Profile._meta.get_field("image").storage.url(
+                profile_image
+            ),
+            "is_liked": liked[0] if liked else None,
+        }
+
+    fast_prefetched = ("media",)
+
+    @classmethod
+    def fast_prefetch(cls, data, context):
+        attach_media(data, context.get("request"))
+
+
+class CommentSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source="profile.user.username", read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ["id", "username", "text", "parent", "reply_count", "created_at"]
+        read_only_fields = ["reply_count"]
+
+    def validate_parent(self, parent):
+        post = self.context["post"]
+        if parent is not None and parent.post_id != post.id:
+            raise serializers.ValidationError("Comment is on a different post.")
+        # Threads are one level deep: replying to a reply joins its thread.
+        if parent is not None and parent.parent_id is not None:
+            parent = parent.parent
+        return parent
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    actors = serializers.SerializerMethodField(read_only=True)
+    text = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = Notification
+        fields = [
+            "id",
+            "verb",
+            "post",
+            "actors",
+            "actor_count",
+            "text",
+            "is_read",
+            "updated_at",
+        ]
+
+    def get_actors(self, obj):
+        """Usernames are batch loaded by the view into context["actors"]"""
+        actors = self.context.get("actors", {})
+        return [
+            {"id": actor_id, "username": actors[actor_id]}
+            for actor_id in obj.actor_ids
+            if actor_id in actors
+        ]
+
+    def get_text(self, obj):
+        actors = self.context.get("actors", {})
+        shown = [actor_id for actor_id in obj.actor_ids if actor_id in actors]
+        name = actors[shown[0]] if shown else None
+        # Deleted actors among the ones kept are not counted either.
+        others = obj.actor_count - 1 - (len(obj.actor_ids) - len(shown))
+        if others:
+            name = f"{name} and {others} other{'s' if others > 1 else ''}"
+        if obj.verb == Notification.LIKE:
+            return f"{name} liked your post"
+        return f"{name} started following you"
+
+
+class StorySerializer(serializers.ModelSerializer):
+    seen = serializers.BooleanField(read_only=True, default=False)
+
+    class Meta:
+        model = Story
+        fields = [
+            "id",
+            "media",
+            "kind",
+            "caption",
+            "seen",
+            "view_count",
+            "created_at",
+            "expires_at",
+        ]
+        read_only_fields = ["kind", "view_count", "expires_at"]
+
+    def validate_media(self, value):
+        content_type = getattr(value, "content_type", None) or ""
+        if not content_type.startswith(("image/", "video/")):
+            raise serializers.ValidationError(
+                f"{value.name} is not an image or a video."
+            )
+        return value
+
+    def create(self, validated_data):
+        validated_data["kind"] = kind_of(validated_data["media"])
+        return super().create(validated_data)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Only the author sees how many people watched.
+        request = self.context.get("request")
+        if request is None or instance.profile_id != request.user.profile.id:
+            data.pop("view_count")
+        return data
+
+
+class StoryTraySerializer(serializers.Serializer):
+    """One author's live stories, as grouped by post.stories.tray."""
+
+    def to_representation(self, stories):
+        profile = stories[0].profile
+        request = self.context.get("request")
+        return {
+            "profile": {
+                "id": profile.id,
+                "username": profile.user.username,
+                "image": file_url(
+                    Profile._meta.get_field("image"), profile.image.name, request
+                ),
+            },
+            "has_unseen": any(not story.seen for story in stories),
+            "stories": StorySerializer(stories, many=True, context=self.context).data,
+        }
+
+
+class DataExportSerializer(serializers.ModelSerializer):
+    progress = serializers.IntegerField(read_only=True)
+    download = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = DataExport
+        fields = [
+            "id",
+            "status",
+            "progress",
+            "section",
+            "rows_written",
+            "total_rows",
+            "download",
+            "created_at",
+            "finished_at",
+        ]
+
+    def get_download(self, obj):
+        if obj.status != DataExport.DONE:
+            return None
+        return self.context["request"].build_absolute_uri(
+            f"/api/user/export/{obj.id}/download/"
+        )
@@ -0,0 +1,147 @@
+import datetime
+import gzip
+
+from decimal import Decimal
+from unittest import skipIf
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from post.models import Post
+from users.models import Profile, User
+
+from .middleware import COMPRESSORS, CompressionMiddleware
+from .profiling import ProfileStore
+from .renderers import FastJSONRenderer, orjson
+from .throttling import buckets
+
+
+@override_settings(REQUEST_PROFILING={"BUFFER_SIZE": 20})
+class ProfileStoreTestCase(TestCase):
+    def setUp(self):
+        self.cache = caches["profiling"]
+        self.cache.clear()
+        self.addCleanup(self.cache.clear)
+
+    def test_ring_is_bounded(self):
+        store = ProfileStore()
+        ids = [f"{i:032x}" for i in range(60)]
+        for i, profile_id in enumerate(ids):
+            store.add({"id": profile_id, "started_at": f"{i:04d}"})
+
+        self.assertEqual([r["id"] for r in store.list()], ids[:-21:-1])
+        self.assertIsNone(store.get(ids[0]))
+        # Records that left the ring are gone from the cache too.
+        cached = self.cache.get_many([f"profiling:{i}" for i in ids])
+        self.assertEqual(sorted(cached), [f"profiling:{i}" for i in ids[-20:]])
+
+
+@override_settings(
+    REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": {"follow": "2/min", "comment": "2/min"},
+    }
+)
+class WriteThrottleTestCase(TestCase):
+    def setUp(self):
+        buckets.buckets.clear()
+        self.addCleanup(buckets.buckets.clear)
+        user = User.objects.create_user("owner", "owner@example.com", "password")
+        self.profile = Profile.objects.create(user=user)
+        self.client = APIClient()
+        self.client.cookies["access_token"] = str(AccessToken.for_user(user))
+
+    def test_reads_are_not_throttled(self):
+        post = Post.objects.create(profile=self.profile, image="profile/images/a.jpg")
+        for url in [
+            f"/api/user/profile/{self.profile.id}/follow/",
+            f"/api/post/{post.id}/comments/",
+        ]:
+            with self.subTest(url=url):
+                for _ in range(5):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+        url = f"/api/post/{post.id}/comments/"
+        statuses = [
+            self.client.post(url, {"text": str(i)}).status_code for i in range(3)
+        ]
+        self.assertEqual(statuses, [201, 201, 429])
+
+
+@skipIf(orjson is None, "orjson is not installed")
+class FastJSONRendererTestCase(TestCase):
+    def test_output_matches_drf(self):
+        payloads = [
+            {"id": 1, "text": "caf\u00e9 \u2028 \U0001f600", "items": [None, True]},
+            {"media_files": {0: ["Not a file."]}, "image": ["Required."]},
+            [1e16, 1e-5, 0.0001, 2.5, -0.0, 1 / 3, 123456789012345678.0],
+            {"at": datetime.datetime(2024, 1, 2, 3, 4, 5), "price": Decimal("1.50")},
+            {"huge": 2**70},
+            [],
+        ]
+        for data in payloads:
+            with self.subTest(data=data):
+                self.assertEqual(
+                    FastJSONRenderer().render(data), JSONRenderer().render(data)
+                )
+
+    def test_list_field_errors_are_a_bad_request(self):
+        user = User.objects.create_user("owner", "owner@example.com", "password")
+        Profile.objects.create(user=user)
+        client = APIClient()
+        client.cookies["access_token"] = str(AccessToken.for_user(user))
+        response = client.post("/api/user/posts/", {"media_files": ["text"]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("0", response.json()["media_files"])
+
+
+@override_settings(
+    RESPONSE_COMPRESSION={"MIN_SIZE": 100, "ENCODINGS": ["zstd", "br", "gzip"]}
+)
+class CompressionMiddlewareTestCase(TestCase):
+    body = b'{"description": "' + b"a" * 2000 + b'"}'
+
+    def respond(self, accept_encoding, response=None):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        response = response or HttpResponse(self.body)
+        response["ETag"] = '"v1"'
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiation(self):
+        available = [name for name in ("zstd", "br", "gzip") if name in COMPRESSORS]
+        for accept_encoding, expected in [
+            ("gzip, deflate", "gzip"),
+            ("gzip, br, zstd", available[0]),
+            ("*", available[0]),
+            ("gzip;q=0, identity", None),
+            ("*;q=0", None),
+            ("", None),
+        ]:
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.respond(accept_encoding)
+                self.assertEqual(response.get("Content-Encoding"), expected)
+                self.assertIn("Accept-Encoding", response["Vary"])
+                if expected is None:
+                    self.assertEqual(response.content, self.body)
+                    self.assertEqual(response["ETag"], '"v1"')
+                else:
+                    self.assertEqual(response["ETag"], 'W/"v1"')
+
+    def test_gzip_round_trip(self):
+        response = self.respond("gzip")
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+
+    def test_small_and_streaming_responses_are_left_alone(self):
+        small = self.respond("gzip", HttpResponse(b"{}"))
+        self.assertFalse(small.has_header("Content-Encoding"))
+
+        stream = self.respond("gzip", StreamingHttpResponse(iter([self.body])))
+        self.assertFalse(stream.has_header("Content-Encoding"))
+        self.assertEqual(b"".join(stream.streaming_content), self.body)
@@ -0,0 +1,133 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DEFAULTS = {
+    "CACHE": "default",
+    "SYNC_INTERVAL": 1.0,
+    "MAX_KEYS": 100_000,
+}
+
+
+def get_setting(name):
+    return getattr(settings, "THROTTLING", {}).get(name, DEFAULTS[name])
+
+
+def parse_rate(rate):
+    """'30/min' -> (capacity, tokens per second)."""
+    num, period = rate.split("/")
+    seconds = {"s": 1, "m": 60, "h": 3600, "d": 86400}[period[0]]
+    return int(num), int(num) / seconds
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated", "unsynced", "synced_total", "synced_at")
+
+    def __init__(self, capacity, now):
+        self.tokens = capacity
+        self.updated = now
+        self.unsynced = 0
+        self.synced_total = 0
+        self.synced_at = now
+
+
+class TokenBuckets:
+    """
+    Process-local token buckets, reconciled with a shared cache.
+
+    Every request is decided from memory. At most once per SYNC_INTERVAL per key,
+    the tokens this process spent are added to a shared counter, and whatever
+    other processes spent in the meantime is taken out of the local bucket. So
+    the limit holds across processes to within one sync interval, and a request
+    never costs a cache or database round trip.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+
+    def consume(self, key, capacity, refill_rate):
+        """Take a token. Returns 0 if allowed, else the seconds until one is free."""
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(capacity, now)
+                if len(self.buckets) > get_setting("MAX_KEYS"):
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+                bucket.tokens = min(
+                    capacity, bucket.tokens + (now - bucket.updated) * refill_rate
+                )
+                bucket.updated = now
+
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                bucket.unsynced += 1
+                wait = 0
+            else:
+                wait = (1 - bucket.tokens) / refill_rate
+
+            sync = now - bucket.synced_at >= get_setting("SYNC_INTERVAL")
+            if sync:
+                bucket.synced_at = now
+                spent, bucket.unsynced = bucket.unsynced, 0
+
+        if sync:
+            self.sync(key, bucket, spent, capacity, refill_rate)
+        return wait
+
+    def sync(self, key, bucket, spent, capacity, refill_rate):
+        cache = caches[get_setting("CACHE")]
+        cache_key = f"throttle:{key}"
+        # Long enough for a full bucket to refill, after which history is moot.
+        timeout = int(capacity / refill_rate) + 1
+        try:
+            cache.add(cache_key, 0, timeout)
+            total = cache.incr(cache_key, spent)
+        except Exception:
+            # The shared backend is an optimisation; local limits still apply.
+            return
+
+        with self.lock:
+            others = total - bucket.synced_total - spent
+            bucket.synced_total = total
+            if others > 0:
+                bucket.tokens = max(bucket.tokens - others, -capacity)
+
+
+buckets = TokenBuckets()
+
+
+class ScopedTokenBucketThrottle(BaseThrottle):
+    """
+    Per-user (or per-IP when anonymous) token bucket for views that set
+    ``throttle_scope``. Rates come from DEFAULT_THROTTLE_RATES, e.g. "30/min"
+    allows bursts of 30 and refills one token every two seconds.
+    """
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if rate is None:
+            return True
+
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+
+        capacity, refill_rate = parse_rate(rate)
+        self.wait_seconds = buckets.consume(f"{scope}:{ident}", capacity, refill_rate)
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
@@ -1,5 +1,7 @@
 from django.urls import path
 
+from live import views as live_views
+
 from . import views
 
 urlpatterns = [
@@ -9,6 +11,9 @@ urlpatterns = [
     # Profile
     path("user/profile/", views.UserProfileGenericView.as_view()),
     path("user/profile/<str:id>/", views.GetUserProfileGenericView.as_view()),
+    # Batch reads
+    path("batch/profiles/", views.ProfileBatchAPIView.as_view()),
+    path("batch/posts/", views.PostBatchAPIView.as_view()),
     # Follow request
     path("user/profile/<str:id>/follow/", views.FollowProfile.as_view()),
     path("user/profile/<str:id>/following/", views.FollowingProfile.as_view()),
@@ -18,7 +23,32 @@ urlpatterns = [
     path("user/posts/", views.PostGenericView.as_view()),
     path("user/posts/<str:id>/", views.PostGenericView.as_view()),
     path("post/<str:id>/like/", views.PostLikedAPIview.as_view()),
+    # Hashtags and post search
+    path("tags/<str:tag>/posts/", views.TagPostsAPIView.as_view()),
+    path("post/search/", views.PostSearchAPIView.as_view()),
+    path("post/<str:id>/", views.PostDetailAPIView.as_view()),
+    # Comments
+    path("post/<str:id>/comments/", views.CommentListCreateAPIView.as_view()),
+    path("comment/<str:id>/", views.CommentDeleteAPIView.as_view()),
+    path("comment/<str:id>/replies/", views.CommentRepliesAPIView.as_view()),
     # Home
     path("user/home/", views.GetPostByFollower.as_view()),
     path("user/liked/post/", views.getLikedPost.as_view()),
+    # Stories
+    path("user/stories/", views.StoryTrayAPIView.as_view()),
+    path("story/<str:id>/", views.StoryDetailAPIView.as_view()),
+    path("story/<str:id>/view/", views.StoryViewAPIView.as_view()),
+    path("story/<str:id>/viewers/", views.StoryViewersAPIView.as_view()),
+    # Notifications
+    path("user/notifications/", views.NotificationListAPIView.as_view()),
+    path("user/notifications/read/", views.NotificationReadAPIView.as_view()),
+    # Data export
+    path("user/export/", views.DataExportAPIView.as_view()),
+    path("user/export/<str:id>/download/", views.DataExportDownloadAPIView.as_view()),
+    # Request profiles (staff only)
+    path("debug/profiles/", views.ProfileListAPIView.as_view()),
+    path("debug/profiles/<str:id>/", views.ProfileDetailAPIView.as_view()),
+    path("debug/profiles/<str:id>/download/", views.ProfileDownloadAPIView.as_view()),
+    # Live updates
+    path("user/live/", live_views.event_stream),
 ]
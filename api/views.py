@@ -1,26 +1,64 @@
+import zlib
+
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.http import FileResponse, HttpResponse
+from django.utils import timezone
 from django.utils.timezone import timedelta
 
 from rest_framework import generics, status
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import (
+    SAFE_METHODS,
+    AllowAny,
+    IsAdminUser,
+    IsAuthenticated,
+)
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
-
-from post.models import Like, Post
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from exports.models import DataExport
+from notifications.models import Notification
+from outbox.models import OutboxJob
+from post.archive import add_to_counts
+from post.captions import HASHTAG_RE, MENTION_RE
+from post.cleanup import Purge
+from post.media import atomic_with_media
+from post.models import ArchivedLike, Comment, Like, Post, PostTerm, Story, StoryView
+from post.stories import live_stories, tray
 from users.models import Follower, Profile
-
+from users.revocation import revocations
+
+from .caching import conditional_get, feed_version, posts_version, profile_version
+from .pagination import (
+    CommentPagination,
+    NotificationPagination,
+    PostTermPagination,
+    StoryViewerPagination,
+)
+from .profiling import DETAIL_KEYS, ProfileStore, summary
 from .serializers import (
+    CommentSerializer,
+    DataExportSerializer,
     LoginSerializer,
+    NotificationSerializer,
     PostSerializers,
+    StorySerializer,
+    StoryTraySerializer,
     UserHomePostSerializers,
+    UserProfileBatchSerializer,
     UserProfileFollowerSerializer,
     UserProfileSerializer,
     UserSerializer,
+    requested_fields,
 )
 
 User = get_user_model()
 
+MAX_BATCH_IDS = 100
+
 
 class RegisterAPIview(APIView):
     permission_classes = [AllowAny]
@@ -40,6 +78,7 @@ class RegisterAPIview(APIView):
 
 class LoginAPIview(APIView):
     permission_classes = [AllowAny]
+    throttle_scope = "login"
 
     def post(self, request):
         data = request.data
@@ -82,10 +121,28 @@ class LoginAPIview(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def revoke_cookie_tokens(request):
+    """Revoke the access and refresh tokens the request carries in cookies."""
+    tokens = []
+    for cookie, token_class in (
+        ("access_token", AccessToken),
+        ("refresh_token", RefreshToken),
+    ):
+        # Passing None would mint a fresh token, so skip missing cookies.
+        if not request.COOKIES.get(cookie):
+            continue
+        try:
+            tokens.append(token_class(request.COOKIES[cookie]))
+        except TokenError:
+            pass  # Expired or forged: nothing to revoke
+    revocations.revoke(*tokens)
+
+
 class LogoutAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        revoke_cookie_tokens(request)
 
         response = Response(
             {"message": "Logged out successfully"}, status=status.HTTP_200_OK
@@ -97,23 +154,112 @@ class LogoutAPIView(APIView):
         return response
 
 
-class UserProfileGenericView(generics.RetrieveUpdateAPIView):
+class SparseFieldsViewMixin:
+    """Honours ``?fields=`` on GET by passing it on to the serializer."""
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == "GET":
+            kwargs.setdefault("fields", requested_fields(self.request))
+        return super().get_serializer(*args, **kwargs)
+
+    def wants(self, name):
+        fields = requested_fields(self.request)
+        return self.request.method != "GET" or fields is None or name in fields
+
+
+class WriteThrottleMixin:
+    """Applies ``throttle_scope`` to writes only; reads stay unthrottled."""
+
+    def get_throttles(self):
+        if self.request.method in SAFE_METHODS:
+            return []
+        return super().get_throttles()
+
+
+def requested_ids(request):
+    """``?ids=1,2,3`` as a list of distinct ints in request order."""
+    ids = []
+    for value in request.query_params.get("ids", "").split(","):
+        if value.strip():
+            try:
+                pk = int(value)
+            except ValueError:
+                raise ValueError(f"{value.strip()!r} is not an id.")
+            if pk not in ids:
+                ids.append(pk)
+    if not ids:
+        raise ValueError("Give a comma separated list of ids.")
+    if len(ids) > MAX_BATCH_IDS:
+        raise ValueError(f"At most {MAX_BATCH_IDS} ids per request.")
+    return ids
+
+
+class UserProfileGenericView(
+    SparseFieldsViewMixin, generics.RetrieveUpdateDestroyAPIView
+):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        return self.request.user.profile
+        profiles = Profile.objects.all()
+        if self.wants("posts"):
+            profiles = profiles.prefetch_related("posts__media")
+        return profiles.get(user=self.request.user)
+
+    @conditional_get(
+        lambda view, request: profile_version(
+            request, requested_fields(request), user=request.user
+        )
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        Delete the account: hidden at once, reclaimed in the background by the
+        profile.deleted job, since a cascade could touch millions of rows.
+        """
+        profile = self.get_object()
+        with transaction.atomic():
+            Profile.objects.filter(id=profile.id).update(
+                deleted_at=timezone.now(), updated_at=timezone.now()
+            )
+            User.objects.filter(id=request.user.id).update(is_active=False)
+            OutboxJob.objects.enqueue(
+                "profile.deleted",
+                {"profile_id": profile.id},
+                key=f"profile.deleted:{profile.id}",
+            )
+        revoke_cookie_tokens(request)
+
+        response = Response(status=status.HTTP_204_NO_CONTENT)
+        response.delete_cookie("access_token")
+        response.delete_cookie("refresh_token")
+        return response
 
 
-class GetUserProfileGenericView(generics.RetrieveAPIView):
+class GetUserProfileGenericView(SparseFieldsViewMixin, generics.RetrieveAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
-    queryset = Profile.objects.all()
     lookup_field = "id"
 
+    def get_queryset(self):
+        if self.wants("posts"):
+            return Profile.objects.prefetch_related("posts__media")
+        return Profile.objects.all()
+
+    @conditional_get(
+        lambda view, request, id: profile_version(
+            request, requested_fields(request), id=id
+        )
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
-class FollowProfile(APIView):
+
+class FollowProfile(WriteThrottleMixin, APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = "follow"
 
     def get(self, request, id):
         following_user_profile = Profile.objects.filter(id=id)
@@ -125,14 +271,11 @@ class FollowProfile(APIView):
             )
 
         followers = Follower.objects.filter(
-            following=following_user_profile.first()
-        ).select_related("follower")
-
-        follower_profiles = [f.follower for f in followers]
-
-        serializer = UserProfileFollowerSerializer(follower_profiles, many=True)
+            following=following_user_profile.first(), follower__deleted_at=None
+        )
+        data = UserProfileFollowerSerializer.fast_data(followers, prefix="follower__")
         return Response(
-            {"follower_count": followers.count(), "follower": serializer.data},
+            {"follower_count": len(data), "follower": data},
             status=status.HTTP_200_OK,
         )
 
@@ -163,9 +306,18 @@ class FollowProfile(APIView):
             )
 
         try:
-            Follower.objects.create(
-                follower=follower_user_profile, following=following_user_profile
-            )
+            with transaction.atomic():
+                follow = Follower.objects.create(
+                    follower=follower_user_profile, following=following_user_profile
+                )
+                OutboxJob.objects.enqueue(
+                    "profile.followed",
+                    {
+                        "follower_id": follower_user_profile.id,
+                        "following_id": following_user_profile.id,
+                    },
+                    key=f"profile.followed:{follow.id}",
+                )
         except Exception:
             return Response(
                 {"error": ["Something went wrong when creating a follow request"]}
@@ -196,7 +348,15 @@ class FollowProfile(APIView):
         )
 
         if follower.exists():
-            follower.delete()
+            with transaction.atomic():
+                follower.delete()
+                OutboxJob.objects.enqueue(
+                    "profile.unfollowed",
+                    {
+                        "follower_id": follower_user_profile.id,
+                        "following_id": following_user_profile.id,
+                    },
+                )
             return Response(
                 {"message": ["Successfully unfollow that profile"]},
                 status=status.HTTP_200_OK,
@@ -220,24 +380,24 @@ class FollowingProfile(APIView):
             )
 
         following = Follower.objects.filter(
-            follower=user_profile.first()
-        ).select_related("following")
-        following_profiles = [f.following for f in following]
-        serializer = UserProfileFollowerSerializer(following_profiles, many=True)
+            follower=user_profile.first(), following__deleted_at=None
+        )
+        data = UserProfileFollowerSerializer.fast_data(following, prefix="following__")
         return Response(
-            {"following_count": following.count(), "following_users": serializer.data},
+            {"following_count": len(data), "following_users": data},
             status=status.HTTP_200_OK,
         )
 
 
 class SearchUserAPIview(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = "search"
 
     def get(self, request):
         query = request.GET.get("query")
-        user = User.objects.filter(username__icontains=query).prefetch_related(
-            "profile"
-        )
+        user = User.objects.filter(
+            username__icontains=query, is_active=True, profile__deleted_at=None
+        ).prefetch_related("profile")
         if not user.exists():
             return Response(
                 {"message": "user is not found"}, status=status.HTTP_404_NOT_FOUND
@@ -259,31 +419,205 @@ class PostGenericView(generics.ListCreateAPIView):
         """Retrieve only the posts created by the logged-in user."""
         return Post.objects.filter(profile__user=self.request.user)
 
+    @conditional_get(
+        lambda view, request, id=None: posts_version(
+            request, **({"profile__id": id} if id else {"profile__user": request.user})
+        )
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        data = PostSerializers.fast_data(
+            self.get_queryset(),
+            context=self.get_serializer_context(),
+            fields=requested_fields(request),
+        )
+        return Response(data)
+
     def perform_create(self, serializer):
         profile = Profile.objects.get(user=self.request.user)
-        serializer.save(profile=profile)
+        with atomic_with_media():
+            post = serializer.save(profile=profile)
+            OutboxJob.objects.enqueue(
+                "post.created",
+                {"post_id": post.id, "profile_id": profile.id},
+                key=f"post.created:{post.id}",
+            )
 
 
 class GetPostByFollower(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(lambda view, request: feed_version(request))
     def get(self, request):
-        following_profiles = request.user.profile.following_users.all()
-        follower_profiles = [f.following for f in following_profiles]
-        posts = sorted(
-            [p for f in follower_profiles for p in f.posts.all()],
-            key=lambda post: post.created_at,
-            reverse=True,  # Descending order (latest first)
+        # Latest first, ties keep the order of the follow rows and then the posts.
+        posts = Post.objects.filter(
+            profile__followers__follower=request.user.profile
+        ).order_by("-created_at", "profile__followers__id", "id")
+
+        data = UserHomePostSerializers.fast_data(
+            posts, context={"request": request}, fields=requested_fields(request)
         )
+        return Response(data, status=status.HTTP_200_OK)
 
-        serializer = UserHomePostSerializers(
-            posts, many=True, context={"request": request}
+
+class PostTermListAPIView(generics.ListAPIView):
+    """
+    Posts matching caption terms, newest first, read from the PostTerm index.
+    Pages are cut on index rows, then the posts are loaded in one query.
+    """
+
+    permission_classes = [IsAuthenticated]
+    pagination_class = PostTermPagination
+
+    def get_terms(self):
+        raise NotImplementedError
+
+    def get_queryset(self):
+        terms = self.get_terms()
+        if not terms:
+            return PostTerm.objects.none()
+        (kind, term), *others = terms
+        queryset = PostTerm.objects.filter(
+            kind=kind, term=term, post__in=Post.objects.all()
         )
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Every other term must also be on the post.
+        for kind, term in others:
+            queryset = queryset.filter(
+                Exists(
+                    PostTerm.objects.filter(post=OuterRef("post"), kind=kind, term=term)
+                )
+            )
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        rows = PostTerm.objects.filter(id__in=[row.id for row in page]).order_by(
+            *self.paginator.ordering
+        )
+        data = UserHomePostSerializers.fast_data(
+            rows,
+            context={"request": request},
+            prefix="post__",
+            fields=requested_fields(request),
+        )
+        return self.paginator.get_paginated_response(data)
+
+
+class TagPostsAPIView(PostTermListAPIView):
+    def get_terms(self):
+        return [(PostTerm.TAG, self.kwargs["tag"].lstrip("#").lower())]
+
+
+class PostSearchAPIView(PostTermListAPIView):
+    """?query=#sunset @alice beach: words without a prefix are read as hashtags."""
+
+    throttle_scope = "search"
+
+    def get_terms(self):
+        terms = []
+        for word in self.request.GET.get("query", "").split():
+            if MENTION_RE.fullmatch(word):
+                terms.append((PostTerm.MENTION, word[1:].rstrip(".").lower()))
+            elif HASHTAG_RE.fullmatch(word) or HASHTAG_RE.fullmatch(f"#{word}"):
+                terms.append((PostTerm.TAG, word.lstrip("#").lower()))
+        return terms
+
+
+class ProfileBatchAPIView(APIView):
+    """
+    ``?ids=`` profiles in one request, as user/profile/<id>/ renders them, with
+    a fixed number of queries. ``id`` is always included to match results.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            ids = requested_ids(request)
+        except ValueError as exc:
+            return Response({"ids": [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        fields = requested_fields(request)
+        if fields is not None:
+            fields.add("id")
+
+        profiles = UserProfileBatchSerializer.batch_queryset(
+            Profile.objects.filter(id__in=ids), request, fields
+        )
+        by_id = {profile.id: profile for profile in profiles}
+        context = {"request": request, "posts": {}}
+        if fields is None or "posts" in fields:
+            context["posts"] = UserProfileBatchSerializer.batch_posts(by_id, context)
+
+        serializer = UserProfileBatchSerializer(
+            [by_id[pk] for pk in ids if pk in by_id],
+            many=True,
+            fields=fields,
+            context=context,
+        )
+        return Response(
+            {
+                "results": serializer.data,
+                "not_found": [pk for pk in ids if pk not in by_id],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class PostBatchAPIView(APIView):
+    """``?ids=`` posts in one request, rendered as in the home feed."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            ids = requested_ids(request)
+        except ValueError as exc:
+            return Response({"ids": [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        fields = requested_fields(request)
+        if fields is not None:
+            fields.add("id")
+
+        data = UserHomePostSerializers.fast_data(
+            Post.objects.filter(id__in=ids),
+            context={"request": request},
+            fields=fields,
+        )
+        by_id = {item["id"]: item for item in data}
+        return Response(
+            {
+                "results": [by_id[pk] for pk in ids if pk in by_id],
+                "not_found": [pk for pk in ids if pk not in by_id],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class PostDetailAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, id):
+        """Hide the post now; the post.deleted job reclaims its rows in chunks."""
+        with transaction.atomic():
+            deleted = Post.objects.filter(id=id, profile__user=request.user).update(
+                deleted_at=timezone.now(), updated_at=timezone.now()
+            )
+            if not deleted:
+                return Response(
+                    {"message": ["post not found"]}, status=status.HTTP_404_NOT_FOUND
+                )
+            OutboxJob.objects.enqueue(
+                "post.deleted",
+                {"post_id": int(id), "profile_id": request.user.profile.id},
+                key=f"post.deleted:{id}",
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class PostLikedAPIview(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = "like"
 
     def post(self, request, id):
         post = Post.objects.filter(id=id)
@@ -292,11 +626,32 @@ class PostLikedAPIview(APIView):
                 {"message": ["post not found"]}, status=status.HTTP_404_NOT_FOUND
             )
         post = post.first()
-        liked, created = Like.objects.get_or_create(
-            post=post, profile=request.user.profile
-        )
+        payload = {
+            "post_id": post.id,
+            "author_id": post.profile_id,
+            "profile_id": request.user.profile.id,
+        }
+        with transaction.atomic():
+            # A like old enough to be archived is undone in the archive.
+            archived = ArchivedLike.objects.filter(
+                post_id=post.id, profile_id=request.user.profile.id
+            ).delete()[0]
+            if archived:
+                add_to_counts({post.id: -archived})
+                liked, created = None, False
+            else:
+                liked, created = Like.objects.get_or_create(
+                    post=post, profile=request.user.profile
+                )
+            if created:
+                OutboxJob.objects.enqueue(
+                    "post.liked", payload, key=f"post.liked:{liked.id}"
+                )
+            else:
+                if liked is not None:
+                    liked.delete()
+                OutboxJob.objects.enqueue("post.unliked", payload)
         if not created:
-            liked.delete()
             return Response(
                 {"message": ["successfully unlike post"]}, status=status.HTTP_200_OK
             )
@@ -310,14 +665,362 @@ class getLikedPost(APIView):
 
     def get(self, request):
         user_profile = request.user.profile
-        liked_Post = Like.objects.filter(profile=user_profile).select_related("post")
-        liked_Posts = [post.post for post in liked_Post]
-        serializers = PostSerializers(liked_Posts, many=True)
+        # Recent likes and the ones moved to ArchivedLike, oldest first.
+        live = Like.objects.filter(profile=user_profile).values_list(
+            "post_id", "created_at"
+        )
+        archived = ArchivedLike.objects.filter(profile_id=user_profile.id).values_list(
+            "post_id", "created_at"
+        )
+        post_ids = [
+            post_id
+            for post_id, _ in live.union(archived, all=True).order_by("created_at")
+        ]
+        fields = requested_fields(request)
+        posts = {
+            item["id"]: item
+            for item in PostSerializers.fast_data(
+                Post.objects.filter(id__in=post_ids),
+                fields=None if fields is None else fields | {"id"},
+            )
+        }
+        liked_Posts = [posts[pk] for pk in post_ids if pk in posts]
+        if fields is not None and "id" not in fields:
+            liked_Posts = [
+                {name: value for name, value in item.items() if name != "id"}
+                for item in liked_Posts
+            ]
         return Response(
             {
                 "message": "Successfully Retrived Liked Posts",
                 "total count": len(liked_Posts),
-                "posts": serializers.data,
+                "posts": liked_Posts,
             },
             status=status.HTTP_200_OK,
         )
+
+
+class CommentListCreateAPIView(WriteThrottleMixin, generics.ListCreateAPIView):
+    """Top-level comments of a post, oldest first."""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = CommentSerializer
+    pagination_class = CommentPagination
+    throttle_scope = "comment"
+
+    def get_queryset(self):
+        return Comment.objects.filter(
+            post_id=self.kwargs["id"],
+            parent=None,
+            post__in=Post.objects.all(),
+            profile__deleted_at=None,
+        ).select_related("profile__user")
+
+    def create(self, request, id):
+        post = Post.objects.filter(id=id).first()
+        if post is None:
+            return Response(
+                {"message": ["post not found"]}, status=status.HTTP_404_NOT_FOUND
+            )
+        key = request.headers.get("Idempotency-Key") or None
+        if key and len(key) > 64:
+            return Response(
+                {"message": ["Idempotency-Key is too long"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = self.get_serializer(
+            data=request.data, context={"request": request, "post": post}
+        )
+        serializer.is_valid(raise_exception=True)
+        fields = {"post": post, **serializer.validated_data}
+        profile = request.user.profile
+
+        with transaction.atomic():
+            if key:
+                comment, created = Comment.objects.get_or_create(
+                    profile=profile, idempotency_key=key, defaults=fields
+                )
+            else:
+                comment, created = (
+                    Comment.objects.create(profile=profile, **fields),
+                    True,
+                )
+            if not created and any(
+                getattr(comment, name) != value for name, value in fields.items()
+            ):
+                # The key was already spent on a different comment.
+                return Response(
+                    {"message": ["Idempotency-Key was used for another request"]},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            if created:
+                # Counters and the feed preview are recomputed by post.tasks.
+                OutboxJob.objects.enqueue(
+                    "post.commented",
+                    {
+                        "post_id": post.id,
+                        "author_id": post.profile_id,
+                        "profile_id": profile.id,
+                        "comment_id": comment.id,
+                        "parent_id": comment.parent_id,
+                    },
+                    key=f"post.commented:{comment.id}",
+                )
+
+        return Response(
+            CommentSerializer(comment).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class CommentRepliesAPIView(generics.ListAPIView):
+    """Replies in one comment's thread, oldest first."""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = CommentSerializer
+    pagination_class = CommentPagination
+
+    def get_queryset(self):
+        return Comment.objects.filter(
+            parent_id=self.kwargs["id"],
+            post__in=Post.objects.all(),
+            profile__deleted_at=None,
+        ).select_related("profile__user")
+
+
+class CommentDeleteAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, id):
+        profile = request.user.profile
+        comment = Comment.objects.filter(id=id).select_related("post").first()
+        if comment is None:
+            return Response(
+                {"message": ["comment not found"]}, status=status.HTTP_404_NOT_FOUND
+            )
+        # Authors may delete their comments, and post owners any comment.
+        if profile.id not in (comment.profile_id, comment.post.profile_id):
+            return Response(
+                {"message": ["You cannot delete this comment"]},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        with transaction.atomic():
+            comment.delete()
+            OutboxJob.objects.enqueue(
+                "post.comment_deleted",
+                {"post_id": comment.post_id, "parent_id": comment.parent_id},
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class StoryTrayAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = StoryTraySerializer(
+            tray(request.user.profile), many=True, context={"request": request}
+        )
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        serializer = StorySerializer(data=request.data, context={"request": request})
+        if serializer.is_valid():
+            serializer.save(profile=request.user.profile)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class StoryDetailAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, id):
+        stories = Story.objects.filter(id=id, profile=request.user.profile)
+        if not stories.exists():
+            return Response(
+                {"message": ["story not found"]}, status=status.HTTP_404_NOT_FOUND
+            )
+        Purge().delete_stories(stories)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class StoryViewAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, id):
+        profile = request.user.profile
+        story = live_stories().filter(id=id).first()
+        if story is None:
+            return Response(
+                {"message": ["story not found"]}, status=status.HTTP_404_NOT_FOUND
+            )
+        if story.profile_id != profile.id:
+            _, created = StoryView.objects.get_or_create(
+                story=story, profile=profile, defaults={"bucket": story.bucket}
+            )
+            if created:
+                Story.objects.filter(id=story.id).update(view_count=F("view_count") + 1)
+        return Response({"message": "Story viewed"}, status=status.HTTP_200_OK)
+
+
+class StoryViewersAPIView(generics.ListAPIView):
+    permission_classes = [IsAuthenticated]
+    pagination_class = StoryViewerPagination
+
+    def get_queryset(self):
+        return StoryView.objects.filter(
+            story_id=self.kwargs["id"],
+            story__profile=self.request.user.profile,
+            profile__deleted_at=None,
+        ).select_related("profile__user")
+
+    def list(self, request, id):
+        page = self.paginate_queryset(self.get_queryset())
+        data = [
+            {
+                "id": view.profile_id,
+                "username": view.profile.user.username,
+                "viewed_at": view.created_at,
+            }
+            for view in page
+        ]
+        return self.get_paginated_response(data)
+
+
+class NotificationListAPIView(generics.ListAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = NotificationSerializer
+    pagination_class = NotificationPagination
+
+    def get_queryset(self):
+        # Notifications about deleted posts go, as PostManager hides the posts.
+        return Notification.objects.filter(
+            Q(post=None) | Q(post__deleted_at=None, post__profile__deleted_at=None),
+            recipient=self.request.user.profile,
+        )
+
+    def list(self, request):
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(queryset)
+
+        # One query for every actor on the page instead of one per notification.
+        # Deleted profiles are left out, and so are notifications with no other
+        # actors.
+        actor_ids = {actor_id for n in page for actor_id in n.actor_ids}
+        actors = dict(
+            Profile.objects.filter(id__in=actor_ids).values_list("id", "user__username")
+        )
+        page = [n for n in page if any(a in actors for a in n.actor_ids)]
+        serializer = self.get_serializer(
+            page, many=True, context={"request": request, "actors": actors}
+        )
+        return self.paginator.get_paginated_response(
+            serializer.data, unread_count=queryset.filter(is_read=False).count()
+        )
+
+
+class NotificationReadAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        updated = Notification.objects.filter(
+            recipient=request.user.profile, is_read=False
+        ).update(is_read=True)
+        return Response(
+            {"message": "Notifications marked as read", "count": updated},
+            status=status.HTTP_200_OK,
+        )
+
+
+class DataExportAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        export = (
+            DataExport.objects.filter(profile=request.user.profile)
+            .order_by("-created_at")
+            .first()
+        )
+        if export is None:
+            return Response(
+                {"message": ["no export requested"]}, status=status.HTTP_404_NOT_FOUND
+            )
+        serializer = DataExportSerializer(export, context={"request": request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        profile = request.user.profile
+        with transaction.atomic():
+            # One export at a time: asking again returns the one in progress.
+            export = DataExport.objects.filter(
+                profile=profile,
+                status__in=[DataExport.PENDING, DataExport.RUNNING],
+            ).first()
+            if export is None:
+                export = DataExport.objects.create(profile=profile)
+                OutboxJob.objects.enqueue(
+                    "export.requested",
+                    {"export_id": export.id},
+                    key=f"export.requested:{export.id}",
+                )
+        serializer = DataExportSerializer(export, context={"request": request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class DataExportDownloadAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, id):
+        export = DataExport.objects.filter(
+            id=id, profile=request.user.profile, status=DataExport.DONE
+        ).first()
+        if export is None or not export.file:
+            return Response(
+                {"message": ["export not found"]}, status=status.HTTP_404_NOT_FOUND
+            )
+        # Streamed from storage in blocks, never read into memory whole.
+        return FileResponse(
+            export.file.open("rb"),
+            as_attachment=True,
+            filename=f"{request.user.username}-export.zip",
+        )
+
+
+class ProfileListAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        records = [summary(record) for record in ProfileStore().list()]
+        return Response(records, status=status.HTTP_200_OK)
+
+
+class ProfileDetailAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, id):
+        record = ProfileStore().get(id)
+        if record is None:
+            return Response(
+                {"message": ["profile not found"]}, status=status.HTTP_404_NOT_FOUND
+            )
+        data = summary(record)
+        data.update({key: record[key] for key in DETAIL_KEYS - {"pstats"}})
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class ProfileDownloadAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, id):
+        record = ProfileStore().get(id)
+        if record is None or record["pstats"] is None:
+            return Response(
+                {"message": ["profile not found"]}, status=status.HTTP_404_NOT_FOUND
+            )
+        # A pstats dump: open with pstats.Stats(path), snakeviz and the like.
+        response = HttpResponse(
+            zlib.decompress(record["pstats"]), content_type="application/octet-stream"
+        )
+        response["Content-Disposition"] = f'attachment; filename="{id}.prof"'
+        return response
@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from users.admin import ScalableAdmin
+
+from .models import DataExport
+
+
+@admin.register(DataExport)
+class DataExportAdmin(ScalableAdmin):
+    list_display = ["id", "profile", "status", "rows_written", "total_rows"]
+    list_select_related = ["profile__user"]
+    autocomplete_fields = ["profile"]
@@ -0,0 +1,212 @@
+import json
+import os
+import shutil
+import tempfile
+import uuid
+import zipfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.utils import timezone
+
+from post.models import ArchivedLike, Comment, Like, Post, PostMedia
+from users.models import Follower, Profile
+
+from .models import DataExport
+
+CHUNK_SIZE = 1000
+
+
+def chunks(queryset, *fields, chunk_size=CHUNK_SIZE):
+    """
+    Yield ``values()`` rows in primary-key chunks.
+
+    ``iterator()`` would hold one long query open, and MySQL drivers buffer the
+    whole result set client side anyway. Seeking past the last id keeps both the
+    query and the memory per chunk bounded.
+    """
+    last = 0
+    queryset = queryset.order_by("id").values("id", *fields)
+    while True:
+        rows = list(queryset.filter(id__gt=last)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]["id"]
+
+
+class ExportWriter:
+    """Streams one export's sections into a zip archive on local disk."""
+
+    def __init__(self, export, archive):
+        self.export = export
+        self.archive = archive
+        self.rows_written = 0
+        self.files = set()
+
+    def progress(self, section):
+        DataExport.objects.filter(id=self.export.id).update(
+            section=section, rows_written=self.rows_written, updated_at=timezone.now()
+        )
+
+    def write_json(self, name, data):
+        self.archive.writestr(name, json.dumps(data, cls=DjangoJSONEncoder, indent=2))
+
+    def write_ndjson(self, name, queryset, *fields, files=()):
+        """
+        One JSON object per line, a chunk at a time. The stored files named by
+        ``files`` are copied in afterwards, as zip entries are written one at a
+        time.
+        """
+        self.progress(name)
+        with self.archive.open(name, "w", force_zip64=True) as out:
+            for rows in chunks(queryset, *fields):
+                for row in rows:
+                    for field in files:
+                        row[field] = archive_path(row[field])
+                    line = json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+                    out.write(line.encode())
+                self.rows_written += len(rows)
+                self.progress(name)
+        for rows in chunks(queryset, *files):
+            for row in rows:
+                for field in files:
+                    self.copy_file(row[field])
+            # Copying can take longer than writing; keep the heartbeat going.
+            self.progress(name)
+
+    def copy_file(self, name):
+        """Copy a stored file to its ``archive_path``, once."""
+        path = archive_path(name)
+        if path is None or path in self.files:
+            return
+        self.files.add(path)
+        try:
+            source = default_storage.open(name, "rb")
+        except OSError:
+            # Referenced by the row but gone from storage; the row still says so.
+            return
+        # ZipInfo defaults to no compression: images and videos are compressed
+        # already.
+        with source, self.archive.open(
+            zipfile.ZipInfo(path), "w", force_zip64=True
+        ) as out:
+            shutil.copyfileobj(source, out)
+
+
+def archive_path(name):
+    return f"files/{name}" if name else None
+
+
+def sections(profile):
+    """(name, queryset, fields, file fields) for everything a profile owns."""
+    posts = Post.objects.filter(profile=profile)
+    return [
+        (
+            "posts.ndjson",
+            posts,
+            ("image", "description", "created_at", "updated_at"),
+            ("image",),
+        ),
+        (
+            "media.ndjson",
+            PostMedia.objects.filter(post__in=posts),
+            ("post_id", "file", "kind", "position", "created_at"),
+            ("file",),
+        ),
+        (
+            "comments.ndjson",
+            Comment.objects.filter(profile=profile),
+            ("post_id", "parent_id", "text", "created_at"),
+            (),
+        ),
+        (
+            "likes.ndjson",
+            Like.objects.filter(profile=profile),
+            ("post_id", "created_at"),
+            (),
+        ),
+        (
+            "archived_likes.ndjson",
+            ArchivedLike.objects.filter(profile_id=profile.id),
+            ("post_id", "created_at"),
+            (),
+        ),
+        (
+            "followers.ndjson",
+            Follower.objects.filter(following=profile, follower__deleted_at=None),
+            ("follower_id", "created_at"),
+            (),
+        ),
+        (
+            "following.ndjson",
+            Follower.objects.filter(follower=profile, following__deleted_at=None),
+            ("following_id", "created_at"),
+            (),
+        ),
+    ]
+
+
+def profile_data(profile):
+    return (
+        Profile.objects.filter(id=profile.id)
+        .annotate(
+            username=F("user__username"),
+            email=F("user__email"),
+            first_name=F("user__first_name"),
+            last_name=F("user__last_name"),
+        )
+        .values(
+            "id",
+            "username",
+            "email",
+            "first_name",
+            "last_name",
+            "image",
+            "bio",
+            "gender",
+            "created_at",
+            "updated_at",
+        )
+        .get()
+    )
+
+
+def build_export(export):
+    """
+    Write the profile's data to a zip of NDJSON files plus their images, and
+    attach it to ``export``. Rows are read in chunks and written straight to a
+    temporary file, so memory stays flat however much the profile has posted.
+    """
+    profile = export.profile
+    parts = sections(profile)
+    total = sum(queryset.count() for _, queryset, _, _ in parts)
+    DataExport.objects.filter(id=export.id).update(total_rows=total)
+
+    fd, path = tempfile.mkstemp(suffix=".zip")
+    try:
+        with os.fdopen(fd, "wb") as fp, zipfile.ZipFile(
+            fp, "w", compression=zipfile.ZIP_DEFLATED
+        ) as archive:
+            writer = ExportWriter(export, archive)
+            data = profile_data(profile)
+            writer.copy_file(data["image"])
+            data["image"] = archive_path(data["image"])
+            writer.write_json("profile.json", data)
+            for name, queryset, fields, files in parts:
+                writer.write_ndjson(name, queryset, *fields, files=files)
+
+        # The media root is publicly served, so the name must not be guessable.
+        with open(path, "rb") as fp:
+            export.file.save(f"{uuid.uuid4().hex}.zip", File(fp), save=False)
+    finally:
+        os.remove(path)
+
+    export.status = DataExport.DONE
+    export.rows_written = writer.rows_written
+    export.total_rows = total
+    export.section = ""
+    export.finished_at = timezone.now()
+    export.save()
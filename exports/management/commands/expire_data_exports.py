@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from exports.models import DataExport
+from post.cleanup import CHUNK_SIZE, Purge
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete data exports, and their archives, requested more than --days ago. "
+        "Meant to run daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7)
+        parser.add_argument("--batch-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["days"])
+        expired = DataExport.objects.filter(created_at__lt=before).exclude(
+            status=DataExport.RUNNING
+        )
+        # Each Purge has a chunk budget; keep going until nothing expired is left.
+        while not Purge(chunk_size=options["batch_size"]).delete_exports(expired):
+            pass
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted data exports requested before {before:%Y-%m-%d}"
+            )
+        )
@@ -0,0 +1,48 @@
+from django.db import models
+
+from users.models import Profile
+
+
+class DataExport(models.Model):
+    """A personal data archive, built in the background by exports.builder."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="exports"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    file = models.FileField(upload_to="exports", blank=True)
+    section = models.CharField(max_length=50, blank=True, default="")
+    rows_written = models.PositiveBigIntegerField(default=0)
+    total_rows = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Doubles as the builder's heartbeat while running.
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["profile", "-created_at"])
+        ]  # Latest export of a profile
+
+    def __str__(self):
+        return f"{self.profile_id} ({self.status})"
+
+    @property
+    def progress(self):
+        if self.status == self.DONE:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, self.rows_written * 100 // self.total_rows)
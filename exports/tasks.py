@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from outbox.registry import handler
+from outbox.worker import get_setting
+
+from .builder import build_export
+from .models import DataExport
+
+# A running export whose progress has not moved for this long lost its worker.
+# The builder reports progress after every chunk, far more often than this, and
+# twice the outbox lease means a job reclaimed from a slow but live worker still
+# finds the export claimed.
+STALE_AFTER = timedelta(seconds=2 * get_setting("LEASE_SECONDS"))
+
+
+def claim(export_id):
+    """
+    Mark an export as running, unless another worker is already building it.
+    A large export can outlive the outbox lease, and the reclaimed job must not
+    start a second copy.
+    """
+    now = timezone.now()
+    return DataExport.objects.filter(
+        Q(status__in=[DataExport.PENDING, DataExport.FAILED])
+        | Q(status=DataExport.RUNNING, updated_at__lt=now - STALE_AFTER),
+        id=export_id,
+    ).update(status=DataExport.RUNNING, rows_written=0, error="", updated_at=now)
+
+
+@handler("export.requested")
+def export_requested(payload):
+    if not claim(payload["export_id"]):
+        return
+    export = DataExport.objects.select_related("profile").get(id=payload["export_id"])
+    try:
+        build_export(export)
+    except Exception as exc:
+        DataExport.objects.filter(id=export.id).update(
+            status=DataExport.FAILED, error=str(exc)
+        )
+        # Let the outbox retry with backoff.
+        raise
@@ -0,0 +1,64 @@
+import shutil
+import tempfile
+import zipfile
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from post.cleanup import Purge, purge_profile
+from post.models import Post
+from users.models import Profile, User
+
+from .models import DataExport
+from .tasks import export_requested
+
+
+class DataExportTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+        user = User.objects.create_user("owner", "owner@example.com", "password")
+        self.profile = Profile.objects.create(user=user)
+        Post.objects.create(profile=self.profile, image="profile/images/a.jpg")
+
+    def build(self):
+        export = DataExport.objects.create(profile=self.profile)
+        export_requested({"export_id": export.id})
+        export.refresh_from_db()
+        return export
+
+    def test_build(self):
+        export = self.build()
+        self.assertEqual(export.status, DataExport.DONE)
+        self.assertEqual(export.rows_written, export.total_rows)
+        with zipfile.ZipFile(export.file.path) as archive:
+            self.assertIn("profile.json", archive.namelist())
+            self.assertEqual(len(archive.read("posts.ndjson").splitlines()), 1)
+
+    def test_purged_profile_takes_its_exports(self):
+        export = self.build()
+        storage = export.file.storage
+        self.assertTrue(storage.exists(export.file.name))
+
+        self.assertTrue(purge_profile(self.profile.id, Purge()))
+        self.assertFalse(DataExport.objects.exists())
+        self.assertFalse(storage.exists(export.file.name))
+
+    def test_expire_data_exports(self):
+        old, recent = self.build(), self.build()
+        DataExport.objects.filter(id=old.id).update(
+            created_at=old.created_at - timedelta(days=8)
+        )
+        call_command("expire_data_exports", stdout=StringIO())
+        self.assertEqual(
+            list(DataExport.objects.values_list("id", flat=True)), [recent.id]
+        )
+        self.assertFalse(old.file.storage.exists(old.file.name))
+        self.assertTrue(recent.file.storage.exists(recent.file.name))
@@ -2,6 +2,10 @@
 ASGI config for instagram project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+WebSocket connections to ``/ws/live/`` are served by the live updates app and
+everything else by Django. Serve it with an ASGI server, e.g.
+
+    daphne -b 0.0.0.0 -p 8000 instagram.asgi:application
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -13,4 +17,12 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "instagram.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from live.consumers import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket" and scope["path"] == "/ws/live/":
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
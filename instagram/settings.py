@@ -47,6 +47,10 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "users",
     "post",
+    "outbox",
+    "live",
+    "notifications",
+    "exports",
     "rest_framework",
     "corsheaders",
 ]
@@ -54,6 +58,9 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     # "users.middleware.JWTRefreshMiddleware",
     "corsheaders.middleware.CorsMiddleware",
+    "api.profiling.ProfilingMiddleware",
+    "api.middleware.CompressionMiddleware",
+    "users.middleware.TokenCookieMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -84,6 +91,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "instagram.wsgi.application"
 
+# Live updates (the /ws/live/ WebSocket and the api/user/live/ event stream) are
+# long-lived async connections and need the ASGI entry point, e.g.
+#   daphne -b 0.0.0.0 -p 8000 instagram.asgi:application
+# Under WSGI each open event stream would hold a worker, so it is refused there.
+ASGI_APPLICATION = "instagram.asgi.application"
+
 AUTH_USER_MODEL = "users.User"
 
 # Database
@@ -126,7 +139,68 @@ AUTHENTICATION_BACKENDS = [
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "users.authentication.JWTAuthenticationFromCookie",
-    )
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_THROTTLE_CLASSES": ("api.throttling.ScopedTokenBucketThrottle",),
+    "DEFAULT_THROTTLE_RATES": {
+        "login": "10/min",
+        "search": "30/min",
+        "follow": "30/min",
+        "like": "120/min",
+        "comment": "60/min",
+    },
+}
+
+# LocMemCache is per process, so with N workers the throttles below allow up to
+# N times their rate. In production point "default" at a shared backend such as
+# Redis or Memcached.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Request profiles, see REQUEST_PROFILING below.
+    "profiling": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "profiling",
+        "OPTIONS": {"MAX_ENTRIES": 100},
+    },
+}
+
+# In-process token buckets behind ScopedTokenBucketThrottle, reconciled with the
+# CACHE backend at most once per SYNC_INTERVAL seconds per client.
+THROTTLING = {
+    "CACHE": "default",
+    "SYNC_INTERVAL": 1.0,
+    "MAX_KEYS": 100_000,
+}
+
+# Negotiated response compression, see api.middleware.CompressionMiddleware.
+# br and zstd are used when the brotli/zstandard packages are installed.
+RESPONSE_COMPRESSION = {
+    "MIN_SIZE": 1024,
+    "ENCODINGS": ["zstd", "br", "gzip"],
+}
+
+# Background jobs written to the outbox table in the same transaction as the
+# change that caused them. Run them with `python manage.py run_outbox`.
+OUTBOX = {
+    "BATCH_SIZE": 100,
+    "THREADS": 4,
+    "MAX_ATTEMPTS": 5,
+    "LEASE_SECONDS": 300,
+    "POLL_INTERVAL": 1.0,
+}
+
+# Server-push updates over /ws/live/ (WebSocket) and api/user/live/ (SSE). Set
+# LIVE_BACKEND_URL to a redis:// URL to share events between server processes.
+LIVE_UPDATES = {
+    "BACKEND_URL": os.getenv("LIVE_BACKEND_URL"),
+    "QUEUE_SIZE": 100,
+    "BATCH_SIZE": 50,
+    "FLUSH_INTERVAL": 0.05,
 }
 
 
@@ -157,6 +231,31 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
 }
 
+# Revoked JTIs (logout, refresh rotation) are checked against a bloom filter that
+# every process rebuilds from the database each REFRESH_INTERVAL seconds, so an
+# access token revoked in one process is accepted by others for up to that long.
+# Refresh tokens are claimed through the database and are single use at once.
+TOKEN_REVOCATION = {
+    "REFRESH_INTERVAL": 30,
+    "CAPACITY": 100_000,
+    "FALSE_POSITIVE_RATE": 0.001,
+}
+
+# On-demand request profiling, see api.profiling.ProfilingMiddleware. Staff can
+# flag a request with the X-Profile header; SAMPLE_RATE profiles a fraction of
+# all requests. The last BUFFER_SIZE profiles are kept in CACHE, apart from the
+# default cache so large profiles never evict anything else, and served under
+# api/debug/profiles/ (use a shared cache to see every worker's profiles).
+REQUEST_PROFILING = {
+    "SAMPLE_RATE": float(os.getenv("PROFILE_SAMPLE_RATE", 0)),
+    "HEADER": "X-Profile",
+    "BUFFER_SIZE": 20,
+    "CACHE": "profiling",
+    "TIMEOUT": 24 * 3600,
+    "MAX_QUERIES": 500,
+    "TOP_FUNCTIONS": 40,
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import logging
+import threading
+import uuid
+
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "BACKEND_URL": None,
+    "QUEUE_SIZE": 100,
+    "BATCH_SIZE": 50,
+    "FLUSH_INTERVAL": 0.05,
+}
+
+
+def get_setting(name):
+    return getattr(settings, "LIVE_UPDATES", {}).get(name, DEFAULTS[name])
+
+
+class Subscription:
+    """
+    A single connection's mailbox.
+
+    The buffer is bounded: when a client cannot keep up, the oldest events are
+    dropped and counted so the client knows to refetch instead of the server
+    buffering without limit.
+    """
+
+    def __init__(self, broker, loop, size):
+        self.broker = broker
+        self.loop = loop
+        self.channels = set()
+        self.buffer = deque(maxlen=size)
+        self.dropped = 0
+        self.ready = asyncio.Event()
+
+    def append(self, event):
+        """Must run on the subscription's own event loop."""
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(event)
+        self.ready.set()
+
+    def add(self, *channels):
+        self.broker.add(self, channels)
+
+    def remove(self, *channels):
+        self.broker.remove(self, channels)
+
+    def close(self):
+        self.broker.remove(self, list(self.channels))
+
+    async def next_batch(self):
+        """
+        Wait for events, then linger for the flush interval so bursts (a popular
+        post collecting likes) go out as one frame.
+        """
+        await self.ready.wait()
+        await asyncio.sleep(get_setting("FLUSH_INTERVAL"))
+        batch_size = get_setting("BATCH_SIZE")
+        events = [
+            self.buffer.popleft() for _ in range(min(batch_size, len(self.buffer)))
+        ]
+        dropped, self.dropped = self.dropped, 0
+        if not self.buffer:
+            self.ready.clear()
+        return events, dropped
+
+
+def append_all(subscriptions, event):
+    for subscription in subscriptions:
+        subscription.append(event)
+
+
+class RedisBackend:
+    """Relays events between processes over a Redis pub/sub channel."""
+
+    channel = "live-updates"
+
+    def __init__(self, url, broker):
+        import redis
+
+        self.broker = broker
+        self.client = redis.Redis.from_url(url)
+        self.origin = uuid.uuid4().hex
+        self.listener = None
+
+    def publish(self, channel, event):
+        message = {"origin": self.origin, "channel": channel, "event": event}
+        self.client.publish(self.channel, json.dumps(message))
+
+    def start(self):
+        if self.listener is None:
+            self.listener = threading.Thread(target=self.listen, daemon=True)
+            self.listener.start()
+
+    def listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            try:
+                data = json.loads(message["data"])
+            except (TypeError, ValueError):
+                continue
+            if data.get("origin") != self.origin:
+                self.broker.deliver(data["channel"], data["event"])
+
+
+class Broker:
+    """In-process pub/sub, optionally shared between processes via a backend."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+        self.backend = None
+        self.backend_loaded = False
+
+    def get_backend(self):
+        if not self.backend_loaded:
+            self.backend_loaded = True
+            url = get_setting("BACKEND_URL")
+            if url:
+                try:
+                    self.backend = RedisBackend(url, self)
+                except ImportError:
+                    logger.warning("redis is not installed, live updates stay local")
+        return self.backend
+
+    def subscribe(self, *channels):
+        """Create a subscription bound to the running event loop."""
+        backend = self.get_backend()
+        if backend:
+            backend.start()
+        subscription = Subscription(
+            self, asyncio.get_running_loop(), get_setting("QUEUE_SIZE")
+        )
+        self.add(subscription, channels)
+        return subscription
+
+    def add(self, subscription, channels):
+        with self.lock:
+            for channel in channels:
+                self.subscribers[channel].add(subscription)
+                subscription.channels.add(channel)
+
+    def remove(self, subscription, channels):
+        with self.lock:
+            for channel in channels:
+                self.subscribers[channel].discard(subscription)
+                if not self.subscribers[channel]:
+                    del self.subscribers[channel]
+                subscription.channels.discard(channel)
+
+    def deliver(self, channel, event):
+        with self.lock:
+            subscriptions = list(self.subscribers.get(channel, ()))
+        # Fan out with one wakeup per event loop rather than one per connection.
+        by_loop = defaultdict(list)
+        for subscription in subscriptions:
+            by_loop[subscription.loop].append(subscription)
+        for loop, group in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(append_all, group, event)
+            except RuntimeError:
+                # The loop has shut down without closing its subscriptions.
+                for subscription in group:
+                    subscription.close()
+
+    def publish(self, channel, event):
+        """Send an event to every subscriber of ``channel``. Safe from any thread."""
+        self.deliver(channel, event)
+        backend = self.get_backend()
+        if backend:
+            try:
+                backend.publish(channel, event)
+            except Exception:
+                logger.exception("Failed to publish live update to the backend")
+
+
+broker = Broker()
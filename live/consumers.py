@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+from http.cookies import SimpleCookie
+
+from asgiref.sync import sync_to_async
+
+from users.authentication import JWTAuthenticationFromCookie
+from users.models import Follower, Profile
+
+from .broker import broker
+from .receivers import posts_channel, profile_channel
+
+
+@sync_to_async
+def get_channels(token):
+    """Resolve an access token to the channels its connection listens on."""
+    try:
+        # The same checks as every API request: unrevoked token, active user.
+        user = JWTAuthenticationFromCookie().user_from_access_token(token)
+    except Exception:
+        return None
+
+    profile_id = Profile.objects.filter(user=user).values_list("id", flat=True).first()
+    if profile_id is None:
+        return None
+
+    following = Follower.objects.filter(follower_id=profile_id).values_list(
+        "following_id", flat=True
+    )
+    return [profile_channel(profile_id)] + [posts_channel(pid) for pid in following]
+
+
+async def batches(subscription):
+    """Yield batches of events, keeping followed profiles' channels up to date."""
+    while True:
+        events, dropped = await subscription.next_batch()
+        for event in events:
+            if event["type"] == "following.added":
+                subscription.add(posts_channel(event["following_id"]))
+            elif event["type"] == "following.removed":
+                subscription.remove(posts_channel(event["following_id"]))
+        # A non-zero ``dropped`` tells the client it fell behind and should refetch.
+        yield {"events": events, "dropped": dropped}
+
+
+def get_cookie(scope, name):
+    for key, value in scope.get("headers", []):
+        if key == b"cookie":
+            morsel = SimpleCookie(value.decode("latin-1")).get(name)
+            return morsel.value if morsel else None
+    return None
+
+
+async def websocket_application(scope, receive, send):
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    channels = await get_channels(get_cookie(scope, "access_token"))
+    if channels is None:
+        await send({"type": "websocket.close", "code": 4401})
+        return
+
+    await send({"type": "websocket.accept"})
+    subscription = broker.subscribe(*channels)
+
+    async def pump():
+        async for batch in batches(subscription):
+            await send({"type": "websocket.send", "text": json.dumps(batch)})
+
+    task = asyncio.create_task(pump())
+    try:
+        # Anything the client sends (keepalives) is ignored until it disconnects.
+        while (await receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        task.cancel()
+        subscription.close()
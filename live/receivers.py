@@ -0,0 +1,43 @@
+from django.dispatch import receiver
+
+from outbox.signals import job_committed
+
+from .broker import broker
+
+
+def profile_channel(profile_id):
+    """Events addressed to one profile: likes on its posts, new followers."""
+    return f"profile:{profile_id}"
+
+
+def posts_channel(profile_id):
+    """New posts by a profile, subscribed to by everyone following it."""
+    return f"posts:{profile_id}"
+
+
+@receiver(job_committed)
+def publish_live_update(sender, topic, payload, **kwargs):
+    if topic == "post.created":
+        broker.publish(
+            posts_channel(payload["profile_id"]),
+            {"type": "post.created", **payload},
+        )
+    elif topic == "post.liked" and payload["author_id"] != payload["profile_id"]:
+        broker.publish(
+            profile_channel(payload["author_id"]), {"type": "post.liked", **payload}
+        )
+    elif topic == "profile.followed":
+        broker.publish(
+            profile_channel(payload["following_id"]),
+            {"type": "follower.added", **payload},
+        )
+        # Lets the follower's open connections start receiving the new posts.
+        broker.publish(
+            profile_channel(payload["follower_id"]),
+            {"type": "following.added", **payload},
+        )
+    elif topic == "profile.unfollowed":
+        broker.publish(
+            profile_channel(payload["follower_id"]),
+            {"type": "following.removed", **payload},
+        )
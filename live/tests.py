@@ -0,0 +1,176 @@
+import asyncio
+import json
+import threading
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import Follower, Profile, User
+
+from .broker import Broker, broker
+from .consumers import batches, websocket_application
+from .receivers import posts_channel, profile_channel
+
+LIVE_UPDATES = {
+    "BACKEND_URL": None,
+    "QUEUE_SIZE": 3,
+    "BATCH_SIZE": 2,
+    "FLUSH_INTERVAL": 0,
+}
+
+
+def create_profile(username):
+    user = User.objects.create_user(username, f"{username}@example.com", "password")
+    return Profile.objects.create(user=user)
+
+
+@override_settings(LIVE_UPDATES=LIVE_UPDATES)
+class BrokerTestCase(SimpleTestCase):
+    async def drain(self):
+        # Lets call_soon_threadsafe deliveries run.
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+    async def test_fan_out(self):
+        broker = Broker()
+        first = broker.subscribe("a")
+        second = broker.subscribe("a", "b")
+        broker.publish("a", {"n": 1})
+        broker.publish("b", {"n": 2})
+        broker.publish("c", {"n": 3})
+        await self.drain()
+
+        self.assertEqual(await first.next_batch(), ([{"n": 1}], 0))
+        self.assertEqual(await second.next_batch(), ([{"n": 1}, {"n": 2}], 0))
+        self.assertFalse(first.ready.is_set())
+
+        first.close()
+        second.remove("a")
+        self.assertEqual(dict(broker.subscribers), {"b": {second}})
+
+    async def test_publish_from_another_thread(self):
+        broker = Broker()
+        subscription = broker.subscribe("a")
+        thread = threading.Thread(target=broker.publish, args=("a", {"n": 1}))
+        thread.start()
+        thread.join()
+        batch = await asyncio.wait_for(subscription.next_batch(), timeout=1)
+        self.assertEqual(batch, ([{"n": 1}], 0))
+
+    async def test_slow_client_drops_oldest_events(self):
+        broker = Broker()
+        subscription = broker.subscribe("a")
+        for n in range(5):
+            broker.publish("a", {"n": n})
+        await self.drain()
+
+        # QUEUE_SIZE keeps the last three, BATCH_SIZE sends two at a time.
+        self.assertEqual(await subscription.next_batch(), ([{"n": 2}, {"n": 3}], 2))
+        self.assertEqual(await subscription.next_batch(), ([{"n": 4}], 0))
+        self.assertFalse(subscription.ready.is_set())
+
+    async def test_batches_follow_new_followings(self):
+        broker = Broker()
+        subscription = broker.subscribe(profile_channel(1))
+        stream = batches(subscription)
+        broker.publish(
+            profile_channel(1), {"type": "following.added", "following_id": 2}
+        )
+        await self.drain()
+        await anext(stream)
+        self.assertIn(posts_channel(2), subscription.channels)
+
+        broker.publish(posts_channel(2), {"type": "post.created", "profile_id": 2})
+        broker.publish(
+            profile_channel(1), {"type": "following.removed", "following_id": 2}
+        )
+        await self.drain()
+        batch = await anext(stream)
+        self.assertEqual(
+            [event["type"] for event in batch["events"]],
+            ["post.created", "following.removed"],
+        )
+        self.assertNotIn(posts_channel(2), subscription.channels)
+
+
+@override_settings(LIVE_UPDATES=LIVE_UPDATES)
+class LiveEndpointsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fan = create_profile("fan")
+        cls.author = create_profile("author")
+        Follower.objects.create(follower=cls.fan, following=cls.author)
+
+    def token(self):
+        return str(AccessToken.for_user(self.fan.user))
+
+    def test_event_stream_is_refused_under_wsgi(self):
+        client = APIClient()
+        client.cookies["access_token"] = self.token()
+        self.assertEqual(client.get("/api/user/live/").status_code, 503)
+
+    async def test_event_stream(self):
+        self.async_client.cookies["access_token"] = self.token()
+        response = await self.async_client.get("/api/user/live/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        stream = aiter(response.streaming_content)
+        chunk = asyncio.ensure_future(anext(stream))
+        while not broker.subscribers.get(posts_channel(self.author.id)):
+            await asyncio.sleep(0)
+        broker.publish(
+            posts_channel(self.author.id), {"type": "post.created", "post_id": 1}
+        )
+        data = await asyncio.wait_for(chunk, timeout=1)
+        # A client disconnecting cancels the pending read, as the ASGI handler does.
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+
+        self.assertEqual(
+            json.loads(data.decode().removeprefix("data: ")),
+            {"events": [{"type": "post.created", "post_id": 1}], "dropped": 0},
+        )
+        self.assertNotIn(posts_channel(self.author.id), broker.subscribers)
+
+    async def test_event_stream_requires_a_token(self):
+        response = await self.async_client.get("/api/user/live/")
+        self.assertEqual(response.status_code, 401)
+
+    async def websocket(self, cookie):
+        received, sent = asyncio.Queue(), asyncio.Queue()
+        await received.put({"type": "websocket.connect"})
+        scope = {
+            "type": "websocket",
+            "path": "/ws/live/",
+            "headers": [(b"cookie", cookie.encode())],
+        }
+        task = asyncio.ensure_future(
+            websocket_application(scope, received.get, sent.put)
+        )
+        return task, received, sent
+
+    async def test_websocket(self):
+        token = self.token()
+        task, received, sent = await self.websocket(f"access_token={token}")
+        self.assertEqual(await sent.get(), {"type": "websocket.accept"})
+
+        broker.publish(profile_channel(self.fan.id), {"type": "follower.added"})
+        message = await asyncio.wait_for(sent.get(), timeout=1)
+        self.assertEqual(
+            json.loads(message["text"]),
+            {"events": [{"type": "follower.added"}], "dropped": 0},
+        )
+
+        await received.put({"type": "websocket.disconnect"})
+        await asyncio.wait_for(task, timeout=1)
+        self.assertNotIn(profile_channel(self.fan.id), broker.subscribers)
+
+    async def test_websocket_rejects_a_bad_token(self):
+        task, _, sent = await self.websocket("access_token=nope")
+        await asyncio.wait_for(task, timeout=1)
+        self.assertEqual(await sent.get(), {"type": "websocket.close", "code": 4401})
@@ -0,0 +1,34 @@
+import json
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .broker import broker
+from .consumers import batches, get_channels
+
+
+async def event_stream(request):
+    """Server-sent events fallback for clients that cannot open a WebSocket."""
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would buffer the endless stream and be held by it.
+        return JsonResponse(
+            {"detail": "Live updates are only served over ASGI."}, status=503
+        )
+    channels = await get_channels(request.COOKIES.get("access_token"))
+    if channels is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+
+    async def events():
+        subscription = broker.subscribe(*channels)
+        try:
+            async for batch in batches(subscription):
+                yield f"data: {json.dumps(batch)}\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
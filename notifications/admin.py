@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from users.admin import ScalableAdmin
+
+from .models import Notification, NotificationActor
+
+
+@admin.register(Notification)
+class NotificationAdmin(ScalableAdmin):
+    list_display = ["id", "recipient", "verb", "actor_count", "is_read", "updated_at"]
+    list_select_related = ["recipient__user"]
+    raw_id_fields = ["post"]
+    autocomplete_fields = ["recipient"]
+
+
+@admin.register(NotificationActor)
+class NotificationActorAdmin(ScalableAdmin):
+    list_display = ["id", "notification", "actor", "created_at"]
+    raw_id_fields = ["notification", "actor"]
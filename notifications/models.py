@@ -0,0 +1,67 @@
+from django.db import models
+
+from post.models import Post
+from users.models import Profile
+
+
+class Notification(models.Model):
+    """
+    One inbox row per aggregated activity, e.g. "X and 41 others liked your post".
+
+    Rows are built by the outbox worker when likes and follows happen, so reading
+    the inbox is a single scan of the (recipient, updated_at) index.
+    """
+
+    LIKE = "like"
+    FOLLOW = "follow"
+    VERB_CHOICES = [
+        (LIKE, "Like"),
+        (FOLLOW, "Follow"),
+    ]
+
+    recipient = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="notifications"
+    )
+    verb = models.CharField(max_length=20, choices=VERB_CHOICES)
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+    actor_ids = models.JSONField(default=list)  # Most recent actors first
+    actor_count = models.PositiveIntegerField(default=1)
+    window_start = models.DateTimeField()
+    is_read = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["recipient", "-updated_at", "-id"]),
+            models.Index(fields=["recipient", "is_read"]),
+            models.Index(fields=["recipient", "verb", "post", "window_start"]),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} {self.verb} x{self.actor_count}"
+
+
+class NotificationActor(models.Model):
+    """
+    Who is already counted in a notification. ``actor_ids`` only keeps the most
+    recent few, so dedupe happens here, against a unique constraint.
+    """
+
+    notification = models.ForeignKey(
+        Notification, on_delete=models.CASCADE, related_name="actors"
+    )
+    actor = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["notification", "actor"], name="unique_notification_actor"
+            )
+        ]
+        indexes = [models.Index(fields=["actor"])]  # Cleanup of deleted profiles
+
+    def __str__(self):
+        return f"{self.actor_id} in {self.notification_id}"
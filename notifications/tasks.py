@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from outbox.registry import handler
+from users.models import Profile
+
+from .models import Notification, NotificationActor
+
+# Activity on the same target within this window is folded into one row.
+AGGREGATION_WINDOW = timedelta(hours=6)
+ACTORS_KEPT = 3
+
+
+def record(recipient_id, verb, actor_id, post_id=None):
+    now = timezone.now()
+    with transaction.atomic():
+        # Serialize activity per recipient, so two workers cannot both find no
+        # group and each create one.
+        if not Profile.all_objects.select_for_update().filter(id=recipient_id):
+            return
+        notification = (
+            Notification.objects.filter(
+                recipient_id=recipient_id,
+                verb=verb,
+                post_id=post_id,
+                window_start__gte=now - AGGREGATION_WINDOW,
+            )
+            .order_by("-window_start")
+            .first()
+        )
+        if notification is None:
+            notification = Notification.objects.create(
+                recipient_id=recipient_id,
+                verb=verb,
+                post_id=post_id,
+                actor_ids=[actor_id],
+                window_start=now,
+            )
+            NotificationActor.objects.create(
+                notification=notification, actor_id=actor_id
+            )
+            return
+
+        # Retried jobs, and actors who undo and redo, must not count twice.
+        _, created = NotificationActor.objects.get_or_create(
+            notification=notification, actor_id=actor_id
+        )
+        if not created:
+            return
+        notification.actor_ids = [actor_id] + notification.actor_ids[: ACTORS_KEPT - 1]
+        notification.actor_count += 1
+        notification.is_read = False
+        notification.save(
+            update_fields=["actor_ids", "actor_count", "is_read", "updated_at"]
+        )
+
+
+@handler("post.liked")
+def notify_like(payload):
+    if payload["author_id"] != payload["profile_id"]:
+        record(
+            payload["author_id"],
+            Notification.LIKE,
+            payload["profile_id"],
+            post_id=payload["post_id"],
+        )
+
+
+@handler("profile.followed")
+def notify_follow(payload):
+    record(payload["following_id"], Notification.FOLLOW, payload["follower_id"])
@@ -0,0 +1,27 @@
+from django.test import TestCase
+
+from users.models import Profile, User
+
+from .models import Notification, NotificationActor
+from .tasks import record
+
+
+def create_profile(username):
+    user = User.objects.create_user(username, f"{username}@example.com", "password")
+    return Profile.objects.create(user=user)
+
+
+class RecordTestCase(TestCase):
+    def test_each_actor_counts_once(self):
+        owner = create_profile("owner")
+        fans = [create_profile(f"fan{i}") for i in range(5)]
+        for fan in fans:
+            record(owner.id, Notification.FOLLOW, fan.id)
+        # A retried job, and one long out of the kept actor ids.
+        record(owner.id, Notification.FOLLOW, fans[-1].id)
+        record(owner.id, Notification.FOLLOW, fans[0].id)
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 5)
+        self.assertEqual(notification.actor_ids, [f.id for f in fans[:1:-1]])
+        self.assertEqual(NotificationActor.objects.count(), 5)
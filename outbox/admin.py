@@ -0,0 +1,9 @@
+from django.contrib import admin
+
+from .models import OutboxJob
+
+
+@admin.register(OutboxJob)
+class OutboxJobAdmin(admin.ModelAdmin):
+    list_display = ["id", "topic", "status", "attempts", "run_after", "created_at"]
+    list_filter = ["status", "topic"]
@@ -0,0 +1,58 @@
+import multiprocessing
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from outbox import worker
+
+
+class Command(BaseCommand):
+    help = "Run outbox jobs in a pool of threads, optionally across several processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, help="Threads per process.")
+        parser.add_argument(
+            "--processes", type=int, default=1, help="Worker processes to fork."
+        )
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--max-attempts", type=int)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once there are no due jobs left instead of polling.",
+        )
+        parser.add_argument(
+            "--purge-days",
+            type=int,
+            help="Delete finished jobs older than this many days, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options["purge_days"] is not None:
+            deleted = worker.purge(timedelta(days=options["purge_days"]))
+            self.stdout.write(f"Purged {deleted} finished jobs")
+            return
+
+        kwargs = {
+            "threads": options["threads"],
+            "batch_size": options["batch_size"],
+            "max_attempts": options["max_attempts"],
+            "once": options["once"],
+        }
+        if options["processes"] <= 1:
+            processed = worker.run(**kwargs)
+            self.stdout.write(f"Processed {processed} jobs")
+            return
+
+        # Children must not share the parent's database connections.
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=worker.run, kwargs=kwargs, daemon=True)
+            for _ in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
@@ -0,0 +1,67 @@
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+from .signals import job_committed
+
+
+class OutboxJobManager(models.Manager):
+    def enqueue(self, topic, payload=None, key=None):
+        """
+        Record a job in the caller's transaction, so it is only visible to workers
+        once the model change that produced it has committed.
+
+        Jobs with an idempotency ``key`` that already exists are ignored, and None
+        is returned for them.
+        """
+        job = self.model(topic=topic, payload=payload or {}, idempotency_key=key)
+        try:
+            # A savepoint, so a duplicate key leaves the caller's transaction usable.
+            with transaction.atomic():
+                job.save(force_insert=True)
+        except IntegrityError:
+            if key is None:
+                raise
+            return None
+        # Only for rows actually inserted, or a retried request would be pushed
+        # to live clients twice.
+        transaction.on_commit(
+            lambda: job_committed.send(
+                sender=self.model, topic=job.topic, payload=job.payload
+            )
+        )
+        return job
+
+
+class OutboxJob(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    idempotency_key = models.CharField(
+        max_length=255, unique=True, null=True, blank=True
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = OutboxJobManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"])
+        ]  # Index for claiming due jobs
+
+    def __str__(self):
+        return f"{self.topic} ({self.status})"
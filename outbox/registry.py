@@ -0,0 +1,22 @@
+from collections import defaultdict
+
+_handlers = defaultdict(list)
+
+
+def handler(topic):
+    """
+    Register a function to run for every outbox job with the given topic.
+
+    Handlers receive the job payload and may run more than once for the same job
+    (retries, a worker dying mid-batch), so they must be idempotent.
+    """
+
+    def decorator(func):
+        _handlers[topic].append(func)
+        return func
+
+    return decorator
+
+
+def handlers_for(topic):
+    return _handlers.get(topic, [])
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent in-process once the transaction that enqueued a job has committed, with
+# ``topic`` and ``payload``. Receivers must be cheap; real work belongs in tasks.py.
+job_committed = Signal()
@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import registry, worker
+from .models import OutboxJob
+from .signals import job_committed
+
+
+class EnqueueTestCase(TestCase):
+    def setUp(self):
+        self.sent = []
+
+        def receiver(sender, topic, payload, **kwargs):
+            self.sent.append((topic, payload))
+
+        job_committed.connect(receiver, weak=False)
+        self.addCleanup(job_committed.disconnect, receiver)
+
+    def test_enqueue_commits_with_the_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                job = OutboxJob.objects.enqueue("test.topic", {"n": 1})
+                self.assertEqual(self.sent, [])
+        self.assertEqual(OutboxJob.objects.get().id, job.id)
+        self.assertEqual(job.status, OutboxJob.PENDING)
+        self.assertEqual(self.sent, [("test.topic", {"n": 1})])
+
+    def test_rollback_discards_the_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    OutboxJob.objects.enqueue("test.topic", {"n": 1})
+                    raise RuntimeError
+        self.assertFalse(OutboxJob.objects.exists())
+        self.assertEqual(self.sent, [])
+
+    def test_duplicate_key_is_ignored(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                first = OutboxJob.objects.enqueue("test.topic", {"n": 1}, key="k")
+                again = OutboxJob.objects.enqueue("test.topic", {"n": 2}, key="k")
+                # The caller's transaction is still usable.
+                OutboxJob.objects.enqueue("test.topic", {"n": 3})
+        self.assertIsNotNone(first)
+        self.assertIsNone(again)
+        self.assertEqual(
+            sorted(OutboxJob.objects.values_list("payload", flat=True), key=str),
+            [{"n": 1}, {"n": 3}],
+        )
+        self.assertEqual([payload for _, payload in self.sent], [{"n": 1}, {"n": 3}])
+
+
+class WorkerTestCase(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.fail = False
+
+        def run(payload):
+            self.calls.append(payload)
+            if self.fail:
+                raise ValueError("boom")
+
+        registry.handler("test.topic")(run)
+        self.addCleanup(registry._handlers.pop, "test.topic")
+
+    def job(self, **fields):
+        return OutboxJob.objects.create(topic="test.topic", **fields)
+
+    def test_claim(self):
+        now = timezone.now()
+        due = self.job()
+        self.job(run_after=now + timedelta(minutes=1))
+        stale = self.job(status=OutboxJob.RUNNING)
+        fresh = self.job(status=OutboxJob.RUNNING)
+        self.job(status=OutboxJob.DONE)
+        OutboxJob.objects.filter(id=stale.id).update(
+            updated_at=now - timedelta(seconds=600)
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            jobs = worker.claim(batch_size=10, lease_seconds=300)
+        self.assertEqual([job.id for job in jobs], [due.id, stale.id])
+        self.assertEqual([job.attempts for job in jobs], [1, 1])
+        if connection.features.has_select_for_update_skip_locked:
+            self.assertIn("SKIP LOCKED", queries[0]["sql"].upper())
+        # Claimed jobs hold a fresh lease, so nobody else picks them up.
+        self.assertEqual(worker.claim(batch_size=10, lease_seconds=300), [])
+        self.assertEqual(OutboxJob.objects.get(id=fresh.id).attempts, 0)
+
+    def test_claim_respects_batch_size(self):
+        for _ in range(3):
+            self.job()
+        self.assertEqual(len(worker.claim(batch_size=2, lease_seconds=300)), 2)
+        self.assertEqual(len(worker.claim(batch_size=2, lease_seconds=300)), 1)
+
+    def test_retry_with_backoff_then_fail(self):
+        self.fail = True
+        self.job(payload={"n": 1})
+
+        [job] = worker.claim(batch_size=10, lease_seconds=300)
+        with self.assertLogs("outbox.worker", "ERROR"):
+            self.assertFalse(worker.execute(job, max_attempts=2))
+        job.refresh_from_db()
+        self.assertEqual(job.status, OutboxJob.PENDING)
+        self.assertIn("boom", job.last_error)
+        delay = (job.run_after - timezone.now()).total_seconds()
+        self.assertTrue(0 < delay <= 2, delay)
+        self.assertEqual(worker.claim(batch_size=10, lease_seconds=300), [])
+
+        OutboxJob.objects.update(run_after=timezone.now())
+        [job] = worker.claim(batch_size=10, lease_seconds=300)
+        with self.assertLogs("outbox.worker", "ERROR"):
+            self.assertFalse(worker.execute(job, max_attempts=2))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (OutboxJob.FAILED, 2))
+        self.assertEqual(self.calls, [{"n": 1}, {"n": 1}])
+
+    def test_run_once_drains_the_queue(self):
+        for n in range(3):
+            self.job(payload={"n": n})
+        self.assertEqual(worker.run(threads=1, once=True), 3)
+        self.assertEqual(
+            set(OutboxJob.objects.values_list("status", flat=True)), {OutboxJob.DONE}
+        )
+        self.assertEqual(sorted(call["n"] for call in self.calls), [0, 1, 2])
+
+    def test_purge(self):
+        old, recent = self.job(status=OutboxJob.DONE), self.job(status=OutboxJob.DONE)
+        failed = self.job(status=OutboxJob.FAILED)
+        OutboxJob.objects.filter(id__in=[old.id, failed.id]).update(
+            updated_at=timezone.now() - timedelta(days=10)
+        )
+        self.assertEqual(worker.purge(timedelta(days=7), batch_size=1), 1)
+        self.assertEqual(
+            sorted(OutboxJob.objects.values_list("id", flat=True)),
+            [recent.id, failed.id],
+        )
@@ -0,0 +1,146 @@
+import logging
+import time
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboxJob
+from .registry import handlers_for
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "BATCH_SIZE": 100,
+    "THREADS": 4,
+    "MAX_ATTEMPTS": 5,
+    "LEASE_SECONDS": 300,
+    "POLL_INTERVAL": 1.0,
+}
+
+
+def get_setting(name):
+    return getattr(settings, "OUTBOX", {}).get(name, DEFAULTS[name])
+
+
+def claim(batch_size, lease_seconds):
+    """
+    Atomically mark a batch of due jobs as running and return them.
+
+    Jobs left running longer than the lease (their worker died) are reclaimed.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            OutboxJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=OutboxJob.PENDING, run_after__lte=now)
+                | Q(
+                    status=OutboxJob.RUNNING,
+                    updated_at__lt=now - timedelta(seconds=lease_seconds),
+                )
+            )
+            .order_by("id")[:batch_size]
+        )
+        OutboxJob.objects.filter(id__in=[job.id for job in jobs]).update(
+            status=OutboxJob.RUNNING, attempts=F("attempts") + 1, updated_at=now
+        )
+    for job in jobs:
+        job.attempts += 1
+    return jobs
+
+
+def execute(job, max_attempts):
+    try:
+        for func in handlers_for(job.topic):
+            func(job.payload)
+    except Exception:
+        logger.exception("Outbox job %s (%s) failed", job.id, job.topic)
+        if job.attempts >= max_attempts:
+            fields = {"status": OutboxJob.FAILED}
+        else:
+            # Exponential backoff: 2s, 4s, 8s, ... capped at ten minutes.
+            delay = min(2**job.attempts, 600)
+            fields = {
+                "status": OutboxJob.PENDING,
+                "run_after": timezone.now() + timedelta(seconds=delay),
+            }
+        OutboxJob.objects.filter(id=job.id).update(
+            last_error=traceback.format_exc(), updated_at=timezone.now(), **fields
+        )
+        return False
+
+    OutboxJob.objects.filter(id=job.id).update(
+        status=OutboxJob.DONE, updated_at=timezone.now()
+    )
+    return True
+
+
+def execute_in_thread(job, max_attempts):
+    # Pool threads keep their own connection between jobs, drop it if it went stale.
+    close_old_connections()
+    return execute(job, max_attempts)
+
+
+def run_batch(executor, batch_size, max_attempts, lease_seconds):
+    """
+    Claim one batch and run it, on the thread pool if there is one.
+
+    Returns the number of jobs claimed.
+    """
+    jobs = claim(batch_size, lease_seconds)
+    if executor is None:
+        for job in jobs:
+            execute(job, max_attempts)
+    else:
+        list(executor.map(lambda job: execute_in_thread(job, max_attempts), jobs))
+    return len(jobs)
+
+
+def run(
+    threads=None,
+    batch_size=None,
+    max_attempts=None,
+    lease_seconds=None,
+    poll_interval=None,
+    once=False,
+):
+    """Process jobs until interrupted, or until the queue is drained if ``once``."""
+    threads = threads or get_setting("THREADS")
+    batch_size = batch_size or get_setting("BATCH_SIZE")
+    max_attempts = max_attempts or get_setting("MAX_ATTEMPTS")
+    lease_seconds = lease_seconds or get_setting("LEASE_SECONDS")
+    poll_interval = poll_interval or get_setting("POLL_INTERVAL")
+
+    processed = 0
+    pool = ThreadPoolExecutor(max_workers=threads) if threads > 1 else nullcontext()
+    with pool as executor:
+        while True:
+            claimed = run_batch(executor, batch_size, max_attempts, lease_seconds)
+            processed += claimed
+            if claimed:
+                continue
+            if once:
+                return processed
+            time.sleep(poll_interval)
+
+
+def purge(older_than, batch_size=1000):
+    """Delete finished jobs older than ``older_than`` in small batches."""
+    cutoff = timezone.now() - older_than
+    deleted = 0
+    while True:
+        ids = list(
+            OutboxJob.objects.filter(
+                status=OutboxJob.DONE, updated_at__lt=cutoff
+            ).values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += OutboxJob.objects.filter(id__in=ids).delete()[0]
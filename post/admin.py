@@ -1,15 +1,78 @@
 from django.contrib import admin
 
-from .models import Like, Post
+from users.admin import ScalableAdmin
+
+from .models import Comment, Like, Post, PostMedia, PostTerm, Story
 
 # Register your models here.
 
 
+@admin.display(description="post", ordering="post")
+def post_ref(obj):
+    # The id alone: Post.__str__ would cost two more queries per row.
+    return obj.post_id
+
+
+class PostMediaInline(admin.TabularInline):
+    model = PostMedia
+    extra = 0
+
+
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
-    list_display = ["id", "profile"]
+class PostAdmin(ScalableAdmin):
+    list_display = ["id", "author", "description", "created_at", "deleted_at"]
+    list_select_related = ["profile__user"]
+    list_filter = [("deleted_at", admin.EmptyFieldListFilter)]
+    search_fields = ["^profile__user__username"]
+    autocomplete_fields = ["profile"]
+    inlines = [PostMediaInline]
+
+    def get_queryset(self, request):
+        return Post.all_objects.all()
+
+    @admin.display(description="author", ordering="profile__user__username")
+    def author(self, obj):
+        return obj.profile.user.username
 
 
 @admin.register(Like)
-class UserAdmin(admin.ModelAdmin):
-    list_display = ["id", "post", "profile"]
+class UserAdmin(ScalableAdmin):
+    list_display = ["id", post_ref, "profile__user__username", "created_at"]
+    # Like.__str__, used in each row's checkbox label, reaches the post's author.
+    list_select_related = ["profile__user", "post__profile__user"]
+    raw_id_fields = ["post"]
+    autocomplete_fields = ["profile"]
+
+
+@admin.register(Comment)
+class CommentAdmin(ScalableAdmin):
+    list_display = [
+        "id",
+        post_ref,
+        "profile__user__username",
+        "parent_ref",
+        "text",
+        "created_at",
+    ]
+    list_select_related = ["profile__user"]
+    raw_id_fields = ["post", "parent"]
+    autocomplete_fields = ["profile"]
+
+    @admin.display(description="parent", ordering="parent")
+    def parent_ref(self, obj):
+        return obj.parent_id
+
+
+@admin.register(PostTerm)
+class PostTermAdmin(ScalableAdmin):
+    list_display = ["id", "kind", "term", post_ref, "created_at"]
+    list_filter = ["kind"]
+    search_fields = ["=term"]
+    raw_id_fields = ["post"]
+
+
+@admin.register(Story)
+class StoryAdmin(ScalableAdmin):
+    list_display = ["id", "profile__user__username", "kind", "view_count", "expires_at"]
+    list_select_related = ["profile__user"]
+    autocomplete_fields = ["profile"]
@@ -0,0 +1,52 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ArchivedLike, Like, Post
+
+
+def add_to_counts(counts):
+    """
+    Add ``{post_id: delta}`` to Post.archived_like_count, with one UPDATE per
+    distinct delta rather than one per post.
+    """
+    by_delta = defaultdict(list)
+    for post_id, delta in counts.items():
+        if delta:
+            by_delta[delta].append(post_id)
+    now = timezone.now()
+    for delta, post_ids in by_delta.items():
+        Post.all_objects.filter(id__in=post_ids).update(
+            archived_like_count=F("archived_like_count") + delta, updated_at=now
+        )
+
+
+def archive_likes(before, batch_size=5000, limit=None):
+    """
+    Move likes created before ``before`` from Like into ArchivedLike, oldest
+    first, one transaction per batch. Returns the number of likes moved.
+    """
+    moved = 0
+    while limit is None or moved < limit:
+        size = batch_size if limit is None else min(batch_size, limit - moved)
+        with transaction.atomic():
+            rows = list(
+                Like.objects.filter(created_at__lt=before)
+                .order_by("id")
+                .select_for_update()
+                .values_list("id", "post_id", "profile_id", "created_at")[:size]
+            )
+            if not rows:
+                break
+            ArchivedLike.objects.bulk_create(
+                [
+                    ArchivedLike(post_id=post_id, profile_id=profile_id, created_at=at)
+                    for _, post_id, profile_id, at in rows
+                ]
+            )
+            add_to_counts(Counter(post_id for _, post_id, _, _ in rows))
+            Like.objects.filter(id__in=[row[0] for row in rows]).delete()
+        moved += len(rows)
+    return moved
@@ -0,0 +1,40 @@
+import re
+
+from django.db import transaction
+
+from .models import PostTerm
+
+HASHTAG_RE = re.compile(r"(?<![\w#])#(\w{1,150})")
+MENTION_RE = re.compile(r"(?<![\w@])@([\w.]{1,150})")
+
+
+def extract_terms(text):
+    """Set of (kind, term) found in a caption, lowercased."""
+    if not text:
+        return set()
+    terms = {(PostTerm.TAG, tag.lower()) for tag in HASHTAG_RE.findall(text)}
+    # A trailing dot ends the sentence, not the username.
+    mentions = (name.rstrip(".").lower() for name in MENTION_RE.findall(text))
+    terms |= {(PostTerm.MENTION, name) for name in mentions if name}
+    return terms
+
+
+def index_posts(posts):
+    """
+    Replace the index rows of ``posts``, an iterable of (id, description,
+    created_at), with one delete and one bulk insert.
+    """
+    posts = list(posts)
+    rows = [
+        PostTerm(kind=kind, term=term, post_id=post_id, created_at=created_at)
+        for post_id, description, created_at in posts
+        for kind, term in extract_terms(description)
+    ]
+    with transaction.atomic():
+        PostTerm.objects.filter(post_id__in=[post[0] for post in posts]).delete()
+        PostTerm.objects.bulk_create(rows)
+    return len(rows)
+
+
+def index_post(post):
+    return index_posts([(post.id, post.description, post.created_at)])
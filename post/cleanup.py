@@ -0,0 +1,210 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from exports.models import DataExport
+from notifications.models import Notification, NotificationActor
+from outbox.models import OutboxJob
+from users.models import Follower, Profile
+
+from .archive import add_to_counts
+from .models import (
+    ArchivedLike,
+    Comment,
+    Like,
+    Post,
+    PostMedia,
+    PostTerm,
+    Story,
+    StoryView,
+)
+
+User = get_user_model()
+
+CHUNK_SIZE = 1000
+# Chunks one outbox job may delete before handing over to a follow-up job, so no
+# job runs anywhere near the worker lease.
+CHUNKS_PER_JOB = 50
+STORAGE_WORKERS = 4
+
+
+class Purge:
+    """
+    Deletes rows in primary-key chunks, each in its own short transaction, until
+    the chunk budget runs out.
+    """
+
+    def __init__(self, chunks=CHUNKS_PER_JOB, chunk_size=CHUNK_SIZE):
+        self.chunks = chunks
+        self.chunk_size = chunk_size
+
+    def next_chunk(self, queryset, *fields):
+        """Next (id, *fields) rows: [] when done, None when out of budget."""
+        if self.chunks <= 0:
+            return None
+        rows = list(
+            queryset.order_by("id").values_list("id", *fields)[: self.chunk_size]
+        )
+        if rows:
+            self.chunks -= 1
+        return rows
+
+    def delete(self, queryset):
+        """Delete every row of ``queryset``. False if the budget ran out first."""
+        while True:
+            rows = self.next_chunk(queryset)
+            if not rows:
+                return rows is not None
+            queryset.model._base_manager.filter(id__in=[pk for pk, in rows]).delete()
+
+    def delete_comments(self, queryset):
+        """Like ``delete``, and recount the posts and threads that lost comments."""
+        while True:
+            rows = self.next_chunk(queryset, "post_id", "parent_id")
+            if not rows:
+                return rows is not None
+            Comment.objects.filter(id__in=[pk for pk, *_ in rows]).delete()
+            for post_id, parent_id in {(post, parent) for _, post, parent in rows}:
+                OutboxJob.objects.enqueue(
+                    "post.comment_deleted", {"post_id": post_id, "parent_id": parent_id}
+                )
+
+    def delete_archived_likes(self, queryset):
+        """Like ``delete``, and take the likes off the posts' archived counts."""
+        while True:
+            rows = self.next_chunk(queryset, "post_id")
+            if not rows:
+                return rows is not None
+            ArchivedLike.objects.filter(id__in=[pk for pk, _ in rows]).delete()
+            counts = Counter()
+            for _, post_id in rows:
+                counts[post_id] -= 1
+            add_to_counts(counts)
+
+    def delete_media(self, queryset):
+        """Like ``delete``, and remove the carousel files no other post uses."""
+        while True:
+            rows = self.next_chunk(queryset, "file")
+            if not rows:
+                return rows is not None
+            PostMedia.objects.filter(id__in=[pk for pk, _ in rows]).delete()
+            delete_files(
+                PostMedia._meta.get_field("file"),
+                unshared_post_files([name for _, name in rows]),
+            )
+
+    def delete_stories(self, queryset):
+        """Like ``delete``, and remove the stories' views and media files too."""
+        while True:
+            rows = self.next_chunk(queryset, "media")
+            if not rows:
+                return rows is not None
+            ids = [pk for pk, _ in rows]
+            StoryView.objects.filter(story_id__in=ids).delete()
+            Story.objects.filter(id__in=ids).delete()
+            delete_files(Story._meta.get_field("media"), [name for _, name in rows])
+
+    def delete_exports(self, queryset):
+        """Like ``delete``, and remove the export archives from storage too."""
+        while True:
+            rows = self.next_chunk(queryset, "file")
+            if not rows:
+                return rows is not None
+            DataExport.objects.filter(id__in=[pk for pk, _ in rows]).delete()
+            delete_files(DataExport._meta.get_field("file"), [name for _, name in rows])
+
+
+def delete_files(field, names):
+    """
+    Remove stored files of FileField ``field`` concurrently. Called after their
+    rows are gone: a file left behind by a failure is only wasted space.
+    """
+    with ThreadPoolExecutor(max_workers=STORAGE_WORKERS) as pool:
+        list(pool.map(field.storage.delete, [name for name in names if name]))
+
+
+def unshared_post_files(names):
+    """
+    The ``names`` no post or carousel item refers to anymore. Imported posts can
+    share one image, and position 0 of a carousel is the post's own image.
+    """
+    names = set(filter(None, names))
+    names -= set(
+        Post.all_objects.filter(image__in=names).values_list("image", flat=True)
+    )
+    names -= set(
+        PostMedia.objects.filter(file__in=names).values_list("file", flat=True)
+    )
+    return sorted(names)
+
+
+def purge_post(post_id, purge):
+    """Reclaim a deleted post and everything hanging off it. True when gone."""
+    dependents = [
+        Like.objects.filter(post_id=post_id),
+        ArchivedLike.objects.filter(post_id=post_id),
+        # Replies first, so deleting a top-level comment cascades to nothing.
+        Comment.objects.filter(post_id=post_id, parent__isnull=False),
+        Comment.objects.filter(post_id=post_id),
+        PostTerm.objects.filter(post_id=post_id),
+        NotificationActor.objects.filter(notification__post_id=post_id),
+        Notification.objects.filter(post_id=post_id),
+    ]
+    for queryset in dependents:
+        if not purge.delete(queryset):
+            return False
+    if not purge.delete_media(PostMedia.objects.filter(post_id=post_id)):
+        return False
+    post = Post.all_objects.filter(id=post_id)
+    image = post.values_list("image", flat=True).first()
+    post.delete()
+    delete_files(Post._meta.get_field("image"), unshared_post_files([image]))
+    return True
+
+
+def purge_profile(profile_id, purge):
+    """Reclaim a deleted account, its posts and its activity. True when gone."""
+    dependents = [
+        Follower.objects.filter(Q(follower_id=profile_id) | Q(following_id=profile_id)),
+        Like.objects.filter(profile_id=profile_id),
+        StoryView.objects.filter(profile_id=profile_id),
+        NotificationActor.objects.filter(
+            Q(actor_id=profile_id) | Q(notification__recipient_id=profile_id)
+        ),
+        Notification.objects.filter(recipient_id=profile_id),
+    ]
+    for queryset in dependents:
+        if not purge.delete(queryset):
+            return False
+    if not purge.delete_archived_likes(
+        ArchivedLike.objects.filter(profile_id=profile_id)
+    ):
+        return False
+    if not purge.delete_stories(Story.objects.filter(profile_id=profile_id)):
+        return False
+    # Personal data archives must not outlive the account.
+    if not purge.delete_exports(DataExport.objects.filter(profile_id=profile_id)):
+        return False
+    # Comments on other people's posts change their counters and previews.
+    if not purge.delete_comments(
+        Comment.objects.filter(profile_id=profile_id).exclude(
+            post__profile_id=profile_id
+        )
+    ):
+        return False
+
+    posts = Post.all_objects.filter(profile_id=profile_id)
+    for post_id in list(posts.order_by("id").values_list("id", flat=True)):
+        if not purge_post(post_id, purge):
+            return False
+
+    user_id = (
+        Profile.all_objects.filter(id=profile_id)
+        .values_list("user_id", flat=True)
+        .first()
+    )
+    # Everything that referenced the profile is gone, so this cascade is cheap.
+    User.objects.filter(id=user_id).delete()
+    return True
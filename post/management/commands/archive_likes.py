@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from post.archive import archive_likes
+
+
+class Command(BaseCommand):
+    help = (
+        "Move likes older than --days from Like into ArchivedLike, keeping like "
+        "counts and is_liked answers unchanged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--limit", type=int, help="Stop after moving this many likes."
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["days"])
+        moved = archive_likes(before, options["batch_size"], options["limit"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {moved} likes created before {before:%Y-%m-%d}"
+            )
+        )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from post.captions import index_posts
+from post.models import Post
+
+
+class Command(BaseCommand):
+    help = "Rebuild the hashtag and mention index for existing posts, in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--start-id", type=int, default=0, help="Resume after this post id."
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = options["start_id"]
+        posts = terms = 0
+        while True:
+            # Keyset pagination on the primary key stays fast deep into the table.
+            chunk = list(
+                Post.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", "description", "created_at")[:batch_size]
+            )
+            if not chunk:
+                break
+            terms += index_posts(chunk)
+            posts += len(chunk)
+            last_id = chunk[-1][0]
+            self.stdout.write(f"Indexed {posts} posts (last id {last_id})")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {terms} terms across {posts} posts")
+        )
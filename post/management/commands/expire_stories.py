@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from post.cleanup import CHUNK_SIZE, Purge
+from post.stories import expire_stories
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete stories whose expiry bucket has passed, with their views and "
+        "media files. Meant to run from cron, e.g. every few minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        # Each Purge has a chunk budget; keep going until nothing expired is left.
+        while not expire_stories(Purge(chunk_size=options["batch_size"])):
+            pass
+        self.stdout.write(self.style.SUCCESS("Purged expired stories"))
@@ -0,0 +1,132 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from post.archive import add_to_counts
+from post.models import ArchivedLike
+
+
+def month_start(day, offset=0):
+    months = day.year * 12 + day.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partition(start):
+    upper = month_start(start, 1)
+    return f"PARTITION p{start:%Y%m} VALUES LESS THAN (TO_DAYS('{upper}'))"
+
+
+class Command(BaseCommand):
+    help = (
+        "Range-partition ArchivedLike by month of created_at on MySQL, add the "
+        "coming months' partitions and optionally drop expired ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=3)
+        parser.add_argument(
+            "--retain-months",
+            type=int,
+            help="Drop partitions that end more than this many months ago. The "
+            "dropped likes are taken off Post.archived_like_count.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Print the SQL without running it."
+        )
+
+    def handle(self, *args, **options):
+        # Like and Follower keep their foreign keys and (post, profile) uniqueness,
+        # neither of which MySQL allows on partitioned tables, so only the
+        # key-less archive is partitioned.
+        if connection.vendor != "mysql":
+            raise CommandError(
+                f"Partitioning needs MySQL, this database is {connection.vendor}"
+            )
+
+        self.dry_run = options["dry_run"]
+        self.table = connection.ops.quote_name(ArchivedLike._meta.db_table)
+        today = date.today()
+        last = month_start(today, options["months_ahead"])
+        existing = self.existing_partitions()
+
+        if not existing:
+            first = month_start(self.oldest_row() or today)
+            self.run_sql(
+                f"ALTER TABLE {self.table} "
+                "DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)"
+            )
+            self.run_sql(
+                f"ALTER TABLE {self.table} PARTITION BY RANGE (TO_DAYS(created_at)) "
+                f"({self.partitions(first, last)})"
+            )
+        else:
+            newest = max(existing)
+            if newest < last:
+                self.run_sql(
+                    f"ALTER TABLE {self.table} REORGANIZE PARTITION pmax INTO "
+                    f"({self.partitions(month_start(newest, 1), last)})"
+                )
+
+        if options["retain_months"] is not None:
+            cutoff = month_start(today, -options["retain_months"])
+            expired = [start for start in existing if month_start(start, 1) <= cutoff]
+            if expired:
+                self.drop_partitions(expired)
+
+        self.stdout.write(self.style.SUCCESS("Partitions are up to date"))
+
+    def drop_partitions(self, expired):
+        # The oldest partition also holds anything older than its month.
+        dropped = ArchivedLike.objects.filter(
+            created_at__lt=month_start(max(expired), 1)
+        )
+        counts = {
+            post_id: -n
+            for post_id, n in dropped.order_by()
+            .values_list("post_id")
+            .annotate(n=Count("id"))
+        }
+        names = ", ".join(f"p{start:%Y%m}" for start in expired)
+        self.run_sql(f"ALTER TABLE {self.table} DROP PARTITION {names}")
+        if not self.dry_run:
+            # After the DDL, which MySQL cannot roll back: a failed drop must not
+            # have lowered the counts of likes that are still there.
+            add_to_counts(counts)
+
+    def partitions(self, first, last):
+        months = []
+        start = first
+        while start <= last:
+            months.append(partition(start))
+            start = month_start(start, 1)
+        return ", ".join(months + ["PARTITION pmax VALUES LESS THAN MAXVALUE"])
+
+    def existing_partitions(self):
+        """Start of month of every monthly partition, ignoring pmax."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+                "AND PARTITION_NAME IS NOT NULL",
+                [ArchivedLike._meta.db_table],
+            )
+            names = [name for (name,) in cursor.fetchall()]
+        return sorted(
+            date(int(name[1:5]), int(name[5:7]), 1) for name in names if name != "pmax"
+        )
+
+    def oldest_row(self):
+        oldest = (
+            ArchivedLike.objects.order_by("created_at")
+            .values_list("created_at", flat=True)
+            .first()
+        )
+        return oldest.date() if oldest else None
+
+    def run_sql(self, sql):
+        self.stdout.write(sql)
+        if not self.dry_run:
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from .models import PostMedia
+
+MAX_ITEMS = 10
+UPLOAD_WORKERS = 4
+
+# Names store_media wrote inside the innermost atomic_with_media() block.
+stored_names = ContextVar("stored_names", default=None)
+
+
+def kind_of(upload):
+    content_type = getattr(upload, "content_type", None) or ""
+    if content_type.startswith("video/"):
+        return PostMedia.VIDEO
+    return PostMedia.IMAGE
+
+
+def delete_stored(names):
+    storage = PostMedia._meta.get_field("file").storage
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+        list(pool.map(storage.delete, names))
+
+
+@contextmanager
+def atomic_with_media():
+    """
+    ``transaction.atomic()`` that also removes the files store_media wrote in
+    the block when the block rolls back. Storage is not transactional, so the
+    files are written first and deleted again on failure. Use it as the
+    outermost block: a rollback further out would not be seen.
+    """
+    names = []
+    token = stored_names.set(names)
+    try:
+        with transaction.atomic():
+            yield
+    except BaseException:
+        delete_stored(names)
+        raise
+    finally:
+        stored_names.reset(token)
+
+
+def store_media(post, uploads):
+    """
+    Build a post's carousel: its own image first, then ``uploads`` in order.
+
+    The files are written to storage concurrently, since that is network I/O on
+    remote backends, and the rows are inserted with a single bulk_create.
+    Position 0 points at the file already stored for ``post.image``.
+    """
+    field = PostMedia._meta.get_field("file")
+    storage = field.storage
+
+    def save(upload):
+        return storage.save(field.generate_filename(None, upload.name), upload)
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+        futures = [pool.submit(save, upload) for upload in uploads]
+    names = [future.result() for future in futures if not future.exception()]
+    pending = stored_names.get()
+    if pending is not None:
+        pending.append(post.image.name)
+        pending.extend(names)
+    if len(names) < len(uploads):
+        if pending is None:
+            delete_stored(names)
+        raise next(future.exception() for future in futures if future.exception())
+
+    items = [PostMedia(post=post, file=post.image.name, position=0)]
+    items += [
+        PostMedia(post=post, file=name, kind=kind_of(upload), position=position)
+        for position, (name, upload) in enumerate(zip(names, uploads), start=1)
+    ]
+    return PostMedia.objects.bulk_create(items)
@@ -1,21 +1,103 @@
+from datetime import timedelta
+
 from django.db import models
+from django.utils import timezone
 
 from users.models import Profile
 
 
+class PostManager(models.Manager):
+    """
+    Hides soft-deleted posts and the posts of deleted profiles; ``all_objects``
+    still sees them.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at=None, profile__deleted_at=None)
+
+
 class Post(models.Model):
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="posts")
     image = models.ImageField(upload_to="profile/images")
     description = models.TextField(blank=True, null=True)
+    # Maintained by post.tasks so feed pages need no per-post comment queries.
+    comment_count = models.PositiveIntegerField(default=0)
+    comment_preview = models.JSONField(default=list, blank=True)
+    # Likes moved to ArchivedLike by post.archive; like_count adds them back.
+    archived_like_count = models.PositiveIntegerField(default=0)
+    # Set on deletion; the rows are reclaimed later by post.cleanup.
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PostManager()
+    all_objects = models.Manager()
+
     def __str__(self):
         return f"{self.profile.user.username}"
 
     @property
     def like_count(self):
-        return self.likes.count()
+        return self.likes.count() + self.archived_like_count
+
+
+class PostMedia(models.Model):
+    """One item of a post's carousel. Position 0 is the post's own image."""
+
+    IMAGE = "image"
+    VIDEO = "video"
+    KIND_CHOICES = [
+        (IMAGE, "Image"),
+        (VIDEO, "Video"),
+    ]
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="media")
+    file = models.FileField(upload_to="posts/media")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=IMAGE)
+    position = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["position", "id"]
+        indexes = [
+            models.Index(fields=["post", "position"])
+        ]  # One range scan loads a whole page's carousels
+
+    def __str__(self):
+        return f"{self.post_id} #{self.position}"
+
+
+class PostTerm(models.Model):
+    """
+    Inverted index of caption hashtags and mentions: one row per term per post,
+    carrying the post's created_at so a term's posts read newest first from the
+    index alone.
+    """
+
+    TAG = "tag"
+    MENTION = "mention"
+    KIND_CHOICES = [
+        (TAG, "Hashtag"),
+        (MENTION, "Mention"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    term = models.CharField(max_length=150)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="terms")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "term", "post"], name="unique_post_term"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["kind", "term", "-created_at", "-id"])
+        ]  # Cursor pages of a tag, newest first
+
+    def __str__(self):
+        return f"{self.kind}:{self.term} -> {self.post_id}"
 
 
 class Like(models.Model):
@@ -33,3 +115,134 @@ class Like(models.Model):
 
     def __str__(self):
         return f"{self.profile.user.username} liked {self.post}"
+
+
+class Comment(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="comments"
+    )
+    parent = models.ForeignKey(
+        "self",
+        on_delete=models.CASCADE,
+        related_name="replies",
+        null=True,
+        blank=True,
+    )
+    text = models.TextField(max_length=2200)
+    reply_count = models.PositiveIntegerField(default=0)
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["profile", "idempotency_key"], name="unique_comment_key"
+            )
+        ]  # A retried POST returns the comment it already created
+        indexes = [
+            models.Index(fields=["post", "parent", "created_at", "id"])
+        ]  # Cursor pages of a post's comments or of one thread
+
+    def __str__(self):
+        return f"{self.profile.user.username} on {self.post_id}"
+
+
+class ArchivedLike(models.Model):
+    """
+    Append-only home of old likes, moved out of Like by post.archive.
+
+    Plain integer columns instead of foreign keys keep rows small and let MySQL
+    range-partition the table by created_at (see partition_archived_likes).
+    """
+
+    post_id = models.BigIntegerField()
+    profile_id = models.BigIntegerField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["profile_id", "post_id"]),  # is_liked checks
+            models.Index(fields=["post_id"]),  # Cleanup of deleted posts
+        ]
+
+    def __str__(self):
+        return f"{self.profile_id} liked {self.post_id}"
+
+
+def story_upload_to(story, filename):
+    # Files of one expiry bucket share a prefix, so storage lifecycle rules can
+    # expire them wholesale as well.
+    return f"stories/{story.bucket}/{filename}"
+
+
+class Story(models.Model):
+    """
+    Media shown for TTL after posting.
+
+    ``bucket`` is the hour the story expires in. Live stories are always in the
+    current or a later bucket, so the tray scans only those, and expired buckets
+    are purged as a range rather than row by row (see post.stories).
+    """
+
+    TTL = timedelta(hours=24)
+    BUCKET_SECONDS = 3600
+
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="stories"
+    )
+    media = models.FileField(upload_to=story_upload_to)
+    kind = models.CharField(
+        max_length=10, choices=PostMedia.KIND_CHOICES, default=PostMedia.IMAGE
+    )
+    caption = models.CharField(max_length=200, blank=True, default="")
+    view_count = models.PositiveIntegerField(default=0)
+    bucket = models.PositiveIntegerField(db_index=True)  # Purge of expired buckets
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["profile", "bucket"])
+        ]  # Live stories of the profiles in a tray
+
+    def __str__(self):
+        return f"{self.profile_id} until {self.expires_at:%Y-%m-%d %H:%M}"
+
+    @classmethod
+    def bucket_of(cls, when):
+        return int(when.timestamp()) // cls.BUCKET_SECONDS
+
+    @classmethod
+    def live_bucket(cls):
+        """The oldest bucket that can still hold live stories."""
+        return cls.bucket_of(timezone.now())
+
+    def save(self, *args, **kwargs):
+        if self.expires_at is None:
+            self.expires_at = timezone.now() + self.TTL
+        self.bucket = self.bucket_of(self.expires_at)
+        super().save(*args, **kwargs)
+
+
+class StoryView(models.Model):
+    story = models.ForeignKey(Story, on_delete=models.CASCADE, related_name="views")
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="story_views"
+    )
+    # Copied from the story, so expired views go in one range delete.
+    bucket = models.PositiveIntegerField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["story", "profile"], name="unique_story_view"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["story", "-created_at", "-id"])
+        ]  # Cursor pages of a story's viewers
+
+    def __str__(self):
+        return f"{self.profile_id} saw {self.story_id}"
@@ -0,0 +1,55 @@
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from users.models import Follower
+
+from .models import Story, StoryView
+
+
+def live_stories():
+    # The bucket bound is what lets the index skip expired stories; the exact
+    # expiry check then only drops the ones expiring earlier this hour.
+    return Story.objects.filter(
+        bucket__gte=Story.live_bucket(),
+        expires_at__gt=timezone.now(),
+        profile__deleted_at=None,
+    )
+
+
+def tray(profile):
+    """
+    The viewer's own and followed profiles' live stories, grouped by author:
+    the viewer first, then authors with unseen stories, most recent first.
+    """
+    following = Follower.objects.filter(follower=profile).values("following_id")
+    stories = (
+        live_stories()
+        .filter(Q(profile=profile) | Q(profile_id__in=following))
+        .select_related("profile__user")
+        .annotate(
+            seen=Exists(StoryView.objects.filter(story=OuterRef("pk"), profile=profile))
+        )
+        .order_by("created_at", "id")
+    )
+
+    groups = {}
+    for story in stories:
+        groups.setdefault(story.profile_id, []).append(story)
+
+    def rank(item):
+        author_id, group = item
+        unseen = any(not story.seen for story in group)
+        return (author_id != profile.id, not unseen, -group[-1].created_at.timestamp())
+
+    return [group for _, group in sorted(groups.items(), key=rank)]
+
+
+def expire_stories(purge):
+    """
+    Reclaim every story in a bucket that has fully expired, with its views and
+    media. True when nothing expired is left.
+    """
+    live = Story.live_bucket()
+    if not purge.delete(StoryView.objects.filter(bucket__lt=live)):
+        return False
+    return purge.delete_stories(Story.objects.filter(bucket__lt=live))
@@ -0,0 +1,57 @@
+from django.utils import timezone
+
+from outbox.models import OutboxJob
+from outbox.registry import handler
+
+from .cleanup import Purge, purge_post, purge_profile
+from .models import Comment, Post
+
+PREVIEW_SIZE = 2
+
+
+def refresh_comment_stats(post_id, parent_id=None):
+    """
+    Recompute a post's comment count and preview (and the thread's reply count)
+    from the comments table. Recounting rather than incrementing keeps retried
+    jobs harmless.
+    """
+    comments = Comment.objects.filter(post_id=post_id, profile__deleted_at=None)
+    preview = [
+        {"id": pk, "username": username, "text": text}
+        for pk, username, text in comments.filter(parent=None)
+        .order_by("created_at", "id")
+        .values_list("id", "profile__user__username", "text")[:PREVIEW_SIZE]
+    ]
+    # updated_at moves so ETags of feeds showing this post change too.
+    Post.objects.filter(id=post_id).update(
+        comment_count=comments.count(),
+        comment_preview=preview,
+        updated_at=timezone.now(),
+    )
+    if parent_id is not None:
+        Comment.objects.filter(id=parent_id).update(
+            reply_count=Comment.objects.filter(parent_id=parent_id).count()
+        )
+
+
+@handler("post.commented")
+def comment_created(payload):
+    refresh_comment_stats(payload["post_id"], payload["parent_id"])
+
+
+@handler("post.comment_deleted")
+def comment_deleted(payload):
+    refresh_comment_stats(payload["post_id"], payload["parent_id"])
+
+
+@handler("post.deleted")
+def post_deleted(payload):
+    if not purge_post(payload["post_id"], Purge()):
+        # Out of budget for this job: carry on in a fresh one.
+        OutboxJob.objects.enqueue("post.deleted", payload)
+
+
+@handler("profile.deleted")
+def profile_deleted(payload):
+    if not purge_profile(payload["profile_id"], Purge()):
+        OutboxJob.objects.enqueue("profile.deleted", payload)
@@ -1 +1,573 @@
-# Create your tests here.
+import datetime
+import os
+import shutil
+import tempfile
+
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.serializers import FastPathMixin, PostSerializers, UserHomePostSerializers
+from outbox.models import OutboxJob
+from users.models import Follower, Profile, User
+
+from .archive import archive_likes
+from .captions import extract_terms
+from .cleanup import Purge, purge_post, purge_profile
+from .models import (
+    ArchivedLike,
+    Like,
+    Post,
+    PostMedia,
+    PostTerm,
+    Story,
+    StoryView,
+)
+
+
+def create_profile(username):
+    user = User.objects.create_user(username, f"{username}@example.com", "password")
+    return Profile.objects.create(user=user)
+
+
+def context_for(profile):
+    request = APIRequestFactory().get("/")
+    request.user = profile.user
+    return {"request": request}
+
+
+class FastPathTestCase(TestCase):
+    """fast_data() must render exactly what the serializers render."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_profile("owner")
+        cls.viewer = create_profile("viewer")
+        Follower.objects.create(follower=cls.viewer, following=cls.owner)
+        cls.posts = [
+            Post.objects.create(
+                profile=cls.owner, image=f"profile/images/{i}.jpg", description=str(i)
+            )
+            for i in range(3)
+        ]
+        first, second, _ = cls.posts
+        # A carousel on the first post, nothing extra on the others.
+        PostMedia.objects.bulk_create(
+            [
+                PostMedia(post=first, file=first.image.name, position=0),
+                PostMedia(
+                    post=first,
+                    file="posts/media/clip.mp4",
+                    kind=PostMedia.VIDEO,
+                    position=1,
+                ),
+            ]
+        )
+        Like.objects.create(post=first, profile=cls.viewer)
+        Like.objects.create(post=second, profile=cls.owner)
+        ArchivedLike.objects.create(
+            post_id=second.id, profile_id=cls.viewer.id, created_at=timezone.now()
+        )
+        Post.objects.filter(id=second.id).update(archived_like_count=1)
+
+    def posts_queryset(self):
+        return Post.objects.filter(profile=self.owner).order_by("id")
+
+    def assertSameOutput(self, expected, actual):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+    def test_post_serializer(self):
+        posts = self.posts_queryset()
+        for profile in (self.owner, self.viewer):
+            context = context_for(profile)
+            with self.subTest(viewer=profile.user.username):
+                self.assertSameOutput(
+                    PostSerializers(posts, many=True, context=context).data,
+                    PostSerializers.fast_data(posts, context),
+                )
+
+    def test_post_serializer_without_request(self):
+        posts = self.posts_queryset()
+        self.assertSameOutput(
+            PostSerializers(posts, many=True).data, PostSerializers.fast_data(posts)
+        )
+
+    def test_liked_posts(self):
+        likes = Like.objects.filter(profile=self.viewer).order_by("id")
+        self.assertSameOutput(
+            PostSerializers([like.post for like in likes], many=True).data,
+            PostSerializers.fast_data(likes, prefix="post__"),
+        )
+
+    def test_home_post_serializer(self):
+        posts = self.posts_queryset()
+        for profile in (self.owner, self.viewer):
+            context = context_for(profile)
+            with self.subTest(viewer=profile.user.username):
+                expected = UserHomePostSerializers(
+                    posts, many=True, context=context
+                ).data
+                self.assertSameOutput(
+                    expected, UserHomePostSerializers.fast_data(posts, context)
+                )
+
+        liked = [
+            item["is_liked"]
+            for item in UserHomePostSerializers.fast_data(
+                posts, context_for(self.viewer)
+            )
+        ]
+        # A live like, an archived like, and no like.
+        self.assertEqual(liked, [True, True, False])
+
+    def test_carousel(self):
+        data = PostSerializers.fast_data(self.posts_queryset())
+        self.assertEqual([len(item["media"]) for item in data], [2, 0, 0])
+        self.assertEqual(data[0]["media"][1]["kind"], PostMedia.VIDEO)
+
+    def test_sparse_fields(self):
+        posts = self.posts_queryset()
+        context = context_for(self.viewer)
+        for serializer_class, fields in [
+            (PostSerializers, {"id", "like_count"}),
+            (PostSerializers, {"id", "media"}),
+            (UserHomePostSerializers, {"id", "is_liked", "username"}),
+            (UserHomePostSerializers, {"media", "comment_count"}),
+        ]:
+            with self.subTest(serializer=serializer_class.__name__, fields=fields):
+                expected = serializer_class(
+                    posts, many=True, context=context, fields=fields
+                ).data
+                self.assertSameOutput(
+                    expected,
+                    serializer_class.fast_data(posts, context, fields=fields),
+                )
+
+    def test_sparse_fields_skip_like_subqueries(self):
+        posts = self.posts_queryset()
+        context = context_for(self.viewer)
+        for serializer_class in (PostSerializers, UserHomePostSerializers):
+            with self.subTest(serializer=serializer_class.__name__):
+                with CaptureQueriesContext(connection) as queries:
+                    serializer_class.fast_data(posts, context, fields={"id", "image"})
+                sql = " ".join(query["sql"] for query in queries)
+                self.assertNotIn(Like._meta.db_table, sql)
+                self.assertNotIn(ArchivedLike._meta.db_table, sql)
+
+    def test_subclass_must_implement_fast_path(self):
+        with self.assertRaises(TypeError):
+
+            class Incomplete(FastPathMixin):
+                @classmethod
+                def fast_queryset(cls, queryset, context, prefix, fields):
+                    return queryset
+
+
+class LikedPostsTestCase(TestCase):
+    def test_archived_likes_stay_listed(self):
+        author = create_profile("author")
+        fan = create_profile("fan")
+        posts = [
+            Post.objects.create(profile=author, image=f"profile/images/{i}.jpg")
+            for i in range(3)
+        ]
+        for post in posts:
+            Like.objects.create(post=post, profile=fan)
+        client = APIClient()
+        client.cookies["access_token"] = str(AccessToken.for_user(fan.user))
+
+        before = client.get("/api/user/liked/post/").json()["posts"]
+        archive_likes(timezone.now(), batch_size=2, limit=2)
+        self.assertEqual(ArchivedLike.objects.count(), 2)
+        after = client.get("/api/user/liked/post/").json()["posts"]
+
+        self.assertEqual([item["id"] for item in before], [p.id for p in posts])
+        self.assertEqual(after, before)
+        self.assertEqual(
+            client.get("/api/user/liked/post/", {"fields": "like_count"}).json()[
+                "posts"
+            ],
+            [{"like_count": 1}] * 3,
+        )
+
+
+class ConditionalGetTestCase(TestCase):
+    def test_soft_deleted_follower_changes_the_etag(self):
+        author = create_profile("author")
+        fan = create_profile("fan")
+        Follower.objects.create(follower=fan, following=author)
+        client = APIClient()
+        client.cookies["access_token"] = str(AccessToken.for_user(author.user))
+
+        for url in ["/api/user/profile/", f"/api/user/profile/{author.id}/"]:
+            with self.subTest(url=url):
+                Profile.all_objects.filter(id=fan.id).update(deleted_at=None)
+                response = client.get(url)
+                self.assertEqual(response.json()["follower_count"], 1)
+                Profile.all_objects.filter(id=fan.id).update(deleted_at=timezone.now())
+                response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()["follower_count"], 0)
+
+    def test_profile_stamp_follows_sparse_fields(self):
+        author = create_profile("author")
+        client = APIClient()
+        client.cookies["access_token"] = str(AccessToken.for_user(author.user))
+        with CaptureQueriesContext(connection) as queries:
+            client.get("/api/user/profile/", {"fields": "id,username"})
+        sql = " ".join(query["sql"] for query in queries)
+        self.assertNotIn(Like._meta.db_table, sql)
+        self.assertNotIn(Follower._meta.db_table, sql)
+
+    def test_like_and_unlike_elsewhere_change_the_etag(self):
+        author = create_profile("author")
+        fan = create_profile("fan")
+        first, second = [
+            Post.objects.create(profile=author, image=f"profile/images/{i}.jpg")
+            for i in range(2)
+        ]
+        Follower.objects.create(follower=fan, following=author)
+        Like.objects.create(post=first, profile=fan)
+        client = APIClient()
+        client.cookies["access_token"] = str(AccessToken.for_user(fan.user))
+
+        for url in ["/api/user/home/", f"/api/user/posts/{author.id}/"]:
+            with self.subTest(url=url):
+                etag = client.get(url)["ETag"]
+                # Same number of likes afterwards, on a different post.
+                client.post(f"/api/post/{first.id}/like/")
+                client.post(f"/api/post/{second.id}/like/")
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+                Like.objects.all().delete()
+                Like.objects.create(post=first, profile=fan)
+
+
+class CommentIdempotencyTestCase(TestCase):
+    def test_key_is_bound_to_its_request(self):
+        author = create_profile("author")
+        first, second = [
+            Post.objects.create(profile=author, image=f"profile/images/{i}.jpg")
+            for i in range(2)
+        ]
+        client = APIClient()
+        client.cookies["access_token"] = str(AccessToken.for_user(author.user))
+
+        def comment(post, text):
+            return client.post(
+                f"/api/post/{post.id}/comments/",
+                {"text": text},
+                HTTP_IDEMPOTENCY_KEY="key-1",
+            )
+
+        created = comment(first, "hello")
+        self.assertEqual(created.status_code, 201)
+        retried = comment(first, "hello")
+        self.assertEqual(retried.status_code, 200)
+        self.assertEqual(retried.json()["id"], created.json()["id"])
+        self.assertEqual(comment(second, "hello").status_code, 409)
+        self.assertEqual(comment(first, "goodbye").status_code, 409)
+        self.assertFalse(second.comments.exists())
+
+
+class PurgeFilesTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_purge_removes_files_no_post_uses(self):
+        author = create_profile("author")
+        image = default_storage.save("profile/images/a.jpg", ContentFile(b"a"))
+        clip = default_storage.save("posts/media/clip.mp4", ContentFile(b"b"))
+        carousel = Post.objects.create(profile=author, image=image)
+        PostMedia.objects.bulk_create(
+            [
+                PostMedia(post=carousel, file=image, position=0),
+                PostMedia(post=carousel, file=clip, kind=PostMedia.VIDEO, position=1),
+            ]
+        )
+        # Imported posts may share an image.
+        sharing = Post.objects.create(profile=author, image=image)
+
+        self.assertTrue(purge_post(carousel.id, Purge()))
+        self.assertFalse(default_storage.exists(clip))
+        self.assertTrue(default_storage.exists(image))
+
+        self.assertTrue(purge_profile(author.id, Purge()))
+        self.assertFalse(Post.all_objects.filter(id=sharing.id).exists())
+        self.assertFalse(default_storage.exists(image))
+
+
+class CarouselUploadTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.author = create_profile("author")
+        self.client = APIClient()
+        self.client.cookies["access_token"] = str(
+            AccessToken.for_user(self.author.user)
+        )
+
+    def upload(self):
+        image = BytesIO()
+        Image.new("RGB", (1, 1)).save(image, "PNG")
+        return self.client.post(
+            "/api/user/posts/",
+            {
+                "image": SimpleUploadedFile("a.png", image.getvalue(), "image/png"),
+                "media_files": [
+                    SimpleUploadedFile("b.mp4", b"video", "video/mp4"),
+                    SimpleUploadedFile("c.jpg", b"image", "image/jpeg"),
+                ],
+            },
+        )
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, names in os.walk(self.media_root)
+            for name in names
+        )
+
+    def test_post_image_is_stored_once(self):
+        self.assertEqual(self.upload().status_code, 201)
+        post = Post.objects.get()
+        media = list(post.media.order_by("position").values_list("file", flat=True))
+        self.assertEqual(media[0], post.image.name)
+        self.assertEqual(self.stored_files(), sorted(media))
+
+    def test_rollback_removes_stored_files(self):
+        with mock.patch.object(
+            OutboxJob.objects, "enqueue", side_effect=RuntimeError("database error")
+        ):
+            with self.assertRaises(RuntimeError):
+                self.upload()
+        self.assertFalse(Post.all_objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+
+class CaptionIndexTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_profile("author")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.cookies["access_token"] = str(
+            AccessToken.for_user(self.author.user)
+        )
+
+    def create_post(self, description):
+        return PostSerializers().create(
+            {
+                "profile": self.author,
+                "image": "profile/images/a.jpg",
+                "description": description,
+            }
+        )
+
+    def terms(self, post):
+        return set(post.terms.values_list("kind", "term"))
+
+    def test_extract_terms(self):
+        self.assertEqual(
+            extract_terms("#Sunset with @Alice. #sun_set, mail a@b.com, x#no ##two"),
+            {
+                (PostTerm.TAG, "sunset"),
+                (PostTerm.TAG, "sun_set"),
+                (PostTerm.MENTION, "alice"),
+            },
+        )
+        self.assertEqual(
+            extract_terms("@bob.smith. hi"), {(PostTerm.MENTION, "bob.smith")}
+        )
+        self.assertEqual(extract_terms(None), set())
+
+    def test_editing_a_caption_reindexes_it(self):
+        post = self.create_post("#beach with @alice")
+        self.assertEqual(
+            self.terms(post), {(PostTerm.TAG, "beach"), (PostTerm.MENTION, "alice")}
+        )
+        serializer = PostSerializers(post, data={"description": "#city"}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(self.terms(post), {(PostTerm.TAG, "city")})
+
+    def test_tag_page(self):
+        first = self.create_post("#Beach day")
+        second = self.create_post("more #beach")
+        deleted = self.create_post("#beach, gone")
+        self.create_post("#city")
+        Post.objects.filter(id=deleted.id).update(deleted_at=timezone.now())
+
+        response = self.client.get("/api/tags/%23BEACH/posts/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item["id"] for item in response.json()["results"]], [second.id, first.id]
+        )
+
+    def test_search_pages_through_every_match(self):
+        matches = [self.create_post(f"#sun {i} with @alice") for i in range(25)]
+        self.create_post("#sun alone")
+        self.create_post("@alice alone")
+
+        ids, url = [], "/api/post/search/?query=sun%20@Alice&fields=id"
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page["results"]), 20)
+            ids += [item["id"] for item in page["results"]]
+            url = page["next"]
+        self.assertEqual(ids, [post.id for post in reversed(matches)])
+
+        empty = self.client.get("/api/post/search/", {"query": "!!"}).json()
+        self.assertEqual(empty["results"], [])
+
+    def test_backfill_post_terms(self):
+        posts = Post.objects.bulk_create(
+            Post(profile=self.author, image="profile/images/a.jpg", description=text)
+            for text in ["#one", "#two @alice", "plain", "#four"]
+        )
+        self.assertFalse(PostTerm.objects.exists())
+
+        call_command(
+            "backfill_post_terms",
+            batch_size=2,
+            start_id=posts[0].id,
+            stdout=StringIO(),
+        )
+        self.assertEqual(
+            set(PostTerm.objects.values_list("post", "term")),
+            {(posts[1].id, "two"), (posts[1].id, "alice"), (posts[3].id, "four")},
+        )
+        call_command("backfill_post_terms", stdout=StringIO())
+        self.assertEqual(PostTerm.objects.count(), 4)
+        self.assertEqual(
+            PostTerm.objects.get(post=posts[0]).created_at, posts[0].created_at
+        )
+
+
+class StoriesTestCase(TestCase):
+    now = datetime.datetime(2026, 1, 1, 12, 30, tzinfo=datetime.timezone.utc)
+
+    def setUp(self):
+        patcher = mock.patch("django.utils.timezone.now", return_value=self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.viewer = create_profile("viewer")
+        self.authors = [create_profile(name) for name in ("seen", "new", "older")]
+        for author in self.authors:
+            Follower.objects.create(follower=self.viewer, following=author)
+        self.stranger = create_profile("stranger")
+
+    def story(self, profile, minutes_ago=0, **fields):
+        story = Story.objects.create(profile=profile, media="stories/s.jpg", **fields)
+        created_at = self.now - datetime.timedelta(minutes=minutes_ago)
+        Story.objects.filter(id=story.id).update(created_at=created_at)
+        return story
+
+    def client_for(self, profile):
+        client = APIClient()
+        client.cookies["access_token"] = str(AccessToken.for_user(profile.user))
+        return client
+
+    def test_tray_order_and_visibility(self):
+        seen, new, older = self.authors
+        StoryView.objects.create(
+            story=self.story(seen, minutes_ago=1), profile=self.viewer, bucket=0
+        )
+        self.story(new, minutes_ago=5)
+        self.story(older, minutes_ago=50)
+        self.story(self.viewer, minutes_ago=100)
+        self.story(self.stranger)
+        # Past its 24 hours, though still in the current bucket.
+        self.story(new, expires_at=self.now - datetime.timedelta(minutes=10))
+
+        tray = self.client_for(self.viewer).get("/api/user/stories/").json()
+        self.assertEqual(
+            [(group["profile"]["username"], group["has_unseen"]) for group in tray],
+            [("viewer", True), ("new", True), ("older", True), ("seen", False)],
+        )
+        self.assertEqual([len(group["stories"]) for group in tray], [1, 1, 1, 1])
+
+    def test_view_tracking(self):
+        story = self.story(self.authors[0])
+        client = self.client_for(self.viewer)
+        for _ in range(2):
+            self.assertEqual(
+                client.post(f"/api/story/{story.id}/view/").status_code, 200
+            )
+        self.client_for(self.authors[0]).post(f"/api/story/{story.id}/view/")
+
+        story.refresh_from_db()
+        self.assertEqual(story.view_count, 1)
+        viewers = self.client_for(self.authors[0]).get(
+            f"/api/story/{story.id}/viewers/"
+        )
+        self.assertEqual(
+            [item["username"] for item in viewers.json()["results"]], ["viewer"]
+        )
+        # Only the author sees who viewed.
+        self.assertEqual(
+            client.get(f"/api/story/{story.id}/viewers/").json()["results"], []
+        )
+
+        expired = self.story(
+            self.authors[0], expires_at=self.now - datetime.timedelta(seconds=1)
+        )
+        self.assertEqual(client.post(f"/api/story/{expired.id}/view/").status_code, 404)
+
+    def test_expire_stories_purges_whole_buckets(self):
+        author = self.authors[0]
+        names = [
+            default_storage.save("stories/a.jpg", ContentFile(b"a")),
+            default_storage.save("stories/b.jpg", ContentFile(b"b")),
+        ]
+        old = Story.objects.create(
+            profile=author,
+            media=names[0],
+            expires_at=self.now - datetime.timedelta(hours=2),
+        )
+        StoryView.objects.create(story=old, profile=self.viewer, bucket=old.bucket)
+        # Expired, but its bucket is still the current one.
+        recent = Story.objects.create(
+            profile=author,
+            media=names[1],
+            expires_at=self.now - datetime.timedelta(minutes=10),
+        )
+        live = self.story(author)
+
+        call_command("expire_stories", batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            list(Story.objects.order_by("id").values_list("id", flat=True)),
+            [recent.id, live.id],
+        )
+        self.assertFalse(StoryView.objects.exists())
+        self.assertFalse(default_storage.exists(names[0]))
+        self.assertTrue(default_storage.exists(names[1]))
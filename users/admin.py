@@ -1,18 +1,53 @@
 from django.contrib import admin
 
-from .models import Follower, Profile, User
+from .models import Follower, Profile, RevokedToken, User
+from .pagination import EstimatedCountPaginator
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """
+    Changelist defaults for large tables: no full COUNT(*) and estimated page
+    counts. Subclasses join what they display via list_select_related and use
+    raw-id or autocomplete widgets instead of selects listing every row.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
-    list_display = ["id", "username", "email"]
+class UserAdmin(ScalableAdmin):
+    list_display = ["id", "username", "email", "is_active", "is_staff"]
+    # Prefix searches can use the unique indexes on username and email.
+    search_fields = ["^username", "^email"]
 
 
 @admin.register(Profile)
-class UserProfileAdmin(admin.ModelAdmin):
-    list_display = ["id", "user"]
+class UserProfileAdmin(ScalableAdmin):
+    list_display = ["id", "user", "created_at", "deleted_at"]
+    list_select_related = ["user"]
+    list_filter = [("deleted_at", admin.EmptyFieldListFilter)]
+    search_fields = ["^user__username"]
+    raw_id_fields = ["user"]
+
+    def get_queryset(self, request):
+        return Profile.all_objects.all()
 
 
 @admin.register(Follower)
-class UserProfileFollowerAdmin(admin.ModelAdmin):
-    list_display = ["id", "follower__user__username", "following__user__username"]
+class UserProfileFollowerAdmin(ScalableAdmin):
+    list_display = [
+        "id",
+        "follower__user__username",
+        "following__user__username",
+        "created_at",
+    ]
+    list_select_related = ["follower__user", "following__user"]
+    autocomplete_fields = ["follower", "following"]
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(ScalableAdmin):
+    list_display = ["id", "jti", "expires_at", "created_at"]
+    search_fields = ["=jti"]
@@ -23,8 +23,9 @@ class EmailOrUsernameAuthBackend(ModelBackend):
             except User.DoesNotExist:
                 return None
 
-        # Check if the password is correct
-        if user and user.check_password(password):
+        # Check if the password is correct, and refuse deactivated (e.g.
+        # soft-deleted) accounts
+        if user and user.check_password(password) and self.user_can_authenticate(user):
             return user
 
         return None
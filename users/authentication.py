@@ -1,8 +1,15 @@
+import logging
+
 from django.contrib.auth import get_user_model
 
 from rest_framework.authentication import BaseAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
+from .revocation import revocations
+
+logger = logging.getLogger(__name__)
+
 User = get_user_model()
 
 
@@ -10,14 +17,8 @@ class JWTAuthenticationFromCookie(BaseAuthentication):
     def authenticate(self, request):
         token = request.COOKIES.get("access_token")  # Get access token from cookies
         refresh_token = request.COOKIES.get("refresh_token")  # Get refresh token
-        # print('token ===>',token)
-        # print('refresh_token ===>',refresh_token)
         try:
-            access_token = AccessToken(token)
-
-            user = User.objects.get(id=access_token["user_id"])
-
-            return (user, None)
+            return (self.user_from_access_token(token), None)
 
         except Exception:
             if refresh_token:
@@ -25,28 +26,38 @@ class JWTAuthenticationFromCookie(BaseAuthentication):
                     new_access_token, new_refresh_token = self.refresh_access_token(
                         refresh_token
                     )
+                    # Set as cookies by users.middleware.TokenCookieMiddleware.
+                    request._request.new_access_token = new_access_token
+                    request._request.new_refresh_token = new_refresh_token
 
                     # Authenticate the user with the new token
-                    access_token = AccessToken(new_access_token)
-
-                    user_id = access_token["user_id"]
-                    user = User.objects.get(id=user_id)
-
-                    return (user, None)
+                    return (self.user_from_access_token(new_access_token), None)
 
                 except Exception as e:
-                    print(e)
+                    logger.debug("Refreshing the access token failed: %s", e)
                     # raise AuthenticationFailed("Token expired. Please log in again.")
                     return None
-            print("yes")
+            logger.debug("Request has no valid access or refresh token")
             # raise AuthenticationFailed({"detail":"You are not logged in! please log in to get access"})
             return None
 
+    def user_from_access_token(self, token):
+        """The active user of a valid, unrevoked access token. Never rotates."""
+        access_token = AccessToken(token)
+        if revocations.is_revoked(access_token["jti"]):
+            raise TokenError("Token is revoked")
+        return User.objects.get(id=access_token["user_id"], is_active=True)
+
     def refresh_access_token(self, refresh_token):
         """Tries to refresh the access token using the refresh token"""
         refresh = RefreshToken(refresh_token)
+        if revocations.is_revoked(refresh["jti"]):
+            raise TokenError("Token is revoked")
         user_id = refresh.payload.get("user_id")
-        user = User.objects.get(id=user_id)
-        new_access_token = str(refresh.access_token)
-        new_refresh_token = str(RefreshToken.for_user(user))
-        return new_access_token, new_refresh_token
+        user = User.objects.get(id=user_id, is_active=True)
+        # The old refresh token is single use. The check above is only a fast
+        # path; this is what stops two concurrent refreshes with the same token.
+        if not revocations.claim(refresh):
+            raise TokenError("Token is revoked")
+        new_refresh_token = RefreshToken.for_user(user)
+        return str(new_refresh_token.access_token), str(new_refresh_token)
@@ -0,0 +1,396 @@
+import itertools
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import override_settings
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from api.serializers import (
+    PostSerializers,
+    UserHomePostSerializers,
+    UserProfileFollowerSerializer,
+    UserProfileSerializer,
+)
+from post.models import Like, Post, PostTerm
+from users.models import Follower, Profile, User
+
+AUTH_USERNAME = "bench_auth"
+AUTH_PASSWORD = "bench-password"
+REGISTER_PREFIX = "bench_register_"
+
+# Endpoints of api/urls.py left out on purpose, and why.
+EXCLUDED = {
+    "DELETE user/profile/": "deletes the benchmark account",
+    "DELETE post/<id>/, comment/<id>/, story/<id>/": "destroy the data measured",
+    "POST user/posts/, post/<id>/comments/, user/stories/": (
+        "uploads, and data that grows with every iteration"
+    ),
+    "story/<id>/view/, story/<id>/viewers/": "generate_social_graph makes no stories",
+    "comment/<id>/replies/": "generate_social_graph makes no comments",
+    "user/notifications/read/": "a single UPDATE, nothing to page",
+    "user/export/...": "builds run in the outbox worker, see exports.builder",
+    "debug/profiles/...": "staff only, and reads the profiler's own cache",
+    "user/live/": "an endless event stream",
+}
+
+
+def checked(name, response):
+    """The status of ``response``; a failed call would measure the wrong thing."""
+    if response.status_code >= 400:
+        raise CommandError(f"{name} -> {response.status_code}")
+    return response.status_code
+
+
+class Command(BaseCommand):
+    help = (
+        "Run repeatable micro and macro benchmarks against the API endpoints and "
+        "write p50/p95/p99 latency and query counts as JSON. Endpoints left out "
+        "on purpose are listed in EXCLUDED."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--username",
+            help="User to benchmark as. Defaults to the user following the most "
+            "profiles, which gives the heaviest home feed.",
+        )
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--output", default="bench_output.json")
+        parser.add_argument(
+            "--baseline", help="Previous --output file to compare the results with."
+        )
+        parser.add_argument(
+            "--only", nargs="*", default=None, help="Run only these benchmarks."
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Check that the fast path serializers render exactly the same JSON "
+            "as the regular ones, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        self.iterations = options["iterations"]
+        self.warmup = options["warmup"]
+        if self.iterations < 2:
+            raise CommandError("--iterations must be at least 2")
+
+        profile = self.get_profile(options["username"])
+        if options["verify"]:
+            return self.verify(profile)
+
+        target = (
+            Profile.objects.exclude(id=profile.id)
+            .annotate(n=Count("followers"))
+            .order_by("-n")
+            .first()
+        )
+        post = Post.objects.filter(profile=target).first() if target else None
+        if target is None or post is None:
+            raise CommandError("Not enough data, run generate_social_graph first")
+
+        self.client = APIClient()
+        self.client.cookies["access_token"] = str(AccessToken.for_user(profile.user))
+
+        benchmarks = self.macro_benchmarks(profile, target, post)
+        benchmarks.update(self.auth_benchmarks())
+        benchmarks.update(self.micro_benchmarks(profile, target))
+        if options["only"]:
+            benchmarks = {
+                name: bench
+                for name, bench in benchmarks.items()
+                if name in options["only"]
+            }
+
+        # Repeated writes would otherwise be measured as 429s once the throttle
+        # kicks in; benchmark_throttle covers the throttle on its own.
+        unthrottled = {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}}
+        results = {}
+        try:
+            with override_settings(REST_FRAMEWORK=unthrottled):
+                for name, bench in benchmarks.items():
+                    results[name] = self.measure(bench)
+                    self.report(name, results[name])
+        finally:
+            User.objects.filter(username__startswith=REGISTER_PREFIX).delete()
+            User.objects.filter(username=AUTH_USERNAME).delete()
+
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "vendor": connection.vendor,
+            "username": profile.user.username,
+            "iterations": self.iterations,
+            "results": results,
+        }
+        with open(options["output"], "w") as fp:
+            json.dump(report, fp, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options["baseline"]:
+            self.compare(options["baseline"], results)
+
+    def get_profile(self, username):
+        profiles = Profile.objects.select_related("user")
+        if username:
+            profile = profiles.filter(user__username=username).first()
+        else:
+            profile = (
+                profiles.annotate(n=Count("following_users")).order_by("-n").first()
+            )
+        if profile is None:
+            raise CommandError("No profile found to benchmark with")
+        return profile
+
+    def request(self, method, path, data=None):
+        def run():
+            response = getattr(self.client, method)(f"/api/{path}", data)
+            if response.status_code >= 500:
+                raise CommandError(f"{method.upper()} {path} -> {response.status_code}")
+            return response.status_code
+
+        return run
+
+    def toggle(self, path, first, second):
+        """Run a write and its inverse so every iteration starts from the same state."""
+
+        def run():
+            status = self.request(first, path)()
+            self.request(second, path)()
+            return status
+
+        return run
+
+    def macro_benchmarks(self, profile, target, post):
+        username = target.user.username
+        follow_path = f"user/profile/{target.id}/follow/"
+        if Follower.objects.filter(follower=profile, following=target).exists():
+            follow_unfollow = self.toggle(follow_path, "delete", "post")
+        else:
+            follow_unfollow = self.toggle(follow_path, "post", "delete")
+        return {
+            "profile_me": self.request("get", "user/profile/"),
+            "profile_detail": self.request("get", f"user/profile/{target.id}/"),
+            "profile_followers": self.request(
+                "get", f"user/profile/{target.id}/follow/"
+            ),
+            "profile_following": self.request(
+                "get", f"user/profile/{profile.id}/following/"
+            ),
+            "follow_unfollow": follow_unfollow,
+            "search": self.request("get", "user/search/", {"query": username[:4]}),
+            "posts_mine": self.request("get", "user/posts/"),
+            "posts_by_profile": self.request("get", f"user/posts/{target.id}/"),
+            "like_unlike": self.toggle(f"post/{post.id}/like/", "post", "post"),
+            "home_feed": self.request("get", "user/home/"),
+            "liked_posts": self.request("get", "user/liked/post/"),
+            "batch_profiles": self.request(
+                "get", "batch/profiles/", {"ids": f"{profile.id},{target.id}"}
+            ),
+            "batch_posts": self.request("get", "batch/posts/", {"ids": post.id}),
+            "tag_posts": self.request("get", f"tags/{self.popular_tag()}/posts/"),
+            "post_search": self.request(
+                "get", "post/search/", {"query": self.popular_tag()}
+            ),
+            "comments": self.request("get", f"post/{post.id}/comments/"),
+            "stories_tray": self.request("get", "user/stories/"),
+            "notifications": self.request("get", "user/notifications/"),
+        }
+
+    def popular_tag(self):
+        tag = (
+            PostTerm.objects.filter(kind=PostTerm.TAG)
+            .values("term")
+            .annotate(n=Count("id"))
+            .order_by("-n")
+            .values_list("term", flat=True)
+            .first()
+        )
+        return tag or "bench"
+
+    def auth_benchmarks(self):
+        """Register, login, logout and refresh token rotation, each on fresh state."""
+        User.objects.filter(username=AUTH_USERNAME).delete()
+        user = User.objects.create_user(
+            AUTH_USERNAME, f"{AUTH_USERNAME}@example.com", AUTH_PASSWORD
+        )
+        Profile.objects.create(user=user)
+        numbers = itertools.count()
+
+        def register():
+            username = f"{REGISTER_PREFIX}{next(numbers)}"
+            response = APIClient().post(
+                "/api/register/",
+                {
+                    "username": username,
+                    "email": f"{username}@example.com",
+                    "first_name": "Bench",
+                    "last_name": "Mark",
+                    "password": AUTH_PASSWORD,
+                },
+            )
+            return checked("register", response)
+
+        def login():
+            credentials = {"username": AUTH_USERNAME, "password": AUTH_PASSWORD}
+            return checked("login", APIClient().post("/api/login/", credentials))
+
+        def logout():
+            # Logout revokes the tokens it is sent, so every call gets new ones.
+            refresh = RefreshToken.for_user(user)
+            client = APIClient()
+            client.cookies["access_token"] = str(refresh.access_token)
+            client.cookies["refresh_token"] = str(refresh)
+            return checked("logout", client.post("/api/logout/"))
+
+        def token_refresh():
+            # An expired access token: authentication rotates the refresh token.
+            client = APIClient()
+            client.cookies["refresh_token"] = str(RefreshToken.for_user(user))
+            response = client.get("/api/user/profile/", {"fields": "id"})
+            return checked("token_refresh", response)
+
+        return {
+            "register": register,
+            "login": login,
+            "logout": logout,
+            "token_refresh": token_refresh,
+        }
+
+    def micro_benchmarks(self, profile, target):
+        request = APIRequestFactory().get("/")
+        request.user = profile.user
+        context = {"request": request}
+
+        def serialize_profile():
+            return UserProfileSerializer(target, context=context).data
+
+        posts = self.feed(profile)
+
+        def serialize_feed():
+            return UserHomePostSerializers(posts, many=True, context=context).data
+
+        def serialize_feed_fast():
+            return UserHomePostSerializers.fast_data(posts, context)
+
+        return {
+            "serializer_profile": serialize_profile,
+            "serializer_home_feed": serialize_feed,
+            "serializer_home_feed_fast": serialize_feed_fast,
+        }
+
+    def feed(self, profile):
+        return (
+            Post.objects.filter(profile__followers__follower=profile)
+            .order_by("-created_at", "profile__followers__id", "id")
+            .prefetch_related("media")
+        )
+
+    def verify(self, profile):
+        request = APIRequestFactory().get("/")
+        request.user = profile.user
+        context = {"request": request}
+        posts = self.feed(profile)
+        followers = Follower.objects.filter(following=profile).order_by("id")
+        likes = (
+            Like.objects.filter(profile=profile)
+            .order_by("id")
+            .prefetch_related("post__media")
+        )
+
+        cases = {
+            "PostSerializers": (
+                PostSerializers(posts, many=True, context=context).data,
+                PostSerializers.fast_data(posts, context),
+            ),
+            "PostSerializers without request": (
+                PostSerializers([like.post for like in likes], many=True).data,
+                PostSerializers.fast_data(likes, prefix="post__"),
+            ),
+            "UserHomePostSerializers": (
+                UserHomePostSerializers(posts, many=True, context=context).data,
+                UserHomePostSerializers.fast_data(posts, context),
+            ),
+            "UserHomePostSerializers without request": (
+                UserHomePostSerializers(posts, many=True).data,
+                UserHomePostSerializers.fast_data(posts),
+            ),
+            "UserProfileFollowerSerializer": (
+                UserProfileFollowerSerializer(
+                    [f.follower for f in followers], many=True
+                ).data,
+                UserProfileFollowerSerializer.fast_data(followers, prefix="follower__"),
+            ),
+        }
+
+        renderer = JSONRenderer()
+        failed = False
+        for name, (expected, actual) in cases.items():
+            identical = renderer.render(expected) == renderer.render(actual)
+            failed = failed or not identical
+            self.stdout.write(
+                f"{name:<44} {len(actual):>6} rows  identical={identical}"
+            )
+        if failed:
+            raise CommandError("Fast path output differs from the serializers")
+
+    def measure(self, bench):
+        for _ in range(self.warmup):
+            bench()
+
+        # Counted rather than read from connection.queries, whose log keeps only
+        # the last 9000 queries and would report 0 for heavier requests.
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        timings = []
+        with connection.execute_wrapper(count):
+            bench()
+
+        for _ in range(self.iterations):
+            start = time.perf_counter()
+            bench()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        cuts = statistics.quantiles(timings, n=100, method="inclusive")
+        return {
+            "p50_ms": round(cuts[49], 3),
+            "p95_ms": round(cuts[94], 3),
+            "p99_ms": round(cuts[98], 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "queries": queries,
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:<24} p50={result['p50_ms']:>9.3f}ms "
+            f"p95={result['p95_ms']:>9.3f}ms p99={result['p99_ms']:>9.3f}ms "
+            f"queries={result['queries']}"
+        )
+
+    def compare(self, path, results):
+        with open(path) as fp:
+            baseline = json.load(fp)["results"]
+
+        self.stdout.write(f"\nCompared with {path}:")
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            before = baseline[name]
+            change = (result["p50_ms"] - before["p50_ms"]) / (before["p50_ms"] or 1)
+            self.stdout.write(
+                f"{name:<24} p50 {before['p50_ms']:>9.3f} -> {result['p50_ms']:>9.3f}ms "
+                f"({change:+.1%}) queries {before['queries']} -> {result['queries']}"
+            )
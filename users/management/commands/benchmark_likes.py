@@ -0,0 +1,111 @@
+import json
+import random
+import time
+
+from django.core.management.base import CommandError
+from django.db import connection
+
+from rest_framework.test import APIRequestFactory
+
+from api.serializers import UserHomePostSerializers, like_count_of, liked_by
+from post.models import ArchivedLike, Like, Post
+
+from .benchmark_api import Command as BenchmarkCommand
+
+
+def table_size(model):
+    """(data bytes, index bytes) of a model's table, or None if unknown."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "mysql":
+            cursor.execute(
+                "SELECT DATA_LENGTH, INDEX_LENGTH FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [table],
+            )
+            return cursor.fetchone()
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT pg_relation_size(%s), pg_indexes_size(%s)", [table, table]
+            )
+            return cursor.fetchone()
+    return None
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Measure like lookups (is_liked, like counts, the home feed) and the size "
+        "of the like tables. Run before and after archive_likes and compare with "
+        "--baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username")
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--posts", type=int, default=100)
+        parser.add_argument("--output", default="bench_likes.json")
+        parser.add_argument(
+            "--baseline", help="Previous --output file to compare the results with."
+        )
+
+    def handle(self, *args, **options):
+        self.iterations = options["iterations"]
+        self.warmup = options["warmup"]
+        if self.iterations < 2:
+            raise CommandError("--iterations must be at least 2")
+
+        profile = self.get_profile(options["username"])
+        post_ids = list(Post.objects.values_list("id", flat=True))
+        if not post_ids:
+            raise CommandError("Not enough data, run generate_social_graph first")
+        sample = random.Random(42).sample(
+            post_ids, min(options["posts"], len(post_ids))
+        )
+        posts = Post.objects.filter(id__in=sample)
+        feed = self.feed(profile)
+        request = APIRequestFactory().get("/")
+        request.user = profile.user
+        context = {"request": request}
+
+        benchmarks = {
+            "is_liked": lambda: list(
+                posts.annotate(liked=liked_by(profile)).values_list("liked")
+            ),
+            "like_count": lambda: list(
+                posts.annotate(n=like_count_of()).values_list("n")
+            ),
+            "home_feed_fast": lambda: UserHomePostSerializers.fast_data(feed, context),
+        }
+        results = {}
+        for name, bench in benchmarks.items():
+            results[name] = self.measure(bench)
+            self.report(name, results[name])
+
+        tables = {}
+        for model in (Like, ArchivedLike):
+            size = table_size(model)
+            tables[model._meta.db_table] = {
+                "rows": model.objects.count(),
+                "data_bytes": size[0] if size else None,
+                "index_bytes": size[1] if size else None,
+            }
+            self.stdout.write(
+                f"{model._meta.db_table:<24} {tables[model._meta.db_table]}"
+            )
+
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "vendor": connection.vendor,
+            "username": profile.user.username,
+            "iterations": self.iterations,
+            "feed_posts": feed.count(),
+            "results": results,
+            "tables": tables,
+        }
+        with open(options["output"], "w") as fp:
+            json.dump(report, fp, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options["baseline"]:
+            self.compare(options["baseline"], results)
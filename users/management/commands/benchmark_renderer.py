@@ -0,0 +1,80 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.middleware import COMPRESSORS
+from api.renderers import FastJSONRenderer
+from api.serializers import UserHomePostSerializers, UserProfileSerializer
+from post.models import Post
+from users.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare CPU time per response for DRF's JSONRenderer and FastJSONRenderer, "
+        "and the size and cost of each available compression encoding."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        profile = (
+            Profile.objects.select_related("user")
+            .annotate(n=Count("following_users"))
+            .order_by("-n")
+            .first()
+        )
+        if profile is None:
+            raise CommandError("Not enough data, run generate_social_graph first")
+
+        request = APIRequestFactory().get("/")
+        request.user = profile.user
+        context = {"request": request}
+        posts = Post.objects.filter(profile__followers__follower=profile)
+        payloads = {
+            "home_feed": UserHomePostSerializers(
+                posts, many=True, context=context
+            ).data,
+            "profile": UserProfileSerializer(profile, context=context).data,
+        }
+
+        for name, data in payloads.items():
+            stdlib = JSONRenderer().render(data)
+            fast = FastJSONRenderer().render(data)
+            self.stdout.write(
+                f"\n{name}: {len(stdlib)} bytes, identical={stdlib == fast}"
+            )
+            baseline = self.cpu_time(lambda: JSONRenderer().render(data), options)
+            self.report("JSONRenderer", baseline, baseline)
+            self.report(
+                "FastJSONRenderer",
+                self.cpu_time(lambda: FastJSONRenderer().render(data), options),
+                baseline,
+            )
+            for encoding, compress in COMPRESSORS.items():
+                size = len(compress(fast))
+                self.report(
+                    f"{encoding} ({size} bytes, {size / len(fast):.0%})",
+                    self.cpu_time(lambda: compress(fast), options),
+                    baseline,
+                )
+
+    def cpu_time(self, func, options):
+        """Median process CPU time per call, in microseconds."""
+        samples = []
+        for _ in range(options["iterations"]):
+            start = time.process_time_ns()
+            func()
+            samples.append((time.process_time_ns() - start) / 1000)
+        return statistics.median(samples)
+
+    def report(self, label, micros, baseline):
+        self.stdout.write(
+            f"  {label:<32} {micros:>10.1f}us/response  ({micros / baseline:.2f}x)"
+        )
@@ -0,0 +1,51 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from api.throttling import ScopedTokenBucketThrottle
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request cost of ScopedTokenBucketThrottle."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=100_000)
+        parser.add_argument(
+            "--clients", type=int, default=1000, help="Distinct client IPs to rotate."
+        )
+
+    def handle(self, *args, **options):
+        view = APIView()
+        view.throttle_scope = "like"
+        factory = APIRequestFactory()
+        requests = [
+            view.initialize_request(
+                factory.get("/", REMOTE_ADDR=f"10.0.{i // 256}.{i % 256}")
+            )
+            for i in range(options["clients"])
+        ]
+        for request in requests:
+            request.user = None
+
+        throttle = ScopedTokenBucketThrottle()
+        samples = []
+        with CaptureQueriesContext(connection) as ctx:
+            for i in range(options["iterations"]):
+                request = requests[i % len(requests)]
+                start = time.perf_counter_ns()
+                throttle.allow_request(request, view)
+                samples.append((time.perf_counter_ns() - start) / 1000)
+
+        cuts = statistics.quantiles(samples, n=100)
+        self.stdout.write(
+            f"allow_request over {options['iterations']} calls: "
+            f"p50={cuts[49]:.2f}us p99={cuts[98]:.2f}us "
+            f"mean={statistics.fmean(samples):.2f}us "
+            f"queries={len(ctx.captured_queries)}"
+        )
@@ -0,0 +1,180 @@
+import itertools
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from post.models import Like, Post, PostMedia
+from users.models import Follower, Profile, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic social graph (users, profiles, power-law follows, "
+        "posts and likes) using bulk_create, for local load testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument(
+            "--avg-following",
+            type=int,
+            default=50,
+            help="Average number of profiles each user follows.",
+        )
+        parser.add_argument("--avg-posts", type=int, default=5)
+        parser.add_argument(
+            "--avg-media",
+            type=int,
+            default=2,
+            help="Average number of carousel items per post.",
+        )
+        parser.add_argument(
+            "--avg-likes",
+            type=int,
+            default=20,
+            help="Average number of likes per post (scaled by author popularity).",
+        )
+        parser.add_argument(
+            "--alpha",
+            type=float,
+            default=1.1,
+            help="Zipf exponent for profile popularity; higher is more skewed.",
+        )
+        parser.add_argument("--prefix", default="bench_")
+        parser.add_argument("--password", default="bench-password")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.batch_size = options["batch_size"]
+        self.rng = random.Random(options["seed"])
+        prefix = options["prefix"]
+
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f"Users with prefix '{prefix}' already exist, use another --prefix"
+            )
+
+        profile_ids = self.create_users(prefix, options["users"], options["password"])
+        weights = self.popularity_weights(len(profile_ids), options["alpha"])
+
+        follows = self.create_follows(profile_ids, weights, options["avg_following"])
+        self.stdout.write(f"Created {follows} follows")
+
+        posts = self.create_posts(profile_ids, options["avg_posts"])
+        self.stdout.write(f"Created {posts} posts")
+
+        media = self.create_media(prefix, options["avg_media"])
+        self.stdout.write(f"Created {media} media items")
+
+        likes = self.create_likes(prefix, profile_ids, weights, options["avg_likes"])
+        self.stdout.write(f"Created {likes} likes")
+
+        self.stdout.write(self.style.SUCCESS("Social graph generated"))
+
+    def create_users(self, prefix, count, password):
+        # Hashing once and sharing the hash keeps generation I/O bound.
+        password = make_password(password)
+        users = (
+            User(
+                username=f"{prefix}{i}",
+                email=f"{prefix}{i}@example.com",
+                first_name="Bench",
+                last_name=str(i),
+                password=password,
+            )
+            for i in range(count)
+        )
+        self.bulk_insert(User, users)
+
+        # MySQL does not return primary keys from bulk_create, so read them back.
+        user_ids = User.objects.filter(username__startswith=prefix).values_list(
+            "id", flat=True
+        )
+        self.bulk_insert(Profile, (Profile(user_id=uid) for uid in user_ids.iterator()))
+        self.stdout.write(f"Created {count} users and profiles")
+
+        return list(
+            Profile.objects.filter(user__username__startswith=prefix)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+    def popularity_weights(self, count, alpha):
+        """Cumulative Zipf weights, so rank 1 is the most followed profile."""
+        return list(
+            itertools.accumulate(1 / (rank**alpha) for rank in range(1, count + 1))
+        )
+
+    def sample_degree(self, average, upper):
+        # Exponentially distributed out-degree around the requested average.
+        return min(int(self.rng.expovariate(1 / average)) if average else 0, upper)
+
+    def create_follows(self, profile_ids, weights, avg_following):
+        def rows():
+            for follower_id in profile_ids:
+                degree = self.sample_degree(avg_following, len(profile_ids) - 1)
+                targets = set(
+                    self.rng.choices(profile_ids, cum_weights=weights, k=degree)
+                )
+                targets.discard(follower_id)
+                for following_id in targets:
+                    yield Follower(follower_id=follower_id, following_id=following_id)
+
+        return self.bulk_insert(Follower, rows())
+
+    def create_posts(self, profile_ids, avg_posts):
+        def rows():
+            for profile_id in profile_ids:
+                for n in range(self.sample_degree(avg_posts, avg_posts * 10)):
+                    yield Post(
+                        profile_id=profile_id,
+                        image="profile/images/default.jpeg",
+                        description=f"Synthetic post {n} #bench",
+                    )
+
+        return self.bulk_insert(Post, rows())
+
+    def create_media(self, prefix, avg_media):
+        posts = Post.objects.filter(
+            profile__user__username__startswith=prefix
+        ).values_list("id", "image")
+
+        def rows():
+            for post_id, image in posts.iterator(chunk_size=self.batch_size):
+                # Position 0 is the post's own image, as for real uploads.
+                count = max(1, self.sample_degree(avg_media, 10)) if avg_media else 0
+                for position in range(count):
+                    yield PostMedia(post_id=post_id, file=image, position=position)
+
+        return self.bulk_insert(PostMedia, rows())
+
+    def create_likes(self, prefix, profile_ids, weights, avg_likes):
+        total_weight = weights[-1]
+        rank = {profile_id: i for i, profile_id in enumerate(profile_ids)}
+        posts = Post.objects.filter(
+            profile__user__username__startswith=prefix
+        ).values_list("id", "profile_id")
+
+        def rows():
+            for post_id, author_id in posts.iterator(chunk_size=self.batch_size):
+                # Popular authors collect proportionally more likes.
+                i = rank[author_id]
+                share = (weights[i] - (weights[i - 1] if i else 0)) / total_weight
+                average = max(1, int(avg_likes * share * len(profile_ids)))
+                degree = self.sample_degree(average, len(profile_ids))
+                for liker_id in set(self.rng.choices(profile_ids, k=degree)):
+                    yield Like(post_id=post_id, profile_id=liker_id)
+
+        return self.bulk_insert(Like, rows())
+
+    def bulk_insert(self, model, objs):
+        objs = iter(objs)
+        total = 0
+        while True:
+            batch = list(itertools.islice(objs, self.batch_size))
+            if not batch:
+                return total
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
@@ -0,0 +1,281 @@
+import csv
+import itertools
+import json
+import os
+
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+
+from post.captions import index_posts
+from post.models import ArchivedLike, Like, Post
+from users.models import Follower, Profile, User
+
+
+def read_records(path):
+    """Stream dicts from an NDJSON (.ndjson/.jsonl) or CSV file, one at a time."""
+    if path.endswith((".ndjson", ".jsonl", ".json")):
+        with open(path, encoding="utf-8") as fp:
+            for line in fp:
+                if line.strip():
+                    yield json.loads(line)
+    elif path.endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as fp:
+            yield from csv.DictReader(fp)
+    else:
+        raise CommandError(f"Unsupported file type for {path}, use .ndjson or .csv")
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import users, profiles, follows, posts and likes from NDJSON or CSV "
+        "files. Rows are streamed and written with bulk_create in chunks."
+    )
+    # No counters need reconciling afterwards: follower, post and like counts are
+    # computed from rows, and the denormalized ones (comment_count,
+    # archived_like_count) start at zero on imported posts, which is correct.
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            help="Records with username, email, first_name, last_name, password or "
+            "password_hash, and optional bio, gender and image.",
+        )
+        parser.add_argument(
+            "--follows", help="Records with follower and following usernames."
+        )
+        parser.add_argument(
+            "--posts",
+            help="Records with username, image, description and an optional source "
+            "id that --likes can refer to.",
+        )
+        parser.add_argument(
+            "--likes",
+            help="Records with username and post (a source id from --posts, or an "
+            "existing post id).",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Processes used to hash passwords.",
+        )
+
+    def handle(self, *args, **options):
+        if not any(options[kind] for kind in ("users", "follows", "posts", "likes")):
+            raise CommandError("Nothing to import, pass at least one input file")
+
+        self.batch_size = options["batch_size"]
+        self.post_ids = {}
+
+        # Order matters: every later stage refers to users imported before it.
+        if options["users"]:
+            self.import_users(options["users"], options["workers"])
+        if options["follows"]:
+            self.import_follows(options["follows"])
+        if options["posts"]:
+            self.import_posts(options["posts"])
+        if options["likes"]:
+            self.import_likes(options["likes"])
+
+    def import_users(self, path, workers):
+        created = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            # Hashing dominates, so the next chunk is hashed in the pool while the
+            # current one is written to the database.
+            pending = None
+            for chunk in chunked(read_records(path), self.batch_size):
+                chunk = self.new_users(chunk)
+                hashes = pool.map(
+                    make_password,
+                    [r.get("password") for r in chunk if not r.get("password_hash")],
+                    chunksize=max(1, len(chunk) // (workers * 4)),
+                )
+                if pending:
+                    created += self.create_users(*pending)
+                pending = (chunk, hashes)
+            if pending:
+                created += self.create_users(*pending)
+
+        self.stdout.write(f"Imported {created} users and profiles")
+
+    def new_users(self, chunk):
+        usernames = [r["username"] for r in chunk]
+        existing = set(
+            User.objects.filter(username__in=usernames).values_list(
+                "username", flat=True
+            )
+        )
+        return [r for r in chunk if r["username"] not in existing]
+
+    def create_users(self, chunk, hashes):
+        users = [
+            User(
+                username=r["username"],
+                email=User.objects.normalize_email(r["email"]),
+                first_name=r.get("first_name") or "",
+                last_name=r.get("last_name") or "",
+                password=r.get("password_hash") or next(hashes),
+            )
+            for r in chunk
+        ]
+
+        with transaction.atomic():
+            User.objects.bulk_create(users, ignore_conflicts=True)
+
+            # bulk_create skips post_save, so profiles are created here in the same
+            # transaction rather than by users.signals.create_profile per row.
+            user_ids = dict(
+                User.objects.filter(username__in=[u.username for u in users])
+                .filter(profile__isnull=True)
+                .values_list("username", "id")
+            )
+            profiles = []
+            for r in chunk:
+                if r["username"] not in user_ids:
+                    continue
+                fields = {
+                    key: r[key] for key in ("bio", "gender", "image") if r.get(key)
+                }
+                profiles.append(Profile(user_id=user_ids[r["username"]], **fields))
+            Profile.objects.bulk_create(profiles, ignore_conflicts=True)
+
+        return len(profiles)
+
+    def profile_ids(self, usernames):
+        return dict(
+            Profile.objects.filter(user__username__in=set(usernames)).values_list(
+                "user__username", "id"
+            )
+        )
+
+    def import_follows(self, path):
+        created = 0
+        for chunk in chunked(read_records(path), self.batch_size):
+            ids = self.profile_ids(
+                [r["follower"] for r in chunk] + [r["following"] for r in chunk]
+            )
+            follows = [
+                Follower(
+                    follower_id=ids[r["follower"]], following_id=ids[r["following"]]
+                )
+                for r in chunk
+                if r["follower"] in ids
+                and r["following"] in ids
+                and r["follower"] != r["following"]
+            ]
+            Follower.objects.bulk_create(follows, ignore_conflicts=True)
+            created += len(follows)
+
+        self.stdout.write(f"Imported {created} follows")
+
+    def import_posts(self, path):
+        created = 0
+        for chunk in chunked(read_records(path), self.batch_size):
+            ids = self.profile_ids([r["username"] for r in chunk])
+            chunk = [r for r in chunk if r["username"] in ids]
+            posts = [
+                Post(
+                    profile_id=ids[r["username"]],
+                    image=r["image"],
+                    description=r.get("description"),
+                )
+                for r in chunk
+            ]
+            with transaction.atomic():
+                if connection.features.can_return_rows_from_bulk_insert:
+                    Post.objects.bulk_create(posts)
+                else:
+                    last_id = Post.all_objects.aggregate(last=Max("id"))["last"]
+                    Post.objects.bulk_create(posts)
+                    self.fetch_post_ids(posts, last_id or 0)
+                # As PostSerializers.create does for a single post.
+                index_posts(
+                    (post.pk, post.description, post.created_at) for post in posts
+                )
+
+            for r, post in zip(chunk, posts):
+                if r.get("id"):
+                    self.post_ids[str(r["id"])] = post.pk
+            created += len(posts)
+
+        self.stdout.write(f"Imported {created} posts")
+
+    def fetch_post_ids(self, posts, last_id):
+        """
+        Backends such as MySQL do not return primary keys from bulk_create, so
+        the new rows are read back: those above ``last_id``, the highest id
+        before the insert. Posts with the same profile, image and description
+        are interchangeable, so each takes the next id of its kind in insert
+        order.
+        """
+
+        def key(profile_id, image, description):
+            return (profile_id, str(image), description)
+
+        rows = (
+            Post.all_objects.filter(
+                id__gt=last_id, profile_id__in={post.profile_id for post in posts}
+            )
+            .order_by("id")
+            .values_list("id", "profile_id", "image", "description")
+        )
+        ids = defaultdict(deque)
+        for pk, *fields in rows:
+            ids[key(*fields)].append(pk)
+        for post in posts:
+            matches = ids[key(post.profile_id, post.image, post.description)]
+            if not matches:
+                raise CommandError("Imported posts could not be read back")
+            post.pk = matches.popleft()
+
+    def post_id(self, ref):
+        ref = str(ref)
+        if ref in self.post_ids:
+            return self.post_ids[ref]
+        return int(ref) if ref.isdigit() else None
+
+    def import_likes(self, path):
+        created = 0
+        for chunk in chunked(read_records(path), self.batch_size):
+            ids = self.profile_ids([r["username"] for r in chunk])
+            likes = [
+                Like(profile_id=ids[r["username"]], post_id=self.post_id(r["post"]))
+                for r in chunk
+                if r["username"] in ids
+            ]
+            existing = set(
+                Post.objects.filter(
+                    id__in={like.post_id for like in likes if like.post_id}
+                ).values_list("id", flat=True)
+            )
+            likes = [like for like in likes if like.post_id in existing]
+            # A like that was archived already counts in archived_like_count.
+            archived = set(
+                ArchivedLike.objects.filter(
+                    post_id__in={like.post_id for like in likes},
+                    profile_id__in={like.profile_id for like in likes},
+                ).values_list("post_id", "profile_id")
+            )
+            likes = [
+                like
+                for like in likes
+                if (like.post_id, like.profile_id) not in archived
+            ]
+            Like.objects.bulk_create(likes, ignore_conflicts=True)
+            created += len(likes)
+
+        self.stdout.write(f"Imported {created} likes")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.revocation import prune
+
+
+class Command(BaseCommand):
+    help = "Delete revoked token records whose tokens have expired."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        deleted = prune(options["batch_size"])
+        self.stdout.write(f"Deleted {deleted} expired revoked tokens")
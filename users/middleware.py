@@ -2,12 +2,46 @@ from django.contrib.auth import get_user_model
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
+from .revocation import revocations
+
 User = get_user_model()
 
 
-class JWTRefreshMiddleware(MiddlewareMixin):
+class TokenCookieMiddleware(MiddlewareMixin):
+    """
+    Sets the cookies of tokens rotated while the request was authenticated, by
+    JWTAuthenticationFromCookie or JWTRefreshMiddleware. The old refresh token
+    is revoked on rotation, so the client must receive the new pair.
+    """
+
+    def process_response(self, request, response):
+        """Sets new tokens in cookies if refreshed."""
+        if hasattr(request, "new_access_token") and hasattr(
+            request, "new_refresh_token"
+        ):
+            response.set_cookie(
+                "access_token",
+                request.new_access_token,
+                max_age=900,  # 15 minutes
+                httponly=True,
+                secure=True,
+                samesite="None",
+            )
+            response.set_cookie(
+                "refresh_token",
+                request.new_refresh_token,
+                max_age=604800,  # 7 days
+                httponly=True,
+                secure=True,
+                samesite="None",
+            )
+        return response  # ✅ Ensure updated response is returned
+
+
+class JWTRefreshMiddleware(TokenCookieMiddleware):
     def process_request(self, request):
         """Checks tokens before processing the request."""
         request.user = None  # Reset user before processing
@@ -21,7 +55,11 @@ class JWTRefreshMiddleware(MiddlewareMixin):
             try:
 
                 access_token_obj = AccessToken(access_token)
-                request.user = User.objects.get(id=access_token_obj["user_id"])
+                if revocations.is_revoked(access_token_obj["jti"]):
+                    raise TokenError("Token is revoked")
+                request.user = User.objects.get(
+                    id=access_token_obj["user_id"], is_active=True
+                )
 
             except Exception:
                 if not refresh_token:
@@ -39,7 +77,9 @@ class JWTRefreshMiddleware(MiddlewareMixin):
 
                     # ✅ Authenticate user
                     access_token_obj = AccessToken(new_access_token)
-                    request.user = User.objects.get(id=access_token_obj["user_id"])
+                    request.user = User.objects.get(
+                        id=access_token_obj["user_id"], is_active=True
+                    )
 
                 except Exception:
                     return JsonResponse(
@@ -47,29 +87,6 @@ class JWTRefreshMiddleware(MiddlewareMixin):
                         status=401,
                     )
 
-    def process_response(self, request, response):
-        """Sets new tokens in cookies if refreshed."""
-        if hasattr(request, "new_access_token") and hasattr(
-            request, "new_refresh_token"
-        ):
-            response.set_cookie(
-                "access_token",
-                request.new_access_token,
-                max_age=900,  # 15 minutes
-                httponly=True,
-                secure=True,
-                samesite="None",
-            )
-            response.set_cookie(
-                "refresh_token",
-                request.new_refresh_token,
-                max_age=604800,  # 7 days
-                httponly=True,
-                secure=True,
-                samesite="None",
-            )
-        return response  # ✅ Ensure updated response is returned
-
     def refresh_access_token(self, refresh_token):
         """Tries to refresh the access token using the refresh token"""
         refresh = RefreshToken(refresh_token)
@@ -77,7 +94,10 @@ class JWTRefreshMiddleware(MiddlewareMixin):
 
         if not user_id:
             raise Exception("Invalid refresh token")
+        if revocations.is_revoked(refresh["jti"]):
+            raise TokenError("Token is revoked")
 
         user = User.objects.get(id=user_id)
         new_refresh_token = RefreshToken.for_user(user)  # Generate new refresh token
+        revocations.revoke(refresh)  # The old refresh token is single use
         return str(new_refresh_token.access_token), str(new_refresh_token)
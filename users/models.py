@@ -39,6 +39,13 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.username
 
 
+class ProfileManager(models.Manager):
+    """Hides soft-deleted profiles; ``Profile.all_objects`` still sees them."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at=None)
+
+
 class Profile(models.Model):
     GENDER_CHOICES = [
         ("male", "Male"),
@@ -50,16 +57,21 @@ class Profile(models.Model):
     )
     bio = models.TextField(null=True, blank=True)
     gender = models.CharField(max_length=100, choices=GENDER_CHOICES, default="male")
+    # Set on account deletion; the rows are reclaimed later by post.cleanup.
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProfileManager()
+    all_objects = models.Manager()
+
     @property
     def follower_count(self):
-        return self.followers.count()
+        return self.followers.filter(follower__deleted_at=None).count()
 
     @property
     def following_count(self):
-        return self.following_users.count()
+        return self.following_users.filter(following__deleted_at=None).count()
 
     @property
     def posts_count(self):
@@ -86,3 +98,14 @@ class Follower(models.Model):
 
     def __str__(self):
         return f"{self.follower} follows {self.following}"
+
+
+class RevokedToken(models.Model):
+    """JWTs invalidated before their expiry, by logout or refresh rotation."""
+
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)  # Index for bulk pruning
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.jti
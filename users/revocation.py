@@ -0,0 +1,164 @@
+import hashlib
+import math
+import threading
+import time
+
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import RevokedToken
+
+DEFAULTS = {
+    "REFRESH_INTERVAL": 30,
+    "CAPACITY": 100_000,
+    "FALSE_POSITIVE_RATE": 0.001,
+}
+
+
+def get_setting(name):
+    return getattr(settings, "TOKEN_REVOCATION", {}).get(name, DEFAULTS[name])
+
+
+class BloomFilter:
+    def __init__(self, capacity, false_positive_rate):
+        capacity = max(capacity, 1)
+        self.size = max(
+            8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, value):
+        # Double hashing: k positions from the two halves of one digest.
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for pos in self.positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value):
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self.positions(value)
+        )
+
+
+class RevocationList:
+    """
+    Answers "is this JTI revoked?" without a database query in the common case.
+
+    A bloom filter of every unexpired revoked JTI is rebuilt from the database
+    every REFRESH_INTERVAL seconds. JTIs revoked by this process since the last
+    rebuild are kept in an exact set. Only a bloom filter hit, which is rare for
+    tokens that are not revoked, costs a query to rule out a false positive.
+
+    Revocations made by other processes become visible at the next rebuild, so
+    a revoked access token may still be accepted elsewhere for up to
+    REFRESH_INTERVAL seconds. Refresh tokens do not have that window: ``claim``
+    goes through the unique JTI column.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rebuild_lock = threading.Lock()
+        self.bloom = None
+        self.recent = set()
+        self.built_at = 0
+
+    def stale(self):
+        age = time.monotonic() - self.built_at
+        return self.bloom is None or age >= get_setting("REFRESH_INTERVAL")
+
+    def refresh(self):
+        if not self.stale():
+            return
+        # One thread rebuilds while the others keep using the current filter.
+        if not self.rebuild_lock.acquire(blocking=self.bloom is None):
+            return
+        try:
+            if self.stale():
+                self.rebuild()
+        finally:
+            self.rebuild_lock.release()
+
+    def rebuild(self):
+        jtis = RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list(
+            "jti", flat=True
+        )
+        bloom = BloomFilter(
+            max(jtis.count() * 2, get_setting("CAPACITY")),
+            get_setting("FALSE_POSITIVE_RATE"),
+        )
+        for jti in jtis.iterator():
+            bloom.add(jti)
+        with self.lock:
+            self.bloom = bloom
+            # Anything revoked while the filter was being read stays exact.
+            self.recent = {jti for jti in self.recent if jti not in bloom}
+        self.built_at = time.monotonic()
+
+    def is_revoked(self, jti):
+        self.refresh()
+        if jti in self.recent:
+            return True
+        if jti not in self.bloom:
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, *tokens):
+        """Revoke simplejwt tokens (access or refresh) until they expire."""
+        RevokedToken.objects.bulk_create(
+            [
+                RevokedToken(
+                    jti=token["jti"],
+                    expires_at=datetime.fromtimestamp(token["exp"], tz=dt_timezone.utc),
+                )
+                for token in tokens
+            ],
+            ignore_conflicts=True,
+        )
+        with self.lock:
+            self.recent.update(token["jti"] for token in tokens)
+
+    def claim(self, token):
+        """
+        Revoke a single-use token, returning False if it was already revoked.
+
+        The unique JTI row is the gate, so of two concurrent claims on the same
+        token, in any processes, exactly one succeeds.
+        """
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(
+                    jti=token["jti"],
+                    expires_at=datetime.fromtimestamp(token["exp"], tz=dt_timezone.utc),
+                )
+        except IntegrityError:
+            return False
+        with self.lock:
+            self.recent.add(token["jti"])
+        return True
+
+
+revocations = RevocationList()
+
+
+def prune(batch_size=5000):
+    """Delete revoked tokens that have expired anyway, in batches."""
+    now = timezone.now()
+    deleted = 0
+    while True:
+        ids = list(
+            RevokedToken.objects.filter(expires_at__lte=now).values_list(
+                "id", flat=True
+            )[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += RevokedToken.objects.filter(id__in=ids).delete()[0]
@@ -1 +1,238 @@
-# Create your tests here.
+import json
+import os
+import tempfile
+
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from asgiref.sync import async_to_sync
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from api.serializers import UserProfileFollowerSerializer
+from live.consumers import get_channels
+from notifications.models import Notification
+from post.models import Like, Post, PostTerm
+
+from .authentication import JWTAuthenticationFromCookie
+from .models import Follower, Profile, RevokedToken, User
+from .revocation import revocations
+
+
+def create_profile(username):
+    user = User.objects.create_user(username, f"{username}@example.com", "password")
+    return Profile.objects.create(user=user)
+
+
+def client_for(profile):
+    client = APIClient()
+    client.cookies["access_token"] = str(AccessToken.for_user(profile.user))
+    return client
+
+
+class ProfileFastPathTestCase(TestCase):
+    """Profile fast paths must render exactly what the serializers render."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_profile("owner")
+        cls.fan = create_profile("fan")
+        cls.stranger = create_profile("stranger")
+        Follower.objects.create(follower=cls.fan, following=cls.owner)
+        Follower.objects.create(follower=cls.stranger, following=cls.owner)
+        post = Post.objects.create(profile=cls.owner, image="profile/images/a.jpg")
+        Like.objects.create(post=post, profile=cls.fan)
+
+    def test_follower_serializer(self):
+        followers = Follower.objects.filter(following=self.owner).order_by("id")
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(
+                UserProfileFollowerSerializer.fast_data(followers, prefix="follower__")
+            ),
+            renderer.render(
+                UserProfileFollowerSerializer(
+                    [follow.follower for follow in followers], many=True
+                ).data
+            ),
+        )
+
+    def assertBatchMatchesSingle(self, viewer, fields=None):
+        client = client_for(viewer)
+        params = {"fields": ",".join(sorted(fields))} if fields else {}
+        ids = [self.owner.id, self.fan.id, self.stranger.id]
+        batch = client.get(
+            "/api/batch/profiles/", {"ids": ",".join(map(str, ids)), **params}
+        ).json()["results"]
+        single = [client.get(f"/api/user/profile/{pk}/", params).json() for pk in ids]
+        self.assertEqual(batch, single)
+
+    def test_batch_profiles_from_each_side(self):
+        for viewer in (self.owner, self.fan, self.stranger):
+            with self.subTest(viewer=viewer.user.username):
+                self.assertBatchMatchesSingle(viewer)
+
+    def test_batch_profiles_sparse_fields(self):
+        for fields in [{"id", "username", "is_following"}, {"id", "likes", "posts"}]:
+            with self.subTest(fields=fields):
+                self.assertBatchMatchesSingle(self.fan, fields)
+
+
+class TokenRotationTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("owner", "owner@example.com", "password")
+        self.profile = Profile.objects.create(user=user)
+
+    def test_refresh_token_is_single_use(self):
+        refresh = RefreshToken.for_user(self.profile.user)
+        client = APIClient()
+        client.cookies["refresh_token"] = str(refresh)
+
+        response = client.get("/api/user/profile/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.cookies["refresh_token"].value, str(refresh))
+        self.assertTrue(response.cookies["access_token"].value)
+
+        replay = APIClient()
+        replay.cookies["refresh_token"] = str(refresh)
+        self.assertEqual(replay.get("/api/user/profile/").status_code, 403)
+
+    def test_refresh_token_used_by_another_process_is_rejected(self):
+        refresh = RefreshToken.for_user(self.profile.user)
+        # Another worker rotated it; this process's filter has not seen that yet.
+        RevokedToken.objects.create(
+            jti=refresh["jti"], expires_at=timezone.now() + timedelta(days=1)
+        )
+        with mock.patch.object(revocations, "is_revoked", return_value=False):
+            with self.assertRaises(TokenError):
+                JWTAuthenticationFromCookie().refresh_access_token(str(refresh))
+
+    def test_live_updates_check_revocation_and_activity(self):
+        token = AccessToken.for_user(self.profile.user)
+        self.assertIsNotNone(async_to_sync(get_channels)(str(token)))
+
+        revocations.revoke(token)
+        self.assertIsNone(async_to_sync(get_channels)(str(token)))
+
+        fresh = AccessToken.for_user(self.profile.user)
+        User.objects.filter(id=self.profile.user_id).update(is_active=False)
+        self.assertIsNone(async_to_sync(get_channels)(str(fresh)))
+
+
+class ImportAccountsTestCase(TestCase):
+    def write(self, directory, name, records):
+        path = os.path.join(directory, name)
+        with open(path, "w", encoding="utf-8") as fp:
+            fp.writelines(json.dumps(record) + "\n" for record in records)
+        return path
+
+    def test_posts_sharing_an_image_keep_their_own_likes(self):
+        owner = create_profile("owner")
+        fan = create_profile("fan")
+        existing = Post.objects.create(profile=owner, image="x.jpg")
+        with tempfile.TemporaryDirectory() as directory:
+            posts = self.write(
+                directory,
+                "posts.ndjson",
+                [
+                    {"id": "a", "username": "owner", "image": "x.jpg"},
+                    {
+                        "id": "b",
+                        "username": "owner",
+                        "image": "x.jpg",
+                        "description": "#beach",
+                    },
+                ],
+            )
+            likes = self.write(
+                directory, "likes.ndjson", [{"username": "fan", "post": "b"}]
+            )
+            # As on MySQL, where bulk_create returns no primary keys.
+            with mock.patch.object(
+                type(connection.features),
+                "can_return_rows_from_bulk_insert",
+                new_callable=mock.PropertyMock,
+                return_value=False,
+            ):
+                call_command(
+                    "import_accounts", posts=posts, likes=likes, stdout=StringIO()
+                )
+
+        first, second = Post.objects.filter(profile=owner, id__gt=existing.id).order_by(
+            "id"
+        )
+        self.assertFalse(existing.likes.exists())
+        self.assertFalse(first.likes.exists())
+        self.assertEqual(list(second.likes.values_list("profile", flat=True)), [fan.id])
+        self.assertEqual(
+            list(PostTerm.objects.values_list("term", "post")), [("beach", second.id)]
+        )
+
+
+class SoftDeleteTestCase(TestCase):
+    def setUp(self):
+        self.owner = create_profile("owner")
+        self.fan = create_profile("fan")
+        self.other = create_profile("other")
+
+    def test_deactivated_account_cannot_log_in(self):
+        credentials = {"username": "fan", "password": "password"}
+        self.assertEqual(APIClient().post("/api/login/", credentials).status_code, 200)
+        User.objects.filter(id=self.fan.user_id).update(is_active=False)
+        self.assertEqual(APIClient().post("/api/login/", credentials).status_code, 400)
+
+    def test_notifications_hide_deleted_posts_and_actors(self):
+        kept, deleted = [
+            Post.objects.create(profile=self.owner, image=f"profile/images/{i}.jpg")
+            for i in range(2)
+        ]
+        now = timezone.now()
+        Notification.objects.bulk_create(
+            [
+                Notification(
+                    recipient=self.owner,
+                    verb=Notification.LIKE,
+                    post=kept,
+                    actor_ids=[self.fan.id, self.other.id],
+                    actor_count=2,
+                    window_start=now,
+                ),
+                Notification(
+                    recipient=self.owner,
+                    verb=Notification.LIKE,
+                    post=deleted,
+                    actor_ids=[self.other.id],
+                    window_start=now,
+                ),
+                Notification(
+                    recipient=self.owner,
+                    verb=Notification.FOLLOW,
+                    actor_ids=[self.fan.id],
+                    window_start=now,
+                ),
+            ]
+        )
+        Post.objects.filter(id=deleted.id).update(deleted_at=now)
+        Profile.objects.filter(id=self.fan.id).update(deleted_at=now)
+
+        results = (
+            client_for(self.owner).get("/api/user/notifications/").json()["results"]
+        )
+        self.assertEqual(
+            [(n["post"], n["actors"], n["text"]) for n in results],
+            [
+                (
+                    kept.id,
+                    [{"id": self.other.id, "username": "other"}],
+                    "other liked your post",
+                )
+            ],
+        )